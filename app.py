@@ -16,15 +16,19 @@ app.config.from_object(Config)
 CORS(app)
 
 # 注册路由蓝图
-from routes import session_bp, faq_bp, chat_bp, stats_bp
-# 可选：WebSocket 广播（实时弹幕推送）
-# NOTE: 临时禁用自动启动 websockets 服务以避免在某些环境中因 asyncio loop 导致的线程异常。
-bullet_ws = None
+from routes import session_bp, faq_bp, chat_bp, stats_bp, metrics_bp
+# 可选：WebSocket 广播（实时弹幕推送），WS_ENABLED=true 时启动
+from services import bullet_ws
 
 app.register_blueprint(session_bp)
 app.register_blueprint(faq_bp)
 app.register_blueprint(chat_bp)
 app.register_blueprint(stats_bp)
+app.register_blueprint(metrics_bp)
+
+# 多进程部署时连接跨进程事件总线（EVENT_BUS_URL），接收其他进程发布的弹幕/答案事件
+from services.event_hub import event_hub
+event_hub.start()
 
 # 静态文件路由
 @app.route('/')
@@ -49,8 +53,8 @@ if __name__ == '__main__':
     
     # 启动可选的 WebSocket 广播服务（非强依赖）
     try:
-        if bullet_ws:
-            bullet_ws.start_server(host='127.0.0.1', port=6789)
+        if Config.WS_ENABLED:
+            bullet_ws.start_server(host=Config.WS_HOST, port=Config.WS_PORT)
     except Exception:
         logger.warning('启动 WebSocket 广播服务失败，继续以 HTTP 模式运行')
 
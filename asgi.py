@@ -0,0 +1,97 @@
+"""
+小聚AI助手 - ASGI 入口（异步对话路径）
+
+POST /api/chat 由 services/chat_async.py 以协程处理，请求与响应（状态码、JSON、CORS 头）与 Flask 版本一致，
+等待 AI 时不占用线程；其余接口原样交给 Flask 应用，在 ASYNC_WSGI_THREADS 个线程中执行。
+
+运行（先安装 pip install -r requirements-async.txt）：
+  python asgi.py
+  或 uvicorn asgi:app --host 0.0.0.0 --port 5000
+"""
+import json
+
+from app import app as flask_app, logger
+from config import Config
+from services import chat_async
+
+
+def _missing(package):
+    return ImportError(f"ASGI 入口缺少依赖 {package}，请执行 pip install -r requirements-async.txt")
+
+
+if chat_async.aiohttp is None:
+    raise _missing('aiohttp')
+
+try:
+    from a2wsgi import WSGIMiddleware
+except ImportError:
+    raise _missing('a2wsgi') from None
+
+_wsgi = WSGIMiddleware(flask_app, workers=Config.ASYNC_WSGI_THREADS)
+
+
+async def _read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        chunks.append(message.get('body', b''))
+        if not message.get('more_body'):
+            return b''.join(chunks)
+
+
+async def _send_json(send, body, status):
+    # 与 Flask 的 jsonify 使用同一个 JSON 编码器，响应字节一致
+    payload = flask_app.json.response(body).get_data()
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(payload)).encode()),
+            (b'access-control-allow-origin', b'*'),
+        ],
+    })
+    await send({'type': 'http.response.body', 'body': payload})
+
+
+async def _chat(receive, send):
+    body = await _read_body(receive)
+    try:
+        data = json.loads(body) if body else None
+    except ValueError:
+        data = None
+    result, status = await chat_async.chat(data)
+    await _send_json(send, result, status)
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await chat_async.async_ai_service.aclose()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        return await _lifespan(receive, send)
+    if scope['type'] == 'http' and scope['method'] == 'POST' and scope['path'] == '/api/chat':
+        return await _chat(receive, send)
+    return await _wsgi(scope, receive, send)
+
+
+if __name__ == '__main__':
+    try:
+        import uvicorn
+    except ImportError:
+        raise _missing('uvicorn') from None
+
+    logger.info("=" * 60)
+    logger.info("🚀 小聚AI助手启动中（ASGI 异步模式）...")
+    logger.info(f"📦 数据库: {Config.DB_NAME}")
+    logger.info(f"🌐 端口: 5000")
+    logger.info("=" * 60)
+    uvicorn.run(app, host='0.0.0.0', port=5000, log_level='warning')
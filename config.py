@@ -23,19 +23,100 @@ class Config:
     DEEPSEEK_API_KEY = os.getenv('DEEPSEEK_API_KEY', '')
     DEEPSEEK_API_URL = os.getenv('DEEPSEEK_API_URL', 'https://api.deepseek.com/chat/completions')
     DEEPSEEK_MODEL = os.getenv('DEEPSEEK_MODEL', 'deepseek-chat')
+    AI_POOL_SIZE = int(os.getenv('AI_POOL_SIZE', '10'))  # 到 AI 服务的最大保持连接数
+    AI_CONNECT_TIMEOUT = float(os.getenv('AI_CONNECT_TIMEOUT', '5'))  # 秒
+    AI_READ_TIMEOUT = float(os.getenv('AI_READ_TIMEOUT', '30'))  # 秒
+    AI_MAX_RETRIES = int(os.getenv('AI_MAX_RETRIES', '2'))  # 429/5xx/连接错误的重试次数
+    AI_RETRY_BACKOFF = float(os.getenv('AI_RETRY_BACKOFF', '0.5'))  # 秒，指数退避基数
+    
+    # 异步对话路径（asgi.py）
+    AI_ASYNC_MAX_CONNECTIONS = int(os.getenv('AI_ASYNC_MAX_CONNECTIONS', '256'))  # 到 AI 服务的最大并发连接数，即同时进行的 AI 调用上限
+    ASYNC_DB_THREADS = int(os.getenv('ASYNC_DB_THREADS', '16'))  # 执行数据库调用的线程数
+    ASYNC_WSGI_THREADS = int(os.getenv('ASYNC_WSGI_THREADS', '64'))  # 其余接口交给 Flask 处理的线程数（含 SSE 长连接）
     
     # 缓存配置
-    QA_CACHE_MAX_SIZE = int(os.getenv('QA_CACHE_MAX_SIZE', '1000'))
+    QA_CACHE_MAX_SIZE = int(os.getenv('QA_CACHE_MAX_SIZE', '1000'))  # 进程内 L1 容量
+    QA_CACHE_L2_MAX_SIZE = int(os.getenv('QA_CACHE_L2_MAX_SIZE', str(QA_CACHE_MAX_SIZE)))  # qa_cache 表保留条数
+    QA_CACHE_FLUSH_INTERVAL = float(os.getenv('QA_CACHE_FLUSH_INTERVAL', '1'))  # 秒，L2 批量写入间隔
+    QA_CACHE_CLEAN_INTERVAL = float(os.getenv('QA_CACHE_CLEAN_INTERVAL', '300'))  # 秒，L2 淘汰间隔
+    QA_CACHE_FLUSH_MAX_ATTEMPTS = int(os.getenv('QA_CACHE_FLUSH_MAX_ATTEMPTS', '5'))  # L2 写入连续失败次数上限，超过后丢弃
+    SESSION_CACHE_MAX_SIZE = int(os.getenv('SESSION_CACHE_MAX_SIZE', '512'))  # 会话上下文缓存条数
+    SESSION_CACHE_TTL = int(os.getenv('SESSION_CACHE_TTL', '300'))  # 秒，兜底其它进程对会话的修改
+    FAQ_INDEX_TTL = int(os.getenv('FAQ_INDEX_TTL', '60'))  # 秒，兜底其它进程对白名单的修改
+    FAQ_INDEX_MAX_SESSIONS = int(os.getenv('FAQ_INDEX_MAX_SESSIONS', '256'))
+    BLACKLIST_INDEX_TTL = int(os.getenv('BLACKLIST_INDEX_TTL', '30'))  # 秒，新增黑名单最迟在该时间后对其它进程生效
+    BLACKLIST_INDEX_MAX_SESSIONS = int(os.getenv('BLACKLIST_INDEX_MAX_SESSIONS', '256'))
+    BULLET_CLASSIFIER_MAX_SESSIONS = int(os.getenv('BULLET_CLASSIFIER_MAX_SESSIONS', '256'))  # 会话级弹幕分类器缓存条数
+    HIT_FLUSH_INTERVAL = float(os.getenv('HIT_FLUSH_INTERVAL', '2'))  # 秒，命中计数批量写库间隔
+    
+    # 弹幕入队合并写入
+    BULLET_BATCH_MAX = int(os.getenv('BULLET_BATCH_MAX', '200'))  # 单条 INSERT 最多合并的弹幕数
+    BULLET_BATCH_WAIT = float(os.getenv('BULLET_BATCH_WAIT', '0'))  # 秒，批次未满时额外等待，0 为不等待
+    BULLET_BULK_MAX = int(os.getenv('BULLET_BULK_MAX', '500'))  # 批量接口单次最多弹幕数
+    BULLET_CLUSTER_WINDOW = float(os.getenv('BULLET_CLUSTER_WINDOW', '10'))  # 秒，窗口内的同一问题只入队一条，0 关闭去重
+    BULLET_CLUSTER_SIMILARITY = float(os.getenv('BULLET_CLUSTER_SIMILARITY', '0.7'))  # 近似匹配阈值，1 只做精确匹配
+    BULLET_CLUSTER_MAX = int(os.getenv('BULLET_CLUSTER_MAX', '200'))  # 每个会话保留的簇数
+    BULLET_CLUSTER_FLUSH_INTERVAL = float(os.getenv('BULLET_CLUSTER_FLUSH_INTERVAL', '1'))  # 秒，簇计数写库间隔
+    BULLET_LEASE_SECONDS = int(os.getenv('BULLET_LEASE_SECONDS', '30'))  # 领取弹幕的租约时长，到期未确认可被重新领取
+    BULLET_MAX_ATTEMPTS = int(os.getenv('BULLET_MAX_ATTEMPTS', '3'))  # 领取次数达到上限仍失败则转入死信
+    BULLET_CLAIM_MAX = int(os.getenv('BULLET_CLAIM_MAX', '100'))  # 单次最多领取条数
+    
+    # 弹幕自动应答（后台线程池消费弹幕队列并推送答案）
+    BULLET_WORKER_ENABLED = os.getenv('BULLET_WORKER_ENABLED', 'false').lower() == 'true'
+    BULLET_WORKER_THREADS = int(os.getenv('BULLET_WORKER_THREADS', '8'))  # 工作线程数，所有会话共享
+    BULLET_WORKER_SESSION_CONCURRENCY = int(os.getenv('BULLET_WORKER_SESSION_CONCURRENCY', '2'))  # 单会话同时处理的批次数
+    BULLET_WORKER_AI_CONCURRENCY = int(os.getenv('BULLET_WORKER_AI_CONCURRENCY', '4'))  # 全局同时进行的 AI 调用数
+    BULLET_WORKER_CLAIM_BATCH = int(os.getenv('BULLET_WORKER_CLAIM_BATCH', '1'))  # 每次领取条数，1 严格按优先级
+    BULLET_WORKER_LEASE_SECONDS = int(os.getenv('BULLET_WORKER_LEASE_SECONDS', '120'))  # 调用 AI 前会自动延长到覆盖 AI 超时与重试总时长
+    BULLET_WORKER_POLL_INTERVAL = float(os.getenv('BULLET_WORKER_POLL_INTERVAL', '10'))  # 秒，兜底轮询间隔
+    
+    # 会话事件推送（SSE）
+    EVENT_QUEUE_MAX = int(os.getenv('EVENT_QUEUE_MAX', '256'))  # 每个订阅者最多积压的事件数
+    EVENT_HEARTBEAT = float(os.getenv('EVENT_HEARTBEAT', '15'))  # 秒，空闲时发送心跳注释，及时发现断开的连接
+    EVENT_SNAPSHOT_LIMIT = int(os.getenv('EVENT_SNAPSHOT_LIMIT', '50'))  # 订阅时先推送的待处理弹幕条数
+    EVENT_BUS_URL = os.getenv('EVENT_BUS_URL', '')  # 多进程部署时的跨进程总线：redis://127.0.0.1:6379 或 unix:///path，空为单进程
+    EVENT_BUS_CHANNEL = os.getenv('EVENT_BUS_CHANNEL', 'xiaoju:events')
+    EVENT_BUS_MAX_PENDING = int(os.getenv('EVENT_BUS_MAX_PENDING', '10000'))  # 总线断开期间最多积压的待转发事件
+    
+    # WebSocket 广播（可选，需要安装 websockets）
+    WS_ENABLED = os.getenv('WS_ENABLED', 'false').lower() == 'true'
+    WS_HOST = os.getenv('WS_HOST', '127.0.0.1')
+    WS_PORT = int(os.getenv('WS_PORT', '6789'))
+    WS_CLIENT_QUEUE_MAX = int(os.getenv('WS_CLIENT_QUEUE_MAX', '256'))  # 每个连接最多积压的消息数，超出丢弃最旧的
+    WS_SEND_TIMEOUT = float(os.getenv('WS_SEND_TIMEOUT', '5'))  # 秒，单条消息发送超时即断开该连接
+    WS_BATCH_MS = float(os.getenv('WS_BATCH_MS', '20'))  # 紧凑格式合并发送窗口（毫秒）
+    WS_BATCH_MAX = int(os.getenv('WS_BATCH_MAX', '50'))  # 紧凑格式单帧最多事件数，攒够立即发送
+    
+    # 对话记录批量写入
+    CONVERSATION_BATCH_SIZE = int(os.getenv('CONVERSATION_BATCH_SIZE', '100'))  # 攒够该条数立即写库
+    CONVERSATION_BUFFER_MAX = int(os.getenv('CONVERSATION_BUFFER_MAX', '5000'))  # 写缓冲上限
+    CONVERSATION_FLUSH_INTERVAL = float(os.getenv('CONVERSATION_FLUSH_INTERVAL', '1'))  # 秒，最长写库间隔
+    CONVERSATION_READ_WAIT = float(os.getenv('CONVERSATION_READ_WAIT', '0.5'))  # 秒，读历史时等待本会话缓冲对话落库的上限
+    
+    # TTS配置
+    TTS_WORKERS = int(os.getenv('TTS_WORKERS', '2'))  # 后台合成线程数
+    TTS_MAX_PENDING = int(os.getenv('TTS_MAX_PENDING', '32'))  # 排队上限，超出则本次不合成语音
+    TTS_AUDIO_MAX_MB = int(os.getenv('TTS_AUDIO_MAX_MB', '500'))  # static/audio 总大小上限，0 不限
+    TTS_AUDIO_MAX_FILES = int(os.getenv('TTS_AUDIO_MAX_FILES', '5000'))  # 音频文件数上限，0 不限
+    TTS_SENTENCE_CHUNKS = os.getenv('TTS_SENTENCE_CHUNKS', 'true').lower() == 'true'  # 流式对话按句合成语音
+    TTS_CHUNK_MIN_CHARS = int(os.getenv('TTS_CHUNK_MIN_CHARS', '8'))  # 短句与下一句合并
+    TTS_CHUNK_MAX_CHARS = int(os.getenv('TTS_CHUNK_MAX_CHARS', '120'))  # 长句在逗号处再切分
+    TTS_PREWARM_CONCURRENCY = int(os.getenv('TTS_PREWARM_CONCURRENCY', '2'))  # FAQ 语音预热并发数
+    TTS_PREWARM_RATE = float(os.getenv('TTS_PREWARM_RATE', '5'))  # FAQ 语音预热每秒最多合成次数
+    TTS_AUDIO_SWEEP_INTERVAL = float(os.getenv('TTS_AUDIO_SWEEP_INTERVAL', '300'))  # 秒，音频目录清理间隔
     
     # 文件路径
     BASE_DIR = os.path.dirname(os.path.abspath(__file__))
     DATA_DIR = os.path.join(BASE_DIR, 'data')
     LOGS_DIR = os.path.join(BASE_DIR, 'logs')
+    AUDIO_DIR = os.path.join(BASE_DIR, 'static', 'audio')
     
     BLACKLIST_FILE = os.path.join(DATA_DIR, 'blacklist.json')
     WHITELIST_FILE = os.path.join(DATA_DIR, 'whitelist.json')
     IRRELEVANT_BLACKLIST_FILE = os.path.join(DATA_DIR, 'irrelevant_blacklist.json')
     IRRELEVANT_COUNTS_FILE = os.path.join(DATA_DIR, 'irrelevant_counts.json')
+    # 数据库不可用时对话记录的溢出文件（JSON Lines），设为空字符串则不溢出、只在内存中重试
+    CONVERSATION_SPILL_FILE = os.getenv('CONVERSATION_SPILL_FILE', os.path.join(DATA_DIR, 'conversation_spill.jsonl'))
     
     # 日志配置
     LOG_MAX_BYTES = 10 * 1024 * 1024  # 10MB
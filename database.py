@@ -4,19 +4,54 @@ from mysql.connector import pooling
 import os
 import json
 import logging
+import threading
+import time
+import uuid
+from datetime import datetime
 from dotenv import load_dotenv
+from config import Config
+from utils.ac_automaton import AhoCorasick
+from utils.batch_writer import BatchWriter
+from utils.bullet_classifier import BulletClassifier, default_classifier
+from utils.bullet_cluster import BulletClusterer
+from utils.faq_index import FaqIndex
+from utils.helpers import normalize_question, calculate_hash
+from utils.hit_counter import HitCounter
+from utils.lru_cache import LRUCache
+from utils.micro_batcher import MicroBatcher
+from utils.periodic import PeriodicTask
 
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+
+def _question_key(question):
+    """问题归一化（去除标点、语气词、统一疑问词）
+    
+    Returns:
+        tuple: (归一化后的问题, 归一化问题的 sha256)
+    """
+    normalized = normalize_question(question)
+    return normalized, calculate_hash(normalized)
+
+
 class Database:
+    # 支持批量命中计数的表 -> 最后命中时间字段
+    HIT_TIME_COLUMNS = {
+        'whitelist': 'last_hit_at',
+        'qa_cache': 'last_used_at',
+    }
+
     def __init__(self):
         self.host = os.getenv('DB_HOST', 'localhost')
         self.user = os.getenv('DB_USER', 'root')
         self.password = os.getenv('DB_PASSWORD', '')
         self.database = os.getenv('DB_NAME', 'live_assistant')
         
+        # 多行 INSERT 的自增 id 是否连续（init_tables 时检测，None 表示尚未检测）
+        self._autoinc_consecutive = None
+        
         # 使用连接池
         try:
             self.pool = pooling.MySQLConnectionPool(
@@ -39,6 +74,60 @@ class Database:
         self.blacklist_file = os.path.join(os.path.dirname(__file__), 'data', 'blacklist.json')
         self.whitelist_file = os.path.join(os.path.dirname(__file__), 'data', 'whitelist.json')
 
+        # 敏感词自动机缓存：(文件mtime, 原始词表, 自动机)，整体替换保证读取方看到一致的快照
+        self._sensitive_matcher = None
+        self._sensitive_lock = threading.Lock()
+
+        # 会话级 FAQ 索引缓存：session_id -> (白名单文件mtime, 构建时间, 文件索引, 数据库索引)
+        self._faq_indexes = LRUCache(Config.FAQ_INDEX_MAX_SESSIONS)
+
+        # FAQ/缓存命中计数在内存中聚合，由后台线程批量写库
+        self.hit_counter = HitCounter(self._flush_hit_counts, interval=Config.HIT_FLUSH_INTERVAL)
+
+        # 对话记录 write-behind：save_conversation 只入缓冲，由后台线程批量 INSERT
+        self.conversation_writer = BatchWriter(
+            self._insert_conversations,
+            batch_size=Config.CONVERSATION_BATCH_SIZE,
+            max_buffer=Config.CONVERSATION_BUFFER_MAX,
+            interval=Config.CONVERSATION_FLUSH_INTERVAL,
+            spill_file=Config.CONVERSATION_SPILL_FILE or None,
+            name='conversation-writer'
+        )
+
+        # 弹幕入队：并发的单条写入合并成多行 INSERT，调用方仍拿到各自的自增 id
+        self.bullet_batcher = MicroBatcher(self.add_bullet_screens, max_batch=Config.BULLET_BATCH_MAX,
+                                           max_wait=Config.BULLET_BATCH_WAIT, name='bullet-writer')
+
+        # 弹幕去重聚类：窗口内同一问题只有代表入队，其余弹幕的计数异步累加到代表的 cluster_count 与 priority
+        self.bullet_cluster_counter = HitCounter(self._flush_bullet_cluster_counts,
+                                                 interval=Config.BULLET_CLUSTER_FLUSH_INTERVAL)
+        self.bullet_clusters = BulletClusterer(
+            window=Config.BULLET_CLUSTER_WINDOW,
+            similarity=Config.BULLET_CLUSTER_SIMILARITY,
+            max_clusters=Config.BULLET_CLUSTER_MAX,
+            max_sessions=Config.FAQ_INDEX_MAX_SESSIONS,
+            on_join=lambda bullet_id, n: self.bullet_cluster_counter.record('bullet_screen_queue', bullet_id, n)
+        )
+
+        # 会话级弹幕分类器：session_id -> (会话上下文, 文件FAQ索引, 数据库FAQ索引, 分类器)，依赖对象变化时重建，
+        # 因此新鲜度随会话上下文缓存与 FAQ 索引（SESSION_CACHE_TTL / FAQ_INDEX_TTL 及其失效调用），只有容量单独配置
+        self._bullet_classifiers = LRUCache(Config.BULLET_CLASSIFIER_MAX_SESSIONS)
+
+        # 会话级黑名单索引：session_id -> (黑名单文件mtime, 构建时间, 用户名集合, 消息模式自动机)
+        self._blacklist_indexes = LRUCache(Config.BLACKLIST_INDEX_MAX_SESSIONS)
+
+        # 会话上下文缓存：session_id -> (加载时间, 上下文)；本进程写入时显式失效，TTL 兜底其它进程的修改
+        self._session_cache = LRUCache(Config.SESSION_CACHE_MAX_SIZE)
+
+        # 问答缓存：进程内 L1 LRU + MySQL qa_cache 表(L2)；L2 写入与淘汰由后台任务完成
+        self.qa_l1 = LRUCache(Config.QA_CACHE_MAX_SIZE)
+        self._qa_pending = {}  # (session_id, question_hash) -> {'question', 'answer', 'count'}
+        self._qa_lock = threading.Lock()
+        self._qa_l2_stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'writes': 0, 'dropped': 0}
+        self._qa_flush_task = PeriodicTask(self.flush_qa_cache, Config.QA_CACHE_FLUSH_INTERVAL, name='qa-cache-writer')
+        self._qa_clean_task = PeriodicTask(self._clean_qa_cache, Config.QA_CACHE_CLEAN_INTERVAL,
+                                           name='qa-cache-cleaner', final=lambda: None)
+
     def _load_json_file(self, path):
         try:
             if not os.path.exists(path):
@@ -141,10 +230,23 @@ class Database:
                     user_message TEXT,
                     ai_response TEXT,
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (session_id) REFERENCES sessions(id) ON DELETE CASCADE
+                    FOREIGN KEY (session_id) REFERENCES sessions(id) ON DELETE CASCADE,
+                    INDEX idx_session_id (session_id, id)
                 )
             """)
             
+            # 旧表补充 (session_id, id) 联合索引，供对话历史按 id 游标分页
+            try:
+                cursor.execute(
+                    "SELECT COUNT(*) FROM information_schema.statistics WHERE table_schema = %s AND table_name = 'conversations' AND index_name = 'idx_session_id'",
+                    (self.database,)
+                )
+                if cursor.fetchone()[0] == 0:
+                    cursor.execute("ALTER TABLE conversations ADD INDEX idx_session_id (session_id, id)")
+                    logger.info("✅ 已添加 conversations.idx_session_id 索引")
+            except Exception as e:
+                logger.warning(f"⚠️ 无法添加 conversations 索引: {e}")
+            
             # 创建弹幕队列表
             cursor.execute("""
                 CREATE TABLE IF NOT EXISTS bullet_screen_queue (
@@ -154,16 +256,65 @@ class Database:
                     message TEXT NOT NULL,
                     category VARCHAR(50) DEFAULT 'unknown',
                     priority INT DEFAULT 0,
+                    cluster_count INT DEFAULT 1,
                     is_processed BOOLEAN DEFAULT FALSE,
                     confidence_score FLOAT DEFAULT 0.0,
+                    status VARCHAR(16) DEFAULT 'pending',
+                    attempts INT DEFAULT 0,
+                    lease_token CHAR(32) NULL,
+                    lease_expires_at DATETIME NULL,
+                    last_error VARCHAR(500) NULL,
+                    batch_token CHAR(32) NULL,
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                     processed_at TIMESTAMP NULL,
                     FOREIGN KEY (session_id) REFERENCES sessions(id) ON DELETE CASCADE,
                     INDEX idx_session_processed (session_id, is_processed),
+                    INDEX idx_session_status (session_id, status, priority, id),
+                    INDEX idx_batch_token (batch_token),
                     INDEX idx_created (created_at)
                 )
             """)
             
+            # 为已存在的 bullet_screen_queue 表添加聚类计数与租约字段（status: pending/leased/done/dead）
+            try:
+                lease_columns = [
+                    ('cluster_count', "INT DEFAULT 1 AFTER priority"),
+                    ('status', "VARCHAR(16) DEFAULT 'pending' AFTER confidence_score"),
+                    ('attempts', "INT DEFAULT 0 AFTER status"),
+                    ('lease_token', "CHAR(32) NULL AFTER attempts"),
+                    ('lease_expires_at', "DATETIME NULL AFTER lease_token"),
+                    ('last_error', "VARCHAR(500) NULL AFTER lease_expires_at"),
+                    ('batch_token', "CHAR(32) NULL AFTER last_error"),
+                ]
+                for column, definition in lease_columns:
+                    cursor.execute(
+                        "SELECT COUNT(*) FROM information_schema.columns WHERE table_schema = %s AND table_name = 'bullet_screen_queue' AND column_name = %s",
+                        (self.database, column)
+                    )
+                    if cursor.fetchone()[0] == 0:
+                        cursor.execute(f"ALTER TABLE bullet_screen_queue ADD COLUMN {column} {definition}")
+                        if column == 'status':
+                            cursor.execute("UPDATE bullet_screen_queue SET status = 'done' WHERE is_processed = TRUE")
+                        logger.info(f"✅ 已添加 bullet_screen_queue.{column} 字段")
+                cursor.execute(
+                    "SELECT COUNT(*) FROM information_schema.statistics WHERE table_schema = %s AND table_name = 'bullet_screen_queue' AND index_name = 'idx_session_status'",
+                    (self.database,)
+                )
+                if cursor.fetchone()[0] == 0:
+                    cursor.execute("ALTER TABLE bullet_screen_queue ADD INDEX idx_session_status (session_id, status, priority, id)")
+                    logger.info("✅ 已添加 bullet_screen_queue.idx_session_status 索引")
+                cursor.execute(
+                    "SELECT COUNT(*) FROM information_schema.statistics WHERE table_schema = %s AND table_name = 'bullet_screen_queue' AND index_name = 'idx_batch_token'",
+                    (self.database,)
+                )
+                if cursor.fetchone()[0] == 0:
+                    cursor.execute("ALTER TABLE bullet_screen_queue ADD INDEX idx_batch_token (batch_token)")
+                    logger.info("✅ 已添加 bullet_screen_queue.idx_batch_token 索引")
+            except Exception as e:
+                logger.warning(f"⚠️ 无法添加 bullet_screen_queue 字段: {e}")
+            
+            self._autoinc_consecutive = self._check_autoinc_consecutive(cursor)
+            
             # 黑名单与白名单表：用于弹幕处理流水线
             cursor.execute("""
                 CREATE TABLE IF NOT EXISTS blacklist (
@@ -361,6 +512,7 @@ class Database:
                 )
             
             conn.commit()
+            self.invalidate_session(session_id)
             logger.info(f"会话创建成功 - ID: {session_id}, 商品数量: {len(products)}")
             
             return True
@@ -459,6 +611,8 @@ class Database:
                     continue
             
             conn.commit()
+            if applied_count:
+                self.invalidate_whitelist_index(session_id)
             logger.info(f"✅ 为会话 {session_id} 应用了 {applied_count} 条FAQ，跳过 {skipped_count} 条（缺少参数）")
             
             return applied_count
@@ -476,17 +630,10 @@ class Database:
         Returns:
             set: 商品类型集合，如 {'fruit', 'vegetable'}
         """
-        session = self.get_session(session_id)
-        if not session or 'products' not in session:
+        ctx = self.get_session_context(session_id)
+        if not ctx:
             return set()
-        
-        product_types = set()
-        for product in session['products']:
-            product_type = product.get('product_type')
-            if product_type:
-                product_types.add(product_type)
-        
-        return product_types
+        return set(ctx['product_types'])
     
     def _check_product_type_match(self, item_types, session_product_types):
         """检查白名单条目的商品类型是否与会话商品类型匹配
@@ -517,7 +664,38 @@ class Database:
         
         return False
 
-    def get_session(self, session_id):
+    def get_session(self, session_id, include_history=False, history_limit=50):
+        """获取会话信息（主播、主题、商品）
+        
+        Args:
+            session_id: 会话ID
+            include_history: 是否附带对话历史（默认不加载）
+            history_limit: 附带的最近对话条数
+        
+        Returns:
+            dict: 会话信息，不存在或查询失败返回 None
+        """
+        ctx = self.get_session_context(session_id)
+        if not ctx:
+            return None
+        
+        session = dict(ctx)
+        if include_history:
+            session['conversations'] = self.get_conversations(session_id, limit=history_limit)
+        return session
+    
+    def get_session_context(self, session_id):
+        """获取会话上下文（会话字段 + products + product_types），带进程内缓存
+        
+        聊天提示词、FAQ 商品类型过滤等热路径使用；返回的 dict 被多个请求共享，调用方不得修改。
+        
+        Returns:
+            dict: 会话上下文，不存在或查询失败返回 None
+        """
+        cached = self._session_cache.get(session_id)
+        if cached is not None and time.monotonic() - cached[0] < Config.SESSION_CACHE_TTL:
+            return cached[1]
+        
         conn = None
         try:
             conn = self.get_connection()
@@ -529,18 +707,17 @@ class Database:
             # 获取会话信息
             cursor.execute("SELECT * FROM sessions WHERE id = %s", (session_id,))
             session = cursor.fetchone()
+            if not session:
+                self._session_cache.pop(session_id)
+                return None
             
-            if session:
-                # 获取商品信息
-                cursor.execute("SELECT * FROM products WHERE session_id = %s", (session_id,))
-                products = cursor.fetchall()
-                session['products'] = products
-                
-                # 获取对话历史
-                cursor.execute("SELECT * FROM conversations WHERE session_id = %s ORDER BY created_at", (session_id,))
-                conversations = cursor.fetchall()
-                session['conversations'] = conversations
+            # 获取商品信息
+            cursor.execute("SELECT * FROM products WHERE session_id = %s", (session_id,))
+            products = cursor.fetchall()
+            session['products'] = products
+            session['product_types'] = sorted({p['product_type'] for p in products if p.get('product_type')})
             
+            self._session_cache.set(session_id, (time.monotonic(), session))
             return session
         except Error as e:
             logger.error(f"❌ 获取会话失败: {e}")
@@ -548,21 +725,116 @@ class Database:
         finally:
             if conn:
                 conn.close()
+    
+    def session_exists(self, session_id):
+        """判断会话是否存在（缓存命中时不访问数据库）"""
+        if self._session_cache.peek(session_id) is not None:
+            return True
+        
+        conn = None
+        try:
+            conn = self.get_connection()
+            if not conn:
+                return False
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1 FROM sessions WHERE id = %s LIMIT 1", (session_id,))
+            return cursor.fetchone() is not None
+        except Error as e:
+            logger.error(f"❌ 查询会话失败: {e}")
+            return False
+        finally:
+            if conn:
+                conn.close()
+    
+    def invalidate_session(self, session_id):
+        """会话或其商品写入后调用：丢弃会话上下文缓存及依赖商品类型的 FAQ 索引"""
+        self._session_cache.pop(session_id)
+        self.invalidate_whitelist_index(session_id)
+    
+    def get_conversations(self, session_id, after_id=None, limit=50):
+        """获取会话对话历史（按 id 游标分页，走 (session_id, id) 索引）
+        
+        Args:
+            session_id: 会话ID
+            after_id: 返回 id 大于它的对话（正序）；None 时返回最近 limit 条（同样正序）
+            limit: 条数上限
+        
+        Returns:
+            list: 对话记录；失败返回空列表
+        """
+        # 本会话有尚未落库的对话时等后台线程写完（限时），保证刚保存的对话能被读到；读请求本身不写库
+        self.conversation_writer.wait_flushed(lambda row: row['session_id'] == session_id,
+                                              Config.CONVERSATION_READ_WAIT)
+        
+        conn = None
+        try:
+            conn = self.get_connection()
+            if not conn:
+                return []
+            cursor = conn.cursor(dictionary=True)
+            if after_id is None:
+                cursor.execute(
+                    "SELECT * FROM (SELECT * FROM conversations WHERE session_id = %s ORDER BY id DESC LIMIT %s) t ORDER BY id",
+                    (session_id, int(limit))
+                )
+            else:
+                cursor.execute(
+                    "SELECT * FROM conversations WHERE session_id = %s AND id > %s ORDER BY id LIMIT %s",
+                    (session_id, int(after_id), int(limit))
+                )
+            return cursor.fetchall()
+        except Error as e:
+            logger.error(f"❌ 获取对话历史失败: {e}")
+            return []
+        finally:
+            if conn:
+                conn.close()
 
     def save_conversation(self, session_id, user_message, ai_response):
+        """保存一轮对话（放入写缓冲，由后台批量写库，调用方不等待数据库提交）"""
+        self.conversation_writer.put({
+            'session_id': session_id,
+            'user_message': user_message,
+            'ai_response': ai_response,
+            'created_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        })
+        logger.debug(f"对话已加入写缓冲 - 会话ID: {session_id}")
+        return True
+    
+    def _insert_conversations(self, rows):
+        """把一批对话以多行 INSERT 写库（conversation_writer 的 flush 回调）
+        
+        整批因外键等约束失败时逐条重试，跳过无法写入的行，避免一条坏数据卡住整批。
+        
+        Returns:
+            bool: 是否写入成功（连接失败等可重试错误返回 False）
+        """
         conn = None
         try:
             conn = self.get_connection()
             if not conn:
                 return False
-                
             cursor = conn.cursor()
-            cursor.execute(
-                "INSERT INTO conversations (session_id, user_message, ai_response) VALUES (%s, %s, %s)",
-                (session_id, user_message, ai_response)
-            )
-            conn.commit()
-            logger.debug(f"对话已保存 - 会话ID: {session_id}")
+            sql = "INSERT INTO conversations (session_id, user_message, ai_response, created_at) VALUES "
+            try:
+                for start in range(0, len(rows), 500):
+                    chunk = rows[start:start + 500]
+                    params = []
+                    for row in chunk:
+                        params.extend((row['session_id'], row['user_message'], row['ai_response'], row['created_at']))
+                    cursor.execute(sql + ','.join(['(%s, %s, %s, %s)'] * len(chunk)), tuple(params))
+                conn.commit()
+            except mysql.connector.IntegrityError as e:
+                conn.rollback()
+                logger.warning(f"⚠️ 批量保存对话失败，改为逐条写入: {e}")
+                for row in rows:
+                    try:
+                        cursor.execute(sql + '(%s, %s, %s, %s)',
+                                       (row['session_id'], row['user_message'], row['ai_response'], row['created_at']))
+                    except mysql.connector.IntegrityError as row_error:
+                        logger.error(f"❌ 丢弃无法保存的对话 - 会话ID: {row['session_id']}: {row_error}")
+                conn.commit()
+            logger.debug(f"对话已批量保存 - {len(rows)} 条")
             return True
         except Error as e:
             logger.error(f"❌ 保存对话失败: {e}")
@@ -571,171 +843,374 @@ class Database:
             if conn:
                 conn.close()
     
-    def add_bullet_screen(self, session_id, username, message, category='unknown', priority=0):
-        """添加弹幕到队列"""
+    def get_conversation_writer_stats(self):
+        """对话写缓冲的深度、写入次数与耗时"""
+        return self.conversation_writer.stats()
+    
+    def add_bullet_screen(self, session_id, username, message, category='unknown', priority=0, confidence_score=0.0):
+        """添加弹幕到队列（与其它并发写入合并成批量 INSERT），返回弹幕 id，失败返回 None"""
+        try:
+            return self.bullet_batcher.submit({
+                'session_id': session_id,
+                'username': username,
+                'message': message,
+                'category': category,
+                'priority': priority,
+                'confidence_score': confidence_score,
+            })
+        except Exception as e:
+            logger.error(f"❌ 添加弹幕失败: {e}")
+            return None
+
+    def add_bullet_screens(self, bullets):
+        """批量添加弹幕，单条多行 INSERT
+        
+        Args:
+            bullets: [{'session_id', 'username', 'message', 'category', 'priority', 'confidence_score'}, ...]
+        
+        Returns:
+            list: 与 bullets 等长的弹幕 id 列表，写入失败的位置为 None
+        """
+        if not bullets:
+            return []
         conn = None
         try:
             conn = self.get_connection()
             if not conn:
-                return None
-                
+                return [None] * len(bullets)
+            
             cursor = conn.cursor()
-            cursor.execute(
-                "INSERT INTO bullet_screen_queue (session_id, username, message, category, priority) VALUES (%s, %s, %s, %s, %s)",
-                (session_id, username, message, category, priority)
-            )
-            conn.commit()
-            return cursor.lastrowid
+            if self._autoinc_consecutive is None:
+                self._autoinc_consecutive = self._check_autoinc_consecutive(cursor)
+            sql = "INSERT INTO bullet_screen_queue (session_id, username, message, category, priority, confidence_score) VALUES "
+            rows = [(b['session_id'], b.get('username'), b['message'], b.get('category') or 'unknown',
+                     b.get('priority') or 0, b.get('confidence_score') or 0.0)
+                    for b in bullets]
+            try:
+                ids = []
+                for start in range(0, len(rows), 500):
+                    chunk = rows[start:start + 500]
+                    if self._autoinc_consecutive:
+                        cursor.execute(sql + ','.join(['(%s, %s, %s, %s, %s, %s)'] * len(chunk)),
+                                       tuple(v for row in chunk for v in row))
+                        # 多行 INSERT 分配连续的自增 id，lastrowid 为第一行的 id
+                        ids.extend(range(cursor.lastrowid, cursor.lastrowid + len(chunk)))
+                    else:
+                        # id 可能不连续：每批带一个令牌写入，再按令牌读回（同一语句内 id 随行序递增）
+                        token = uuid.uuid4().hex
+                        cursor.execute(
+                            "INSERT INTO bullet_screen_queue (session_id, username, message, category, priority, "
+                            "confidence_score, batch_token) VALUES " + ','.join(['(%s, %s, %s, %s, %s, %s, %s)'] * len(chunk)),
+                            tuple(v for row in chunk for v in row + (token,))
+                        )
+                        cursor.execute("SELECT id FROM bullet_screen_queue WHERE batch_token = %s ORDER BY id", (token,))
+                        ids.extend(rid for (rid,) in cursor.fetchall())
+                conn.commit()
+                return ids
+            except mysql.connector.IntegrityError as e:
+                # 批内有无效会话等坏数据：回滚后逐条写入，只让坏数据失败
+                conn.rollback()
+                logger.warning(f"⚠️ 批量添加弹幕失败，改为逐条写入: {e}")
+                ids = []
+                for row in rows:
+                    try:
+                        cursor.execute(sql + '(%s, %s, %s, %s, %s, %s)', row)
+                        ids.append(cursor.lastrowid)
+                    except mysql.connector.IntegrityError as row_error:
+                        logger.error(f"❌ 添加弹幕失败 - 会话: {row[0]}: {row_error}")
+                        ids.append(None)
+                conn.commit()
+                return ids
         except Error as e:
-            logger.error(f"❌ 添加弹幕失败: {e}")
-            return None
+            logger.error(f"❌ 批量添加弹幕失败: {e}")
+            return [None] * len(bullets)
         finally:
             if conn:
                 conn.close()
 
-    # ============ 黑白名单相关方法 ============
-    def is_blacklisted(self, session_id, username, message):
-        """检查弹幕是否命中黑名单（基于用户名或消息内容的简单子串匹配）"""
-        # 先从文件读取（若配置了文件），文件格式: { session_id: [ {"pattern":"...","type":"message"}, ... ] }
+    def _check_autoinc_consecutive(self, cursor):
+        """多行 INSERT 的自增 id 是否一定连续：要求步长为 1 且自增锁模式为 0/1（模式 2 下并发插入会交错分配）"""
         try:
-            data = self._load_json_file(self.blacklist_file)
-            session_list = data.get(session_id) or []
-            for item in session_list:
-                p = item.get('pattern')
-                t = item.get('type', 'message')
-                if t == 'username' and p == username:
-                    return True
-                if t == 'message' and p and p.lower() in (message or '').lower():
-                    return True
-        except Exception:
-            # 如果文件读取异常，继续回退到数据库查询
-            logger.debug("黑名单文件读取异常，回退到数据库查询")
+            cursor.execute("SELECT @@auto_increment_increment, @@innodb_autoinc_lock_mode")
+            increment, lock_mode = cursor.fetchone()
+        except Error as e:
+            logger.warning(f"⚠️ 无法读取自增配置，批量添加弹幕改为按令牌读回 id: {e}")
+            return False
+        consecutive = int(increment) == 1 and int(lock_mode) in (0, 1)
+        if not consecutive:
+            logger.info(f"自增步长 {increment}、锁模式 {lock_mode}：批量添加弹幕按令牌读回 id")
+        return consecutive
 
-        # 回退到数据库查询
+    def _flush_bullet_cluster_counts(self, table, deltas):
+        """把同簇弹幕数累加到代表的 cluster_count 与 priority（bullet_cluster_counter 的 flush 回调）
+        
+        Args:
+            table: 固定为 bullet_screen_queue
+            deltas: {代表弹幕id: (新增同簇弹幕数, 最后加入时间)}
+        
+        Returns:
+            bool: 是否写入成功
+        """
         conn = None
         try:
             conn = self.get_connection()
             if not conn:
                 return False
             cursor = conn.cursor()
-            # 检查按用户名的黑名单
-            cursor.execute("SELECT COUNT(*) FROM blacklist WHERE session_id = %s AND type = 'username' AND pattern = %s", (session_id, username))
-            if cursor.fetchone()[0] > 0:
-                return True
+            items = list(deltas.items())
+            for start in range(0, len(items), 500):
+                chunk = items[start:start + 500]
+                cases = ' '.join(['WHEN %s THEN %s'] * len(chunk))
+                params = [v for rid, (delta, _) in chunk for v in (rid, delta)]
+                cursor.execute(
+                    f"UPDATE {table} SET cluster_count = cluster_count + CASE id {cases} ELSE 0 END, "
+                    f"priority = priority + CASE id {cases} ELSE 0 END "
+                    f"WHERE id IN ({','.join(['%s'] * len(chunk))})",
+                    tuple(params + params + [rid for rid, _ in chunk])
+                )
+            conn.commit()
+            return True
+        except Error as e:
+            logger.warning(f"批量写入弹幕聚类计数失败: {e}")
+            return False
+        finally:
+            if conn:
+                conn.close()
 
-            # 检查按消息内容的模式（逐行比对）
-            cursor.execute("SELECT pattern FROM blacklist WHERE session_id = %s AND type = 'message'", (session_id,))
-            rows = cursor.fetchall()
-            if rows:
-                for (pattern,) in rows:
-                    if pattern and pattern.lower() in (message or '').lower():
-                        return True
+    def get_bullet_cluster_stats(self):
+        """弹幕去重聚类的簇数与合并比例"""
+        return self.bullet_clusters.stats()
 
-            return False
+    def classify_bullet(self, session_id, message):
+        """规则分类弹幕，返回 (类别, 置信度, 基础优先级)
+        
+        会话商品名与 FAQ 白名单关键词编入会话分类器；会话上下文或 FAQ 索引重建后分类器随之重建。
+        """
+        context = self.get_session_context(session_id)
+        if not context:
+            classifier = default_classifier
+        else:
+            file_index, db_index = self._get_faq_index(session_id)
+            cached = self._bullet_classifiers.get(session_id)
+            if cached is not None and cached[0] is context and cached[1] is file_index and cached[2] is db_index:
+                classifier = cached[3]
+            else:
+                terms = [p.get('product_name') for p in context.get('products') or []]
+                terms.extend(entry['pattern'] for index in (file_index, db_index) for entry in index.entries)
+                classifier = BulletClassifier(terms)
+                self._bullet_classifiers.set(session_id, (context, file_index, db_index, classifier))
+        category, confidence = classifier.classify(message)
+        return category, confidence, classifier.priority(category)
+
+    def get_bullet_writer_stats(self):
+        """弹幕合并写入的批次数与平均批大小"""
+        return self.bullet_batcher.stats()
+
+    # ============ 黑白名单相关方法 ============
+    def is_blacklisted(self, session_id, username, message):
+        """检查弹幕是否命中黑名单（用户名精确匹配或消息内容子串匹配，忽略大小写）
+        
+        黑名单文件与数据库条目合并编译成会话索引并缓存，查询本身不读文件、不访问数据库。
+        """
+        usernames, matcher = self._get_blacklist_index(session_id)
+        if username and username in usernames:
+            return True
+        return bool(message) and matcher.contains_any(message.lower())
+
+    def invalidate_blacklist_index(self, session_id=None):
+        """使会话的黑名单索引失效（blacklist 表写入后调用）；session_id 为 None 时清空全部"""
+        if session_id is None:
+            self._blacklist_indexes.clear()
+        else:
+            self._blacklist_indexes.pop(session_id, None)
+
+    def _get_blacklist_index(self, session_id):
+        """获取会话的 (用户名集合, 消息模式自动机)，文件变更或超过 BLACKLIST_INDEX_TTL 时重建
+        
+        同一进程内的写入通过 invalidate_blacklist_index 立即生效；TTL 兜底其它进程对 blacklist 表的修改。
+        """
+        try:
+            file_mtime = os.stat(self.blacklist_file).st_mtime_ns
+        except OSError:
+            file_mtime = None
+        
+        cached = self._blacklist_indexes.get(session_id)
+        if cached is not None and cached[0] == file_mtime \
+                and time.monotonic() - cached[1] < Config.BLACKLIST_INDEX_TTL:
+            return cached[2], cached[3]
+        
+        # 文件格式: { session_id: [ {"pattern":"...","type":"message"}, ... ] }
+        data = self._load_json_file(self.blacklist_file)
+        items = [(item.get('type', 'message'), item.get('pattern'))
+                 for item in ((data.get(session_id) if isinstance(data, dict) else None) or [])
+                 if isinstance(item, dict)]
+        
+        rows = None
+        conn = None
+        try:
+            conn = self.get_connection()
+            if conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT type, pattern FROM blacklist WHERE session_id = %s", (session_id,))
+                rows = cursor.fetchall()
         except Error as e:
             logger.error(f"❌ 检查黑名单失败: {e}")
-            return False
         finally:
             if conn:
                 conn.close()
+        items.extend(rows or [])
+        
+        usernames = {p for t, p in items if t == 'username' and p}
+        matcher = AhoCorasick([p.lower() for t, p in items if t == 'message' and p])
+        
+        # 数据库读取失败时不缓存，下次请求重试
+        if rows is not None:
+            self._blacklist_indexes.set(session_id, (file_mtime, time.monotonic(), usernames, matcher))
+        return usernames, matcher
 
     def get_whitelist_answer(self, session_id, message):
-        """尝试从白名单匹配一个答案（按优先级和最长匹配），只返回与会话商品类型匹配的答案"""
+        """尝试从白名单匹配一个答案（按优先级和最长匹配），只返回与会话商品类型匹配的答案
         
-        # 首先获取会话的商品类型列表
-        session_product_types = self._get_session_product_types(session_id)
+        白名单文件中该会话的条目优先，未命中再查数据库条目；
+        两者都来自预编译的会话索引，查询本身不访问数据库。
+        """
+        file_index, db_index = self._get_faq_index(session_id)
         
-        # 先从文件读取（若存在）文件格式: { session_id: [ {"pattern":"...","answer":"...","priority":100,"product_types":"fruit"}, ... ] }
-        try:
-            data = self._load_json_file(self.whitelist_file)
-            session_list = data.get(session_id) or []
-            best = None
-            best_score = (-1, -1)  # (priority, pattern_length)
-            for item in session_list:
-                pattern = item.get('pattern')
-                answer = item.get('answer')
-                priority = item.get('priority', 0)
-                item_types = item.get('product_types', '')
-                
-                if not pattern:
-                    continue
-                
-                # 检查商品类型匹配
-                if not self._check_product_type_match(item_types, session_product_types):
-                    continue
-                
-                if pattern.lower() in (message or '').lower():
-                    score = (int(priority), len(pattern))
-                    if score > best_score:
-                        best = answer
-                        best_score = score
-
-            if best:
-                return best
-        except Exception:
-            logger.debug("白名单文件读取异常，回退到数据库查询")
+        entry = file_index.match(message)
+        if entry and entry.get('answer'):
+            return entry['answer']
+        
+        entry = db_index.match(message)
+        if not entry:
+            return None
+        
+        # 数据库条目命中，记录命中统计（异步批量写库）
+        self.hit_counter.record('whitelist', entry['id'])
+        return entry['answer']
+    
+    def get_faq_answers(self, session_id):
+        """返回会话可命中的全部 FAQ 答案（白名单文件与数据库条目，已按商品类型过滤、去重）"""
+        answers = []
+        seen = set()
+        for index in self._get_faq_index(session_id):
+            for entry in index.entries:
+                answer = entry.get('answer')
+                if answer and answer not in seen:
+                    seen.add(answer)
+                    answers.append(answer)
+        return answers
 
-        # 回退到数据库查询
+    def invalidate_whitelist_index(self, session_id=None):
+        """使会话的 FAQ 索引失效（whitelist 表写入后调用）；session_id 为 None 时清空全部"""
+        if session_id is None:
+            self._faq_indexes.clear()
+        else:
+            self._faq_indexes.pop(session_id, None)
+    
+    def _get_faq_index(self, session_id):
+        """获取会话的 (文件索引, 数据库索引)，缓存缺失、白名单文件变更或超过 TTL 时重建
+        
+        同一进程内的写入通过 invalidate_whitelist_index 立即生效；
+        TTL 用于兜底其它进程（如 scripts/import_faqs.py）对 whitelist 表的修改。
+        """
+        try:
+            file_mtime = os.stat(self.whitelist_file).st_mtime_ns
+        except OSError:
+            file_mtime = None
+        
+        cached = self._faq_indexes.get(session_id)
+        if cached is not None and cached[0] == file_mtime \
+                and time.monotonic() - cached[1] < Config.FAQ_INDEX_TTL:
+            return cached[2], cached[3]
+        
+        session_product_types = self._get_session_product_types(session_id)
+        
+        # 白名单文件格式: { session_id: [ {"pattern":"...","answer":"...","priority":100,"product_types":"fruit"}, ... ] }
+        data = self._load_json_file(self.whitelist_file)
+        file_items = data.get(session_id) if isinstance(data, dict) else None
+        file_index = FaqIndex(
+            item for item in (file_items or [])
+            if isinstance(item, dict)
+            and self._check_product_type_match(item.get('product_types', ''), session_product_types)
+        )
+        
+        rows = self._load_whitelist_rows(session_id)
+        db_index = FaqIndex(
+            row for row in (rows or [])
+            if self._check_product_type_match(row['product_types'], session_product_types)
+        )
+        
+        # 数据库读取失败时不缓存，下次请求重试
+        if rows is not None:
+            self._faq_indexes.set(session_id, (file_mtime, time.monotonic(), file_index, db_index))
+            logger.debug(f"FAQ索引已构建 - 会话: {session_id}, 文件条目: {len(file_index)}, 数据库条目: {len(db_index)}")
+        
+        return file_index, db_index
+    
+    def _load_whitelist_rows(self, session_id):
+        """读取会话的全部白名单条目，失败返回 None"""
         conn = None
         try:
             conn = self.get_connection()
             if not conn:
                 return None
             cursor = conn.cursor(dictionary=True)
-            # 取出所有 pattern/answer/priority/product_types/id
             cursor.execute("SELECT id, pattern, answer, priority, product_types FROM whitelist WHERE session_id = %s", (session_id,))
-            rows = cursor.fetchall()
-            if not rows:
-                return None
-
-            # 根据优先级和匹配长度选择最佳答案：优先级越大越先匹配；若优先级相同则以最长 pattern 为准
-            best = None
-            best_score = (-1, -1)  # (priority, pattern_length)
-            best_id = None
-            
-            for row in rows:
-                pattern = row['pattern']
-                answer = row['answer']
-                priority = row['priority']
-                item_types = row['product_types']
-                faq_id = row['id']
-                
-                if not pattern:
-                    continue
-                
-                # 检查商品类型匹配
-                if not self._check_product_type_match(item_types, session_product_types):
-                    continue
-                
-                if pattern.lower() in (message or '').lower():
-                    score = (int(priority or 0), len(pattern))
-                    if score > best_score:
-                        best = answer
-                        best_score = score
-                        best_id = faq_id
-            
-            # 如果找到匹配，更新命中统计
-            if best and best_id:
-                try:
-                    cursor.execute(
-                        "UPDATE whitelist SET hit_count = hit_count + 1, last_hit_at = NOW() WHERE id = %s",
-                        (best_id,)
-                    )
-                    conn.commit()
-                    logger.debug(f"✅ FAQ命中统计已更新 - ID: {best_id}")
-                except Exception as e:
-                    logger.warning(f"更新FAQ命中统计失败: {e}")
-
-            return best
+            return cursor.fetchall()
         except Error as e:
-            logger.error(f"❌ 获取白名单答案失败: {e}")
+            logger.error(f"❌ 获取白名单失败: {e}")
             return None
         finally:
             if conn:
                 conn.close()
     
+    def _flush_hit_counts(self, table, deltas):
+        """把命中增量以单条多行 UPDATE 写入指定表（HitCounter 的 flush 回调）
+        
+        Args:
+            table: whitelist 或 qa_cache
+            deltas: {row_id: (增量, 最后命中时间)}
+        
+        Returns:
+            bool: 是否写入成功
+        """
+        time_column = self.HIT_TIME_COLUMNS[table]
+        conn = None
+        try:
+            conn = self.get_connection()
+            if not conn:
+                return False
+            cursor = conn.cursor()
+            items = list(deltas.items())
+            for start in range(0, len(items), 500):
+                chunk = items[start:start + 500]
+                count_cases = ' '.join(['WHEN %s THEN %s'] * len(chunk))
+                time_cases = ' '.join(['WHEN %s THEN %s'] * len(chunk))
+                placeholders = ','.join(['%s'] * len(chunk))
+                params = []
+                for rid, (delta, _) in chunk:
+                    params.extend((rid, delta))
+                for rid, (_, ts) in chunk:
+                    params.extend((rid, ts))
+                params.extend(rid for rid, _ in chunk)
+                cursor.execute(
+                    f"UPDATE {table} SET hit_count = hit_count + CASE id {count_cases} ELSE 0 END, "
+                    f"{time_column} = CASE id {time_cases} ELSE {time_column} END "
+                    f"WHERE id IN ({placeholders})",
+                    tuple(params)
+                )
+            conn.commit()
+            logger.debug(f"✅ 命中统计已批量写入 - 表: {table}, 行数: {len(items)}")
+            return True
+        except Error as e:
+            logger.warning(f"批量写入命中统计失败 - 表: {table}: {e}")
+            return False
+        finally:
+            if conn:
+                conn.close()
+    
     def get_pending_bullet_screens(self, session_id, limit=10):
-        """获取待处理弹幕"""
+        """查看待处理弹幕（只读，不加租约；消费弹幕请用 claim_bullet_screens）"""
         conn = None
         try:
             conn = self.get_connection()
@@ -744,7 +1219,7 @@ class Database:
                 
             cursor = conn.cursor(dictionary=True)
             cursor.execute(
-                "SELECT * FROM bullet_screen_queue WHERE session_id = %s AND is_processed = FALSE ORDER BY priority DESC, created_at ASC LIMIT %s",
+                "SELECT * FROM bullet_screen_queue WHERE session_id = %s AND status = 'pending' ORDER BY priority DESC, id ASC LIMIT %s",
                 (session_id, limit)
             )
             return cursor.fetchall()
@@ -755,8 +1230,265 @@ class Database:
             if conn:
                 conn.close()
     
+    def claim_bullet_screens(self, session_id, limit=10, lease_seconds=None, max_attempts=None):
+        """领取一批待处理弹幕并加租约（SELECT ... FOR UPDATE SKIP LOCKED，需要 MySQL 8.0+）
+        
+        多个消费者并发领取时互相跳过对方锁住的行，同一弹幕不会被重复领取。
+        租约到期仍未确认的弹幕可被重新领取；已领取 max_attempts 次仍未成功的转入死信。
+        
+        Args:
+            session_id: 会话ID
+            limit: 最多领取条数
+            lease_seconds: 租约时长（秒），默认 Config.BULLET_LEASE_SECONDS
+            max_attempts: 最大领取次数，默认 Config.BULLET_MAX_ATTEMPTS
+        
+        Returns:
+            tuple: (lease_token, 弹幕列表)；没有可领取的弹幕或失败时为 (None, [])
+        """
+        lease_seconds = lease_seconds or Config.BULLET_LEASE_SECONDS
+        max_attempts = max_attempts or Config.BULLET_MAX_ATTEMPTS
+        conn = None
+        try:
+            conn = self.get_connection()
+            if not conn:
+                return None, []
+            
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute(
+                "SELECT id, attempts FROM bullet_screen_queue "
+                "WHERE session_id = %s AND (status = 'pending' OR (status = 'leased' AND lease_expires_at < NOW())) "
+                "ORDER BY priority DESC, id ASC LIMIT %s FOR UPDATE SKIP LOCKED",
+                (session_id, limit)
+            )
+            rows = cursor.fetchall()
+            expired = [row['id'] for row in rows if row['attempts'] >= max_attempts]
+            ids = [row['id'] for row in rows if row['attempts'] < max_attempts]
+            
+            if expired:
+                # 租约多次到期仍未确认（消费者崩溃或处理超时）
+                cursor.execute(
+                    f"UPDATE bullet_screen_queue SET status = 'dead', lease_token = NULL, lease_expires_at = NULL, "
+                    f"last_error = 'lease expired' WHERE id IN ({','.join(['%s'] * len(expired))})",
+                    tuple(expired)
+                )
+                logger.warning(f"⚠️ {len(expired)} 条弹幕租约多次过期，转入死信 - 会话: {session_id}")
+            
+            if not ids:
+                conn.commit()
+                return None, []
+            
+            lease_token = uuid.uuid4().hex
+            placeholders = ','.join(['%s'] * len(ids))
+            cursor.execute(
+                f"UPDATE bullet_screen_queue SET status = 'leased', lease_token = %s, "
+                f"lease_expires_at = NOW() + INTERVAL %s SECOND, attempts = attempts + 1 WHERE id IN ({placeholders})",
+                (lease_token, int(lease_seconds), *ids)
+            )
+            cursor.execute(
+                f"SELECT * FROM bullet_screen_queue WHERE id IN ({placeholders}) ORDER BY priority DESC, id ASC",
+                tuple(ids)
+            )
+            bullets = cursor.fetchall()
+            conn.commit()
+            logger.debug(f"领取弹幕 - 会话: {session_id}, 条数: {len(bullets)}, 租约: {lease_token}")
+            return lease_token, bullets
+        except Error as e:
+            if conn:
+                conn.rollback()
+            logger.error(f"❌ 领取弹幕失败: {e}")
+            return None, []
+        finally:
+            if conn:
+                conn.close()
+    
+    def ack_bullet_screens(self, lease_token, bullet_screen_ids):
+        """确认弹幕已处理完成，只对仍由该租约持有的弹幕生效
+        
+        Returns:
+            int: 确认成功的条数（租约已过期并被他人领取的弹幕不计入），失败返回 -1
+        """
+        if not bullet_screen_ids:
+            return 0
+        conn = None
+        try:
+            conn = self.get_connection()
+            if not conn:
+                return -1
+            
+            cursor = conn.cursor()
+            placeholders = ','.join(['%s'] * len(bullet_screen_ids))
+            cursor.execute(
+                f"UPDATE bullet_screen_queue SET status = 'done', is_processed = TRUE, processed_at = NOW(), "
+                f"lease_token = NULL, lease_expires_at = NULL "
+                f"WHERE lease_token = %s AND status = 'leased' AND id IN ({placeholders})",
+                (lease_token, *bullet_screen_ids)
+            )
+            acked = cursor.rowcount
+            conn.commit()
+            return acked
+        except Error as e:
+            logger.error(f"❌ 确认弹幕失败: {e}")
+            return -1
+        finally:
+            if conn:
+                conn.close()
+    
+    def extend_bullet_lease(self, lease_token, bullet_screen_ids, lease_seconds):
+        """把仍由该租约持有的弹幕的租约延长到 lease_seconds 秒后
+        
+        Returns:
+            int: 仍由该租约持有的条数（租约已过期并被他人领取的不计入），失败返回 -1
+        """
+        if not bullet_screen_ids:
+            return 0
+        conn = None
+        try:
+            conn = self.get_connection()
+            if not conn:
+                return -1
+            
+            cursor = conn.cursor()
+            placeholders = ','.join(['%s'] * len(bullet_screen_ids))
+            where = f"WHERE lease_token = %s AND status = 'leased' AND id IN ({placeholders})"
+            cursor.execute(
+                f"UPDATE bullet_screen_queue SET lease_expires_at = NOW() + INTERVAL %s SECOND {where}",
+                (int(lease_seconds), lease_token, *bullet_screen_ids)
+            )
+            # 新的到期时间可能与原值相同（秒级精度），rowcount 只计实际变化的行，因此另行计数
+            cursor.execute(f"SELECT COUNT(*) FROM bullet_screen_queue {where}", (lease_token, *bullet_screen_ids))
+            held = cursor.fetchone()[0]
+            conn.commit()
+            return held
+        except Error as e:
+            logger.error(f"❌ 延长弹幕租约失败: {e}")
+            return -1
+        finally:
+            if conn:
+                conn.close()
+    
+    def nack_bullet_screens(self, lease_token, bullet_screen_ids, error=None, max_attempts=None, count_attempt=True):
+        """处理失败，释放租约：未达最大次数的弹幕放回队列，其余转入死信
+        
+        Args:
+            count_attempt: False 表示弹幕本身没有失败（如消费者繁忙主动让出），退还本次领取次数，不转入死信
+        
+        Returns:
+            dict: {'requeued': 放回队列条数, 'dead': 转入死信条数}，失败返回 None
+        """
+        if not bullet_screen_ids:
+            return {'requeued': 0, 'dead': 0}
+        max_attempts = max_attempts or Config.BULLET_MAX_ATTEMPTS
+        error = (error or 'processing failed')[:500]
+        conn = None
+        try:
+            conn = self.get_connection()
+            if not conn:
+                return None
+            
+            cursor = conn.cursor()
+            placeholders = ','.join(['%s'] * len(bullet_screen_ids))
+            where = f"WHERE lease_token = %s AND status = 'leased' AND id IN ({placeholders})"
+            dead = 0
+            if count_attempt:
+                cursor.execute(
+                    f"UPDATE bullet_screen_queue SET status = 'dead', lease_token = NULL, lease_expires_at = NULL, "
+                    f"last_error = %s {where} AND attempts >= %s",
+                    (error, lease_token, *bullet_screen_ids, max_attempts)
+                )
+                dead = cursor.rowcount
+            cursor.execute(
+                f"UPDATE bullet_screen_queue SET status = 'pending', lease_token = NULL, lease_expires_at = NULL, "
+                f"attempts = attempts - %s, last_error = %s {where}",
+                (0 if count_attempt else 1, error, lease_token, *bullet_screen_ids)
+            )
+            requeued = cursor.rowcount
+            conn.commit()
+            if dead:
+                logger.warning(f"⚠️ {dead} 条弹幕多次处理失败，转入死信: {error}")
+            return {'requeued': requeued, 'dead': dead}
+        except Error as e:
+            logger.error(f"❌ 释放弹幕租约失败: {e}")
+            return None
+        finally:
+            if conn:
+                conn.close()
+    
+    def get_dead_bullet_screens(self, session_id, limit=50):
+        """获取会话的死信弹幕（最新的在前）"""
+        conn = None
+        try:
+            conn = self.get_connection()
+            if not conn:
+                return []
+            
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute(
+                "SELECT * FROM bullet_screen_queue WHERE session_id = %s AND status = 'dead' ORDER BY id DESC LIMIT %s",
+                (session_id, limit)
+            )
+            return cursor.fetchall()
+        except Error as e:
+            logger.error(f"❌ 获取死信弹幕失败: {e}")
+            return []
+        finally:
+            if conn:
+                conn.close()
+    
+    def requeue_dead_bullet_screens(self, session_id, bullet_screen_ids=None):
+        """把死信弹幕重新放回队列（重置领取次数），不指定 id 时处理会话全部死信
+        
+        Returns:
+            int: 放回队列的条数，失败返回 -1
+        """
+        conn = None
+        try:
+            conn = self.get_connection()
+            if not conn:
+                return -1
+            
+            cursor = conn.cursor()
+            sql = "UPDATE bullet_screen_queue SET status = 'pending', attempts = 0 WHERE session_id = %s AND status = 'dead'"
+            params = [session_id]
+            if bullet_screen_ids:
+                sql += f" AND id IN ({','.join(['%s'] * len(bullet_screen_ids))})"
+                params.extend(bullet_screen_ids)
+            cursor.execute(sql, tuple(params))
+            requeued = cursor.rowcount
+            conn.commit()
+            return requeued
+        except Error as e:
+            logger.error(f"❌ 重新入队死信弹幕失败: {e}")
+            return -1
+        finally:
+            if conn:
+                conn.close()
+    
+    def get_bullet_queue_stats(self, session_id):
+        """会话弹幕队列各状态的条数，租约已过期的 leased 单独计为 expired"""
+        conn = None
+        try:
+            conn = self.get_connection()
+            if not conn:
+                return {}
+            
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT IF(status = 'leased' AND lease_expires_at < NOW(), 'expired', status), COUNT(*) "
+                "FROM bullet_screen_queue WHERE session_id = %s GROUP BY 1",
+                (session_id,)
+            )
+            stats = {'pending': 0, 'leased': 0, 'expired': 0, 'done': 0, 'dead': 0}
+            stats.update({status: count for status, count in cursor.fetchall()})
+            return stats
+        except Error as e:
+            logger.error(f"❌ 获取弹幕队列统计失败: {e}")
+            return {}
+        finally:
+            if conn:
+                conn.close()
+    
     def mark_bullet_screens_processed(self, bullet_screen_ids):
-        """标记弹幕已处理"""
+        """标记弹幕已处理（不校验租约，供不走领取流程的调用方使用）"""
         conn = None
         try:
             conn = self.get_connection()
@@ -766,7 +1498,8 @@ class Database:
             cursor = conn.cursor()
             placeholders = ','.join(['%s'] * len(bullet_screen_ids))
             cursor.execute(
-                f"UPDATE bullet_screen_queue SET is_processed = TRUE, processed_at = NOW() WHERE id IN ({placeholders})",
+                f"UPDATE bullet_screen_queue SET is_processed = TRUE, status = 'done', processed_at = NOW(), "
+                f"lease_token = NULL, lease_expires_at = NULL WHERE id IN ({placeholders})",
                 tuple(bullet_screen_ids)
             )
             conn.commit()
@@ -779,7 +1512,10 @@ class Database:
                 conn.close()
     
     def get_cached_answer(self, session_id, question):
-        """从缓存中获取答案（优化版：问题归一化）
+        """从缓存中获取答案（问题归一化 + 两级缓存）
+        
+        依次查询 进程内 L1 LRU -> 尚未写入数据库的新条目 -> MySQL qa_cache 表(L2)，
+        L2 命中后回填 L1；命中次数交给 hit_counter 异步写库。
         
         Args:
             session_id: 会话ID
@@ -788,26 +1524,27 @@ class Database:
         Returns:
             str: 缓存的答案，如果不存在返回None
         """
-        import hashlib
-        import re
-        
-        # 问题归一化：去除标点、语气词、统一疑问词
-        def normalize_question(q):
-            q = q.strip()
-            # 去除常见标点
-            q = re.sub(r'[？?！!。.，,、；;：:""\'\'""（）()【】\[\]]', '', q)
-            # 去除语气词
-            q = re.sub(r'(吗|呢|啊|哦|嘛|呀|哇|哈)+', '', q)
-            # 统一疑问词
-            q = q.replace('么', '吗')
-            # 去除多余空格
-            q = ' '.join(q.split())
-            return q.lower()
-        
-        # 计算问题的hash（归一化后）
-        question_normalized = normalize_question(question)
-        question_hash = hashlib.sha256(question_normalized.encode('utf-8')).hexdigest()
+        question_normalized, question_hash = _question_key(question)
+        key = (session_id, question_hash)
+        
+        # L1：进程内 LRU
+        entry = self.qa_l1.get(key)
+        if entry is not None:
+            self._record_qa_hit(key, entry)
+            logger.info(f"✅ 问答缓存命中(L1) - 会话: {session_id}, 问题: {question_normalized[:20]}...")
+            return entry['answer']
         
+        # 已写入 L1 但被淘汰、且还在等待写库的条目
+        with self._qa_lock:
+            pending = self._qa_pending.get(key)
+            if pending:
+                pending['count'] += 1
+                answer = pending['answer']
+        if pending:
+            self.qa_l1.set(key, {'answer': answer, 'id': None})
+            return answer
+        
+        # L2：MySQL
         conn = None
         try:
             conn = self.get_connection()
@@ -821,15 +1558,15 @@ class Database:
             )
             result = cursor.fetchone()
             
+            with self._qa_lock:
+                self._qa_l2_stats['hits' if result else 'misses'] += 1
+            
             if result:
-                # 更新命中次数和最后使用时间
-                cursor.execute(
-                    "UPDATE qa_cache SET hit_count = hit_count + 1, last_used_at = NOW() WHERE id = %s",
-                    (result['id'],)
-                )
-                conn.commit()
+                self.qa_l1.set(key, {'answer': result['answer'], 'id': result['id']})
+                # 记录命中次数和最后使用时间（异步批量写库）
+                self.hit_counter.record('qa_cache', result['id'])
                 
-                logger.info(f"✅ 问答缓存命中 - 会话: {session_id}, 问题: {question_normalized[:20]}...")
+                logger.info(f"✅ 问答缓存命中(L2) - 会话: {session_id}, 问题: {question_normalized[:20]}...")
                 return result['answer']
             
             return None
@@ -841,8 +1578,20 @@ class Database:
             if conn:
                 conn.close()
     
+    def _record_qa_hit(self, key, entry):
+        """记录 L1 命中：已落库的条目按行 id 计数，未落库的累加到待写入条目上"""
+        if entry.get('id'):
+            self.hit_counter.record('qa_cache', entry['id'])
+            return
+        with self._qa_lock:
+            pending = self._qa_pending.get(key)
+            if pending:
+                pending['count'] += 1
+    
     def cache_qa(self, session_id, question, answer):
-        """缓存问答对（优化版：使用归一化的问题）
+        """缓存问答对（使用归一化的问题）
+        
+        立即写入 L1，L2 由后台任务批量写入（write-behind），调用方不等待数据库提交。
         
         Args:
             session_id: 会话ID
@@ -852,71 +1601,165 @@ class Database:
         Returns:
             bool: 是否成功
         """
-        import hashlib
-        import re
-        
-        # 问题归一化（与get_cached_answer保持一致）
-        def normalize_question(q):
-            q = q.strip()
-            q = re.sub(r'[？?！!。.，,、；;：:""\'\'""（）()【】\[\]]', '', q)
-            q = re.sub(r'(吗|呢|啊|哦|嘛|呀|哇|哈)+', '', q)
-            q = q.replace('么', '吗')
-            q = ' '.join(q.split())
-            return q.lower()
-        
-        # 计算问题的hash
-        question_normalized = normalize_question(question)
-        question_hash = hashlib.sha256(question_normalized.encode('utf-8')).hexdigest()
+        question_normalized, question_hash = _question_key(question)
+        key = (session_id, question_hash)
+        
+        entry = self.qa_l1.peek(key)
+        self.qa_l1.set(key, {'answer': answer, 'id': entry['id'] if entry else None})
+        
+        # 每次写入计 1 次使用（与原先 INSERT 默认 hit_count=1 / UPDATE hit_count+1 一致）
+        with self._qa_lock:
+            pending = self._qa_pending.get(key)
+            if pending:
+                pending['answer'] = answer
+                pending['count'] += 1
+            else:
+                self._qa_pending[key] = {'question': question, 'answer': answer, 'count': 1}
+        
+        self._qa_flush_task.start()
+        self._qa_clean_task.start()
+        logger.info(f"✅ 问答缓存已保存 - 会话: {session_id}, 问题: {question_normalized[:20]}...")
+        return True
+    
+    def flush_qa_cache(self):
+        """把待写入的问答缓存批量写入 qa_cache 表（后台任务与退出时调用）
+        
+        整批因外键等约束失败（如会话已被删除）时逐条重试，丢弃无法写入的条目，避免一条坏数据卡住之后的全部写入。
+        """
+        with self._qa_lock:
+            batch, self._qa_pending = self._qa_pending, {}
+        if not batch:
+            return
         
+        remaining = dict(batch)
         conn = None
         try:
             conn = self.get_connection()
             if not conn:
-                return False
+                self._merge_qa_pending(remaining)
+                return
             
             cursor = conn.cursor()
+            try:
+                inserted = self._write_qa_batch(cursor, remaining)
+                conn.commit()
+                remaining = {}
+                dropped = 0
+            except mysql.connector.IntegrityError as e:
+                conn.rollback()
+                logger.warning(f"⚠️ 批量写入问答缓存失败，改为逐条写入: {e}")
+                inserted = []
+                dropped = 0
+                for key, item in batch.items():
+                    try:
+                        inserted.extend(self._write_qa_batch(cursor, {key: item}))
+                        conn.commit()
+                    except mysql.connector.IntegrityError as row_error:
+                        conn.rollback()
+                        logger.error(f"❌ 丢弃无法写入的问答缓存 - 会话ID: {key[0]}: {row_error}")
+                        dropped += 1
+                    del remaining[key]
             
-            # 检查是否已存在
-            cursor.execute(
-                "SELECT id FROM qa_cache WHERE session_id = %s AND question_hash = %s",
-                (session_id, question_hash)
-            )
-            existing = cursor.fetchone()
-            
-            if existing:
-                # 更新现有记录
-                cursor.execute(
-                    "UPDATE qa_cache SET answer = %s, hit_count = hit_count + 1, last_used_at = NOW() WHERE id = %s",
-                    (answer, existing[0])
-                )
-            else:
-                # 插入新记录
-                cursor.execute(
-                    "INSERT INTO qa_cache (session_id, question, question_hash, answer) VALUES (%s, %s, %s, %s)",
-                    (session_id, question, question_hash, answer)
-                )
-            
-            conn.commit()
-            logger.info(f"✅ 问答缓存已保存 - 会话: {session_id}, 问题: {question_normalized[:20]}...")
-            
-            # 自动清理缓存（保留最近1000条）
-            self._clean_qa_cache()
+            # 回填新行 id，之后的 L1 命中可以直接按 id 计数
+            if inserted:
+                for key, rid in self._select_qa_ids(cursor, inserted).items():
+                    entry = self.qa_l1.peek(key)
+                    if entry is not None and entry.get('id') is None:
+                        entry['id'] = rid
             
-            return True
+            with self._qa_lock:
+                self._qa_l2_stats['writes'] += len(batch) - dropped
+                self._qa_l2_stats['dropped'] += dropped
+            logger.debug(f"✅ 问答缓存批量写入 - {len(batch) - dropped} 条, 新增: {len(inserted)}")
             
         except Error as e:
-            logger.error(f"❌ 缓存问答失败: {e}")
-            return False
+            logger.error(f"❌ 批量写入问答缓存失败: {e}")
+            self._merge_qa_pending(remaining)
         finally:
             if conn:
                 conn.close()
     
-    def _clean_qa_cache(self, max_cache_size=1000):
-        """清理问答缓存，只保留最近使用的N条
+    def _write_qa_batch(self, cursor, batch):
+        """在当前事务中写入一批问答缓存（已有行累加计数、新行插入），返回新插入的键"""
+        keys = list(batch)
+        existing = self._select_qa_ids(cursor, keys)
+        updates = [(existing[k], batch[k]) for k in keys if k in existing]
+        inserts = [(k, batch[k]) for k in keys if k not in existing]
+        
+        for start in range(0, len(updates), 500):
+            chunk = updates[start:start + 500]
+            cases = ' '.join(['WHEN %s THEN %s'] * len(chunk))
+            placeholders = ','.join(['%s'] * len(chunk))
+            params = []
+            for rid, item in chunk:
+                params.extend((rid, item['answer']))
+            for rid, item in chunk:
+                params.extend((rid, item['count']))
+            params.extend(rid for rid, _ in chunk)
+            cursor.execute(
+                f"UPDATE qa_cache SET answer = CASE id {cases} ELSE answer END, "
+                f"hit_count = hit_count + CASE id {cases} ELSE 0 END, last_used_at = NOW() "
+                f"WHERE id IN ({placeholders})",
+                tuple(params)
+            )
+        
+        for start in range(0, len(inserts), 500):
+            chunk = inserts[start:start + 500]
+            values = ','.join(['(%s, %s, %s, %s, %s)'] * len(chunk))
+            params = []
+            for (sid, qhash), item in chunk:
+                params.extend((sid, item['question'], qhash, item['answer'], item['count']))
+            cursor.execute(
+                f"INSERT INTO qa_cache (session_id, question, question_hash, answer, hit_count) VALUES {values}",
+                tuple(params)
+            )
+        return [k for k, _ in inserts]
+    
+    def _select_qa_ids(self, cursor, keys):
+        """按 (session_id, question_hash) 批量查询 qa_cache 行 id"""
+        ids = {}
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            placeholders = ','.join(['(%s, %s)'] * len(chunk))
+            params = [v for key in chunk for v in key]
+            cursor.execute(
+                f"SELECT id, session_id, question_hash FROM qa_cache WHERE (session_id, question_hash) IN ({placeholders})",
+                tuple(params)
+            )
+            for rid, sid, qhash in cursor.fetchall():
+                ids.setdefault((sid, qhash), rid)
+        return ids
+    
+    def _merge_qa_pending(self, batch):
+        """写库失败时把批次放回待写入队列（期间的新写入优先保留其答案）
+        
+        连续失败 QA_CACHE_FLUSH_MAX_ATTEMPTS 次的条目直接丢弃（L1 中仍有答案），
+        数据库长时间不可用时待写入队列不会无限增长。
+        """
+        dropped = 0
+        with self._qa_lock:
+            for key, item in batch.items():
+                current = self._qa_pending.get(key)
+                if current is not None:
+                    # 失败期间又有新的写入：合并计数，保留新条目自己的失败次数
+                    current['count'] += item['count']
+                    continue
+                item['attempts'] = item.get('attempts', 0) + 1
+                if item['attempts'] >= Config.QA_CACHE_FLUSH_MAX_ATTEMPTS:
+                    dropped += 1
+                else:
+                    self._qa_pending[key] = item
+            self._qa_l2_stats['dropped'] += dropped
+        if dropped:
+            logger.error(f"❌ 问答缓存连续写入失败，已丢弃 {dropped} 条")
+    
+    def _clean_qa_cache(self, max_cache_size=None):
+        """清理问答缓存表，只保留最近使用的N条（由后台任务周期执行）
         
         Args:
-            max_cache_size: 最大缓存数量，默认1000
+            max_cache_size: 最大缓存数量，默认 Config.QA_CACHE_L2_MAX_SIZE
         """
+        max_cache_size = max_cache_size or Config.QA_CACHE_L2_MAX_SIZE
         conn = None
         try:
             conn = self.get_connection()
@@ -945,6 +1788,8 @@ class Database:
                 conn.commit()
                 
                 if deleted > 0:
+                    with self._qa_lock:
+                        self._qa_l2_stats['evictions'] += deleted
                     logger.info(f"✅ 已清理 {deleted} 条旧的问答缓存，保留最近 {max_cache_size} 条")
                     
         except Error as e:
@@ -953,6 +1798,17 @@ class Database:
             if conn:
                 conn.close()
     
+    def get_session_cache_stats(self):
+        """会话上下文缓存的命中/未命中/淘汰计数"""
+        return self._session_cache.stats()
+    
+    def get_qa_cache_stats(self):
+        """问答缓存各级的命中/未命中/淘汰计数"""
+        with self._qa_lock:
+            l2 = dict(self._qa_l2_stats)
+            l2['pending_writes'] = len(self._qa_pending)
+        return {'l1': self.qa_l1.stats(), 'l2': l2}
+    
     def check_sensitive_words(self, message):
         """检查消息是否包含敏感词（政治、色情等）
         
@@ -966,22 +1822,12 @@ class Database:
             return False, []
         
         try:
-            # 读取敏感词黑名单
-            data = self._load_json_file(self.blacklist_file)
-            global_list = data.get('_global', [])
-            
-            if not global_list:
+            words, matcher = self._get_sensitive_matcher()
+            if not words:
                 return False, []
             
-            msg_lower = message.lower().strip()
-            matched_words = []
-            
-            for word in global_list:
-                if not word:
-                    continue
-                word_lower = word.lower().strip()
-                if word_lower in msg_lower:
-                    matched_words.append(word)
+            # 单遍扫描找出所有命中的敏感词（按词表顺序返回）
+            matched_words = [words[i] for i in matcher.find_all(message.lower())]
             
             if matched_words:
                 logger.warning(f"⚠️ 敏感词命中: {matched_words} - 消息: {message}")
@@ -993,15 +1839,51 @@ class Database:
             logger.error(f"❌ 检查敏感词失败: {e}")
             return False, []
     
-    def get_faq_statistics(self, session_id=None):
+    def _get_sensitive_matcher(self):
+        """获取 `_global` 敏感词自动机
+        
+        黑名单文件只在 mtime 变化时重新读取并编译，新自动机构建完成后整体替换，
+        并发请求要么看到旧快照、要么看到新快照，不会读到半成品。
+        
+        Returns:
+            tuple: (原始敏感词列表, AhoCorasick 自动机)
+        """
+        try:
+            mtime = os.stat(self.blacklist_file).st_mtime_ns
+        except OSError:
+            mtime = None
+        
+        cached = self._sensitive_matcher
+        if cached is not None and cached[0] == mtime:
+            return cached[1], cached[2]
+        
+        with self._sensitive_lock:
+            cached = self._sensitive_matcher
+            if cached is not None and cached[0] == mtime:
+                return cached[1], cached[2]
+            
+            data = self._load_json_file(self.blacklist_file)
+            words = [w for w in (data.get('_global') or []) if isinstance(w, str) and w.strip()]
+            matcher = AhoCorasick([w.lower().strip() for w in words])
+            self._sensitive_matcher = (mtime, words, matcher)
+            logger.info(f"✅ 敏感词自动机已构建，共 {len(words)} 个词")
+            return words, matcher
+    
+    def get_faq_statistics(self, session_id=None, include_pending=True):
         """获取FAQ统计信息
         
         Args:
             session_id: 会话ID，如果为None则统计所有FAQ
+            include_pending: 是否合并尚未写库的命中增量，默认True
         
         Returns:
             dict: 统计信息
         """
+        # whitelist 数据源：有未写库的命中增量时用派生表把增量合并进 hit_count/last_hit_at
+        wl, wl_params = 'whitelist', ()
+        if include_pending:
+            wl, wl_params = self._whitelist_with_pending_hits()
+        
         conn = None
         try:
             conn = self.get_connection()
@@ -1012,7 +1894,7 @@ class Database:
             
             if session_id:
                 # 单个会话的统计
-                cursor.execute("""
+                cursor.execute(f"""
                     SELECT 
                         COUNT(*) as total_faqs,
                         SUM(hit_count) as total_hits,
@@ -1020,29 +1902,29 @@ class Database:
                         MAX(hit_count) as max_hits,
                         COUNT(CASE WHEN hit_count > 0 THEN 1 END) as used_faqs,
                         COUNT(CASE WHEN hit_count = 0 THEN 1 END) as unused_faqs
-                    FROM whitelist 
+                    FROM {wl} w
                     WHERE session_id = %s
-                """, (session_id,))
+                """, wl_params + (session_id,))
                 stats = cursor.fetchone()
                 
                 # 获取热门FAQ (Top 10)
-                cursor.execute("""
+                cursor.execute(f"""
                     SELECT pattern, answer, hit_count, last_hit_at, product_types
-                    FROM whitelist 
+                    FROM {wl} w
                     WHERE session_id = %s AND hit_count > 0
                     ORDER BY hit_count DESC 
                     LIMIT 10
-                """, (session_id,))
+                """, wl_params + (session_id,))
                 hot_faqs = cursor.fetchall()
                 
                 # 获取未使用的FAQ
-                cursor.execute("""
+                cursor.execute(f"""
                     SELECT pattern, answer, product_types
-                    FROM whitelist 
+                    FROM {wl} w
                     WHERE session_id = %s AND hit_count = 0
                     ORDER BY created_at DESC
                     LIMIT 10
-                """, (session_id,))
+                """, wl_params + (session_id,))
                 unused_faqs = cursor.fetchall()
                 
                 return {
@@ -1053,25 +1935,25 @@ class Database:
                 }
             else:
                 # 全局统计
-                cursor.execute("""
+                cursor.execute(f"""
                     SELECT 
                         COUNT(*) as total_faqs,
                         SUM(hit_count) as total_hits,
                         AVG(hit_count) as avg_hits,
                         COUNT(DISTINCT session_id) as total_sessions
-                    FROM whitelist
-                """)
+                    FROM {wl} w
+                """, wl_params)
                 stats = cursor.fetchone()
                 
                 # 全局热门FAQ
-                cursor.execute("""
+                cursor.execute(f"""
                     SELECT w.pattern, w.answer, w.hit_count, w.product_types, s.host_name, s.live_theme
-                    FROM whitelist w
+                    FROM {wl} w
                     LEFT JOIN sessions s ON w.session_id = s.id
                     WHERE w.hit_count > 0
                     ORDER BY w.hit_count DESC 
                     LIMIT 20
-                """)
+                """, wl_params)
                 hot_faqs = cursor.fetchall()
                 
                 return {
@@ -1086,6 +1968,29 @@ class Database:
             if conn:
                 conn.close()
     
+    def _whitelist_with_pending_hits(self):
+        """构造合并了内存命中增量的 whitelist 派生表
+        
+        Returns:
+            tuple: (FROM 子句中使用的表达式, 参数元组)；没有增量时直接返回原表
+        """
+        pending = self.hit_counter.pending('whitelist')
+        if not pending:
+            return 'whitelist', ()
+        
+        rows = ' UNION ALL '.join(['SELECT %s AS id, %s AS delta, %s AS last_hit'] * len(pending))
+        params = []
+        for rid, (delta, ts) in pending.items():
+            params.extend((rid, delta, ts))
+        source = f"""(
+                        SELECT w.id, w.session_id, w.pattern, w.answer, w.product_types, w.created_at,
+                               w.hit_count + COALESCE(p.delta, 0) AS hit_count,
+                               COALESCE(p.last_hit, w.last_hit_at) AS last_hit_at
+                        FROM whitelist w
+                        LEFT JOIN ({rows}) p ON p.id = w.id
+                    )"""
+        return source, tuple(params)
+    
     def get_faq_recommendations(self, session_id, min_hit_count=10):
         """获取FAQ推荐（基于高频但未被FAQ覆盖的问题）
         
@@ -5,5 +5,6 @@ from .session_routes import session_bp
 from .faq_routes import faq_bp
 from .chat_routes import chat_bp  
 from .stats_routes import stats_bp
+from .metrics_routes import metrics_bp
 
-__all__ = ['session_bp', 'faq_bp', 'chat_bp', 'stats_bp']
+__all__ = ['session_bp', 'faq_bp', 'chat_bp', 'stats_bp', 'metrics_bp']
@@ -1,121 +1,119 @@
 """
 聊天路由 - 处理AI对话
 """
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, stream_with_context
 import uuid
 import json
+import time
+from config import Config
 from database import db
 from services import ai_service
+from services.answer_pipeline import local_answer, ask_ai, validate_chat_request, sensitive_error, submit_tts
+from services.bullet_worker import bullet_worker
+from services.event_hub import event_hub
 from utils.logger import get_logger
-import os
-from services import bullet_ws as _bullet_ws
-from services import baidu_tts
+from utils.sentence_splitter import SentenceSplitter, split_sentences
+from services.tts_jobs import tts_jobs
 
 logger = get_logger(__name__)
 
 chat_bp = Blueprint('chat', __name__, url_prefix='/api')
 
+# 关闭代理缓冲，保证 SSE 事件即时到达浏览器
+SSE_HEADERS = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+
+
+def _parse_chat_request(data):
+    """校验聊天请求，返回 (session_id, message, 错误响应)；校验通过时错误响应为 None"""
+    session_id, message, error = validate_chat_request(data)
+    if error:
+        body, status = error
+        return None, None, (jsonify(body), status)
+    return session_id, message, None
+
+
+def _check_sensitive(message):
+    """敏感词检查，命中时返回错误响应"""
+    error = sensitive_error(message)
+    if error:
+        body, status = error
+        return jsonify(body), status
+    return None
+
+
+def _tts_splitter():
+    return SentenceSplitter(Config.TTS_CHUNK_MIN_CHARS, Config.TTS_CHUNK_MAX_CHARS)
+
+
+def _submit_tts_chunk(playlist, text):
+    """提交一句的合成任务并追加到播放列表，返回新条目；队列已满返回 None
+    
+    某句被拒绝后不再追加后续句子，避免播放时中间缺一句。
+    """
+    if playlist and playlist[-1] is None:
+        return None
+    job = tts_jobs.submit(text)
+    item = {"index": len(playlist), "text": text, "audio_url": job['audio_url'], "audio_job_id": job['job_id']} if job else None
+    playlist.append(item)
+    return item
+
+
+def _playlist_fields(playlist):
+    """分句模式下合并进 done 事件的语音字段"""
+    return {"audio_url": None, "audio_job_id": None, "audio_playlist": [item for item in playlist if item]}
+
+
+def _sse(payload):
+    """编码一条 SSE 事件"""
+    return f"data: {json.dumps(payload, ensure_ascii=False, default=str)}\n\n"
 
 
 @chat_bp.route('/chat', methods=['POST'])
 def chat():
     """与AI对话"""
     try:
-        data = request.json
-        
-        if not data:
-            return jsonify({"error": "请求数据不能为空"}), 400
-        
-        session_id = data.get('session_id')
-        message = data.get('message')
-        
-        # 验证session_id格式
-        if not session_id:
-            return jsonify({"error": "会话ID不能为空"}), 400
-        
-        try:
-            uuid.UUID(session_id)
-        except ValueError:
-            return jsonify({"error": "无效的会话ID格式"}), 400
-        
-        # 验证消息
-        if not message or not isinstance(message, str):
-            return jsonify({"error": "消息不能为空"}), 400
-        
-        message = message.strip()
-        if not message:
-            return jsonify({"error": "消息不能为空"}), 400
-        
-        if len(message) > 500:
-            return jsonify({"error": "消息长度不能超过500字符"}), 400
+        session_id, message, error = _parse_chat_request(request.json)
+        if error:
+            return error
         
         logger.info(f"收到聊天请求 - 会话: {session_id}, 消息长度: {len(message)}")
         
         # ========== 第一步：检查敏感词 ==========
-        is_sensitive, matched_words = db.check_sensitive_words(message)
-        if is_sensitive:
-            logger.warning(f"⚠️ 消息包含敏感词: {matched_words}")
-            return jsonify({
-                "error": "您的消息包含不当内容，请文明用语。",
-                "sensitive": True
-            }), 400
-        
-        # ========== 第二步：检查FAQ白名单 ==========
-        faq_answer = db.get_whitelist_answer(session_id, message)
-        if faq_answer:
-            logger.info(f"✅ 返回FAQ答案 - 会话: {session_id}")
-            db.cache_qa(session_id, message, faq_answer)
-            db.save_conversation(session_id, message, faq_answer)
-            # 语音模块已移除，保持字段兼容返回 null
-            audio_url = None
-            return jsonify({"response": faq_answer, "faq": True, "audio_url": audio_url})
-        
-        # ========== 第三步：检查问答缓存 ==========
-        cached_answer = db.get_cached_answer(session_id, message)
-        if cached_answer:
-            logger.info(f"✅ 返回缓存答案 - 会话: {session_id}")
-            db.save_conversation(session_id, message, cached_answer)
-            # 语音模块已移除，保持字段兼容返回 null
-            audio_url = None
-            return jsonify({"response": cached_answer, "cached": True, "audio_url": audio_url})
+        error = _check_sensitive(message)
+        if error:
+            return error
+        
+        # ========== 第二、三步：检查FAQ白名单与问答缓存 ==========
+        answer, source = local_answer(session_id, message)
+        if answer:
+            # FAQ/缓存答案重复率高，语音通常已在磁盘上，直接返回可播放的地址
+            return jsonify({"response": answer, source: True, **submit_tts(answer)})
         
         # ========== 第四步：调用AI API ==========
-        # 获取会话信息
-        session = db.get_session(session_id)
+        # 获取会话上下文（进程内缓存，不加载对话历史）
+        session = db.get_session_context(session_id)
         if not session:
             return jsonify({"error": "会话不存在"}), 404
         
-        logger.info(f"调用AI API - 会话: {session_id}")
-        ai_response = ai_service.call_api(message, session)
+        # 同一问题的并发请求只调用一次AI，其余请求等待并共享结果（只缓存一次）
+        ai_response, coalesced = ask_ai(session_id, message, session)
         
         if not ai_response:
             return jsonify({"error": "AI服务暂时不可用，请稍后重试"}), 503
         
-        logger.info(f"✅ AI响应成功 - 会话: {session_id}")
+        if coalesced:
+            logger.info(f"✅ 复用并发请求的AI响应 - 会话: {session_id}")
+        else:
+            logger.info(f"✅ AI响应成功 - 会话: {session_id}")
         
-        # ========== 第五步：缓存问答对 ==========
-        db.cache_qa(session_id, message, ai_response)
+        # ========== 第五步：保存对话（问答对已在 ask_ai 中缓存） ==========
         db.save_conversation(session_id, message, ai_response)
 
-        # ====== 新增：调用百度 TTS 合成短语音，并保留 audio_url 字段 ======
-        audio_url = None
-        try:
-            # 保存到 static/audio 目录，文件名基于 uuid
-            out_dir = os.path.join(os.getcwd(), 'static', 'audio')
-            os.makedirs(out_dir, exist_ok=True)
-            filename = f"tts_{uuid.uuid4().hex}.wav"
-            out_path = os.path.join(out_dir, filename)
-            baidu_tts.synthesize(ai_response, out_path=out_path)
-            # 返回给前端的可访问 URL（Flask 静态路由下）
-            audio_url = f"/static/audio/{filename}"
-        except Exception as e:
-            logger.warning(f'Baidu TTS 合成失败: {e}', exc_info=True)
-            audio_url = None
-
+        # ====== 提交后台 TTS 任务，不等待合成完成 ======
         return jsonify({
             "response": ai_response,
             "status": "success",
-            "audio_url": audio_url
+            **submit_tts(ai_response)
         })
         
     except Exception as e:
@@ -123,6 +121,168 @@ def chat():
         return jsonify({"error": f"服务器错误: {str(e)}"}), 500
 
 
+@chat_bp.route('/chat/stream', methods=['POST'])
+def chat_stream():
+    """与AI对话（SSE 流式返回）
+    
+    校验失败、敏感词、会话不存在时与 /api/chat 一样返回 JSON 错误；
+    否则返回 text/event-stream，事件 data 为 JSON：
+      {"type": "delta", "text": "..."}                       AI 生成的文本片段
+      {"type": "audio", "index": 0, "text": "...", "audio_url": ..., "audio_job_id": ...}
+                                                             分句模式下每句的语音任务，按 index 顺序播放
+      {"type": "done", "response": "...", "audio_url": ...}  完整答案（FAQ/缓存命中时直接发送），
+                                                             同时带 faq/cached/status 字段与 /api/chat 保持一致；
+                                                             分句模式下 audio_url 为 null，audio_playlist 为全部分句
+      {"type": "error", "error": "..."}                      生成失败
+    """
+    try:
+        session_id, message, error = _parse_chat_request(request.json)
+        if error:
+            return error
+        
+        logger.info(f"收到流式聊天请求 - 会话: {session_id}, 消息长度: {len(message)}")
+        
+        error = _check_sensitive(message)
+        if error:
+            return error
+        
+        answer, source = local_answer(session_id, message)
+        if answer:
+            if Config.TTS_SENTENCE_CHUNKS:
+                playlist = []
+                for sentence in split_sentences(answer, Config.TTS_CHUNK_MIN_CHARS, Config.TTS_CHUNK_MAX_CHARS):
+                    _submit_tts_chunk(playlist, sentence)
+                audio = _playlist_fields(playlist)
+            else:
+                audio = submit_tts(answer)
+            done = _sse({"type": "done", "response": answer, source: True, **audio})
+            return Response(done, mimetype='text/event-stream', headers=SSE_HEADERS)
+        
+        session = db.get_session_context(session_id)
+        if not session:
+            return jsonify({"error": "会话不存在"}), 404
+        
+    except Exception as e:
+        logger.error(f"流式聊天处理异常: {str(e)}", exc_info=True)
+        return jsonify({"error": f"服务器错误: {str(e)}"}), 500
+    
+    def generate():
+        started = time.perf_counter()
+        first_token_ms = None
+        parts = []
+        # 分句模式：每生成完一句就提交合成并推送 audio 事件，语音不必等整段回答结束
+        splitter = _tts_splitter() if Config.TTS_SENTENCE_CHUNKS else None
+        playlist = []
+        try:
+            for text in ai_service.stream_api(message, session):
+                if first_token_ms is None:
+                    first_token_ms = round((time.perf_counter() - started) * 1000)
+                    logger.info(f"✅ AI首个片段到达 - 会话: {session_id}, 耗时: {first_token_ms}ms")
+                parts.append(text)
+                yield _sse({"type": "delta", "text": text})
+                for sentence in (splitter.feed(text) if splitter else ()):
+                    item = _submit_tts_chunk(playlist, sentence)
+                    if item:
+                        yield _sse({"type": "audio", **item})
+        except Exception as e:
+            logger.error(f"AI流式调用失败: {str(e)}")
+            parts = []
+        
+        ai_response = ''.join(parts)
+        if not ai_response:
+            yield _sse({"type": "error", "error": "AI服务暂时不可用，请稍后重试"})
+            return
+        
+        if splitter:
+            for sentence in splitter.flush():
+                item = _submit_tts_chunk(playlist, sentence)
+                if item:
+                    yield _sse({"type": "audio", **item})
+        
+        # 生成结束后再缓存与保存完整答案
+        db.cache_qa(session_id, message, ai_response)
+        db.save_conversation(session_id, message, ai_response)
+        
+        yield _sse({
+            "type": "done",
+            "response": ai_response,
+            "status": "success",
+            "first_token_ms": first_token_ms,
+            **(_playlist_fields(playlist) if splitter else submit_tts(ai_response))
+        })
+    
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers=SSE_HEADERS)
+
+
+def _blacklist_reason(session_id, username, message):
+    """黑名单检查，命中返回 (True, 原因)（兼容 db.is_blacklisted 返回 bool 或 (bool, reason)）"""
+    try:
+        res = db.is_blacklisted(session_id, username, message)
+        if isinstance(res, (list, tuple)):
+            return res[0], (res[1] if len(res) > 1 else None)
+        return bool(res), None
+    except Exception as e:
+        logger.warning(f"检查黑名单时出错: {e}")
+        return False, None
+
+
+def _broadcast_bullet(session_id, username, message, bullet_id=None, merged=False):
+    """推送给订阅了该会话的客户端（SSE，及已启用的 WebSocket 广播）"""
+    try:
+        event_hub.publish(session_id, {
+            'type': 'bullet',
+            'id': bullet_id,
+            'username': username,
+            'message': message,
+            'merged': merged
+        })
+    except Exception:
+        logger.warning('弹幕广播失败', exc_info=True)
+
+
+def _classify_bullet(session_id, bullet):
+    """调用方未指定类别时按规则分类；priority 为调用方给定值加类别的基础优先级"""
+    category = bullet.get('category')
+    if category and category != 'unknown':
+        return {**bullet, 'session_id': session_id, 'confidence_score': bullet.get('confidence_score') or 1.0}
+    category, confidence, base_priority = db.classify_bullet(session_id, bullet['message'])
+    return {
+        **bullet,
+        'session_id': session_id,
+        'category': category,
+        'confidence_score': confidence,
+        'priority': (bullet.get('priority') or 0) + base_priority,
+    }
+
+
+def _enqueue_bullets(session_id, bullets):
+    """去重聚类后入队，返回与 bullets 等长的 [(弹幕id, 是否并入已有簇)]，写库失败的 id 为 None
+    
+    新簇的代表经规则分类得到类别、置信度与优先级后写入队列（单条走合并写入，多条一次多行 INSERT）；
+    并入已有簇的弹幕不入队，返回代表的 id，代表的 cluster_count 与 priority 由后台累加。
+    """
+    assigned = [db.bullet_clusters.assign(session_id, b['message']) for b in bullets]
+    new = [i for i, (_, is_new) in enumerate(assigned) if is_new]
+    rows = [_classify_bullet(session_id, bullets[i]) for i in new]
+    if len(rows) == 1 and len(bullets) == 1:
+        b = rows[0]
+        ids = [db.add_bullet_screen(session_id, b['username'], b['message'], b['category'], b['priority'], b['confidence_score'])]
+    else:
+        ids = db.add_bullet_screens(rows) if rows else []
+    for i, bullet_id in zip(new, ids):
+        if bullet_id:
+            db.bullet_clusters.bind(assigned[i][0], bullet_id)
+        else:
+            db.bullet_clusters.discard(assigned[i][0])
+    
+    results = []
+    for cluster, is_new in assigned:
+        # 代表由其它请求写入时最多等待其写库完成
+        bullet_id = cluster.bullet_id if is_new else cluster.wait(timeout=5)
+        results.append((bullet_id, not is_new))
+    return results
+
+
 @chat_bp.route('/bullet-screen', methods=['POST'])
 def add_bullet_screen():
     """添加弹幕"""
@@ -147,35 +307,19 @@ def add_bullet_screen():
         
         logger.info(f"收到弹幕 - 会话: {session_id}, 用户: {username}")
         
-        # 检查是否在黑名单（兼容 db.is_blacklisted 返回 bool 或 (bool, reason)）
-        try:
-            res = db.is_blacklisted(session_id, username, message)
-            if isinstance(res, (list, tuple)):
-                is_blocked, reason = res[0], (res[1] if len(res) > 1 else None)
-            else:
-                is_blocked, reason = bool(res), None
-        except Exception as e:
-            logger.warning(f"检查黑名单时出错: {e}")
-            is_blocked, reason = False, None
-
+        # 检查是否在黑名单
+        is_blocked, reason = _blacklist_reason(session_id, username, message)
         if is_blocked:
             logger.warning(f"⚠️ 弹幕被拦截 - 原因: {reason}")
             return jsonify({"status": "blocked", "reason": reason})
         
-        # 添加弹幕
-        if db.add_bullet_screen(session_id, username, message):
-            # 广播到 WebSocket 客户端（若已启用）以实现实时推送
-            try:
-                if _bullet_ws:
-                    _bullet_ws.broadcast({
-                        'type': 'bullet',
-                        'session_id': session_id,
-                        'username': username,
-                        'message': message
-                    })
-            except Exception:
-                logger.warning('弹幕广播失败', exc_info=True)
-            return jsonify({"status": "success"})
+        # 添加弹幕（同一问题窗口内只入队一条，与并发请求合并写库）
+        [(bullet_id, merged)] = _enqueue_bullets(session_id, [{'username': username, 'message': message}])
+        if bullet_id:
+            _broadcast_bullet(session_id, username, message, bullet_id, merged)
+            if not merged:
+                bullet_worker.notify(session_id)
+            return jsonify({"status": "success", "id": bullet_id, "merged": merged})
         else:
             return jsonify({"error": "添加弹幕失败"}), 500
             
@@ -183,6 +327,81 @@ def add_bullet_screen():
         logger.error(f"添加弹幕异常: {str(e)}", exc_info=True)
         return jsonify({"error": f"服务器错误: {str(e)}"}), 500
 
+
+@chat_bp.route('/bullet-screen/bulk', methods=['POST'])
+def add_bullet_screens_bulk():
+    """批量添加弹幕
+    
+    请求: {"session_id": "...", "bullets": [{"username": "...", "message": "...", "category"?, "priority"?}, ...]}
+    返回: results 与 bullets 一一对应，每项为 {"status": "success", "id": ..., "merged": bool}、
+          {"status": "blocked", "reason": ...} 或 {"status": "invalid"/"failed", "error": ...}
+    """
+    try:
+        data = request.json
+        
+        if not data:
+            return jsonify({"error": "请求数据不能为空"}), 400
+        
+        session_id = data.get('session_id')
+        bullets = data.get('bullets')
+        
+        if not session_id or not isinstance(bullets, list) or not bullets:
+            return jsonify({"error": "缺少必要参数"}), 400
+        
+        if len(bullets) > Config.BULLET_BULK_MAX:
+            return jsonify({"error": f"单次最多提交{Config.BULLET_BULK_MAX}条弹幕"}), 400
+        
+        try:
+            uuid.UUID(session_id)
+        except ValueError:
+            return jsonify({"error": "无效的会话ID"}), 400
+        
+        results = [None] * len(bullets)
+        accepted = []  # (下标, 弹幕)
+        for i, item in enumerate(bullets):
+            username = item.get('username') if isinstance(item, dict) else None
+            message = item.get('message') if isinstance(item, dict) else None
+            if not username or not message:
+                results[i] = {"status": "invalid", "error": "缺少必要参数"}
+                continue
+            is_blocked, reason = _blacklist_reason(session_id, username, message)
+            if is_blocked:
+                results[i] = {"status": "blocked", "reason": reason}
+                continue
+            accepted.append((i, {
+                'session_id': session_id,
+                'username': username,
+                'message': message,
+                'category': item.get('category') or 'unknown',
+                'priority': item.get('priority') or 0,
+            }))
+        
+        # 去重聚类后整批一次多行 INSERT
+        enqueued = _enqueue_bullets(session_id, [b for _, b in accepted])
+        for (i, bullet), (bullet_id, merged) in zip(accepted, enqueued):
+            if bullet_id:
+                results[i] = {"status": "success", "id": bullet_id, "merged": merged}
+                _broadcast_bullet(session_id, bullet['username'], bullet['message'], bullet_id, merged)
+            else:
+                results[i] = {"status": "failed", "error": "添加弹幕失败"}
+        
+        success_count = sum(1 for r in results if r['status'] == 'success')
+        merged_count = sum(1 for r in results if r.get('merged'))
+        if success_count > merged_count:
+            bullet_worker.notify(session_id)
+        logger.info(f"批量收到弹幕 - 会话: {session_id}, 提交: {len(bullets)}, 入队: {success_count - merged_count}, "
+                    f"并入已有问题: {merged_count}")
+        return jsonify({
+            "session_id": session_id,
+            "results": results,
+            "count": success_count,
+            "merged": merged_count
+        })
+        
+    except Exception as e:
+        logger.error(f"批量添加弹幕异常: {str(e)}", exc_info=True)
+        return jsonify({"error": f"服务器错误: {str(e)}"}), 500
+
 @chat_bp.route('/bullet-screen/pending', methods=['GET'])
 def get_pending_bullet_screens():
     """获取待处理的弹幕"""
@@ -215,4 +434,212 @@ def get_pending_bullet_screens():
         return jsonify({"error": f"服务器错误: {str(e)}"}), 500
 
 
-# 语音模块已移除：/api/tts 文件与状态端点不再提供。
+def _valid_session_id(session_id):
+    try:
+        uuid.UUID(session_id)
+        return True
+    except (TypeError, ValueError):
+        return False
+
+
+def _parse_ids(value):
+    """解析弹幕 id 列表，格式不对返回 None"""
+    if not isinstance(value, list) or not value:
+        return None
+    try:
+        return [int(v) for v in value]
+    except (TypeError, ValueError):
+        return None
+
+
+@chat_bp.route('/bullet-screen/claim', methods=['POST'])
+def claim_bullet_screens():
+    """领取一批弹幕并加租约，处理完成后调用 /bullet-screen/ack，失败调用 /bullet-screen/nack
+    
+    请求: {"session_id": "...", "limit"?: 10, "lease_seconds"?: 30}
+    返回: {"lease_token": "...", "bullet_screens": [...], "count": n}，没有可领取的弹幕时 lease_token 为 null
+    """
+    try:
+        data = request.json or {}
+        session_id = data.get('session_id')
+        if not _valid_session_id(session_id):
+            return jsonify({"error": "无效的会话ID"}), 400
+        
+        try:
+            limit = min(max(int(data.get('limit', 10)), 1), Config.BULLET_CLAIM_MAX)
+            lease_seconds = max(int(data.get('lease_seconds') or Config.BULLET_LEASE_SECONDS), 1)
+        except (TypeError, ValueError):
+            return jsonify({"error": "limit 和 lease_seconds 必须是整数"}), 400
+        
+        lease_token, bullet_screens = db.claim_bullet_screens(session_id, limit, lease_seconds)
+        return jsonify({
+            "session_id": session_id,
+            "lease_token": lease_token,
+            "lease_seconds": lease_seconds,
+            "bullet_screens": bullet_screens,
+            "count": len(bullet_screens)
+        })
+        
+    except Exception as e:
+        logger.error(f"领取弹幕异常: {str(e)}", exc_info=True)
+        return jsonify({"error": f"服务器错误: {str(e)}"}), 500
+
+
+@chat_bp.route('/bullet-screen/ack', methods=['POST'])
+def ack_bullet_screens():
+    """确认弹幕处理完成
+    
+    请求: {"lease_token": "...", "ids": [1, 2]}
+    返回: acked 为确认成功的条数；租约过期后已被他人重新领取的弹幕列在 stale 中
+    """
+    try:
+        data = request.json or {}
+        lease_token = data.get('lease_token')
+        ids = _parse_ids(data.get('ids'))
+        if not lease_token or ids is None:
+            return jsonify({"error": "缺少必要参数"}), 400
+        
+        acked = db.ack_bullet_screens(lease_token, ids)
+        if acked < 0:
+            return jsonify({"error": "确认弹幕失败"}), 500
+        return jsonify({"acked": acked, "stale": len(ids) - acked})
+        
+    except Exception as e:
+        logger.error(f"确认弹幕异常: {str(e)}", exc_info=True)
+        return jsonify({"error": f"服务器错误: {str(e)}"}), 500
+
+
+@chat_bp.route('/bullet-screen/nack', methods=['POST'])
+def nack_bullet_screens():
+    """弹幕处理失败：放回队列重试，领取次数达到 BULLET_MAX_ATTEMPTS 的转入死信
+    
+    请求: {"lease_token": "...", "ids": [1, 2], "error"?: "..."}
+    """
+    try:
+        data = request.json or {}
+        lease_token = data.get('lease_token')
+        ids = _parse_ids(data.get('ids'))
+        if not lease_token or ids is None:
+            return jsonify({"error": "缺少必要参数"}), 400
+        
+        result = db.nack_bullet_screens(lease_token, ids, data.get('error'))
+        if result is None:
+            return jsonify({"error": "释放弹幕失败"}), 500
+        return jsonify(result)
+        
+    except Exception as e:
+        logger.error(f"释放弹幕异常: {str(e)}", exc_info=True)
+        return jsonify({"error": f"服务器错误: {str(e)}"}), 500
+
+
+@chat_bp.route('/bullet-screen/dead-letter', methods=['GET'])
+def get_dead_bullet_screens():
+    """查看会话的死信弹幕及队列各状态条数"""
+    try:
+        session_id = request.args.get('session_id')
+        limit = min(max(request.args.get('limit', 50, type=int), 1), 500)
+        if not _valid_session_id(session_id):
+            return jsonify({"error": "无效的会话ID"}), 400
+        
+        bullet_screens = db.get_dead_bullet_screens(session_id, limit)
+        return jsonify({
+            "session_id": session_id,
+            "bullet_screens": bullet_screens,
+            "count": len(bullet_screens),
+            "queue": db.get_bullet_queue_stats(session_id)
+        })
+        
+    except Exception as e:
+        logger.error(f"获取死信弹幕异常: {str(e)}", exc_info=True)
+        return jsonify({"error": f"服务器错误: {str(e)}"}), 500
+
+
+@chat_bp.route('/bullet-screen/dead-letter/requeue', methods=['POST'])
+def requeue_dead_bullet_screens():
+    """把死信弹幕重新放回队列
+    
+    请求: {"session_id": "...", "ids"?: [1, 2]}，不传 ids 时放回会话全部死信
+    """
+    try:
+        data = request.json or {}
+        session_id = data.get('session_id')
+        if not _valid_session_id(session_id):
+            return jsonify({"error": "无效的会话ID"}), 400
+        
+        ids = None
+        if data.get('ids') is not None:
+            ids = _parse_ids(data.get('ids'))
+            if ids is None:
+                return jsonify({"error": "ids 必须是非空整数列表"}), 400
+        
+        requeued = db.requeue_dead_bullet_screens(session_id, ids)
+        if requeued < 0:
+            return jsonify({"error": "重新入队失败"}), 500
+        logger.info(f"死信弹幕重新入队 - 会话: {session_id}, 条数: {requeued}")
+        return jsonify({"session_id": session_id, "requeued": requeued})
+        
+    except Exception as e:
+        logger.error(f"重新入队死信弹幕异常: {str(e)}", exc_info=True)
+        return jsonify({"error": f"服务器错误: {str(e)}"}), 500
+
+
+@chat_bp.route('/session/<session_id>/events', methods=['GET'])
+def session_events(session_id):
+    """订阅会话事件（SSE），替代轮询 /bullet-screen/pending
+    
+    连接建立后先发送一条 snapshot（当前待处理弹幕），之后实时推送：
+      {"type": "snapshot", "bullet_screens": [...]}
+      {"type": "bullet", "id": ..., "username": ..., "message": ..., "merged": bool}   新弹幕（merged 表示并入已有问题）
+      {"type": "answer", "bullet_id": ..., "answer": ..., "source": ..., "audio_url": ...}  自动应答生成的答案
+      {"type": "dropped", "count": n}   消费过慢，积压超过 EVENT_QUEUE_MAX 被丢弃的最旧事件条数
+    snapshot 在订阅之后读取，两者可能包含同一条弹幕，客户端按 id 去重；空闲时每 EVENT_HEARTBEAT 秒发送一条注释心跳。
+    """
+    if not _valid_session_id(session_id):
+        return jsonify({"error": "无效的会话ID"}), 400
+    if not db.session_exists(session_id):
+        return jsonify({"error": "会话不存在"}), 404
+    
+    sub = event_hub.subscribe(session_id)
+    try:
+        snapshot = db.get_pending_bullet_screens(session_id, Config.EVENT_SNAPSHOT_LIMIT)
+    except Exception:
+        event_hub.unsubscribe(sub)
+        raise
+    logger.info(f"事件订阅 - 会话: {session_id}")
+    
+    def generate():
+        yield "retry: 3000\n\n"
+        yield _sse({"type": "snapshot", "session_id": session_id, "bullet_screens": snapshot})
+        while True:
+            frame = sub.get(timeout=Config.EVENT_HEARTBEAT)
+            yield frame if frame is not None else ": ping\n\n"
+    
+    response = Response(generate(), mimetype='text/event-stream', headers=SSE_HEADERS)
+    # 客户端断开时（包括生成器尚未开始执行）注销订阅
+    response.call_on_close(lambda: event_hub.unsubscribe(sub))
+    return response
+
+
+@chat_bp.route('/tts/status', methods=['GET'])
+def get_tts_status():
+    """查询后台 TTS 任务状态（job=<audio_job_id> 或 file=tts-<job_id>.wav|.mp3）"""
+    try:
+        job_id = request.args.get('job')
+        if not job_id:
+            filename = request.args.get('file', '')
+            stem, _, ext = filename.rpartition('.')
+            if stem.startswith('tts-') and ext in ('wav', 'mp3'):
+                job_id = stem[len('tts-'):]
+        
+        if not job_id:
+            return jsonify({"error": "缺少job参数"}), 400
+        
+        job = tts_jobs.get(job_id)
+        if not job:
+            return jsonify({"error": "语音任务不存在"}), 404
+        
+        return jsonify(job)
+        
+    except Exception as e:
+        logger.error(f"查询语音任务异常: {str(e)}", exc_info=True)
+        return jsonify({"error": f"服务器错误: {str(e)}"}), 500
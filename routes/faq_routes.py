@@ -4,6 +4,7 @@ FAQ路由 - 处理FAQ模板和导入
 from flask import Blueprint, request, jsonify
 import uuid
 from database import db
+from services.tts_prewarm import tts_prewarmer
 from utils.logger import get_logger
 
 logger = get_logger(__name__)
@@ -70,11 +71,16 @@ def apply_faq_template():
             return jsonify({"error": "应用FAQ模板失败"}), 500
         
         logger.info(f"成功应用FAQ模板 - 会话: {session_id}, 生成FAQ数量: {success_count}")
+        
+        # 后台预合成 FAQ 答案语音，进度可通过 /api/session/<id>/tts-prewarm 查询
+        tts_prewarm = tts_prewarmer.prewarm(session_id) if success_count else tts_prewarmer.get_progress(session_id)
+        
         return jsonify({
             "session_id": session_id,
             "product_type": product_type,
             "success_count": success_count,
-            "message": f"成功生成{success_count}条FAQ"
+            "message": f"成功生成{success_count}条FAQ",
+            "tts_prewarm": tts_prewarm
         })
         
     except Exception as e:
@@ -102,8 +108,7 @@ def import_faqs():
             return jsonify({"error": "无效的会话ID"}), 400
         
         # 验证会话是否存在
-        session = db.get_session(session_id)
-        if not session:
+        if not db.session_exists(session_id):
             return jsonify({"error": "会话不存在"}), 404
         
         logger.info(f"批量导入FAQ - 会话: {session_id}")
@@ -118,3 +123,25 @@ def import_faqs():
     except Exception as e:
         logger.error(f"导入FAQ异常: {str(e)}", exc_info=True)
         return jsonify({"error": f"服务器错误: {str(e)}"}), 500
+
+@faq_bp.route('/session/<session_id>/tts-prewarm', methods=['GET', 'POST'])
+def tts_prewarm(session_id):
+    """查询（GET）或启动（POST）会话 FAQ 答案的语音预热"""
+    try:
+        try:
+            uuid.UUID(session_id)
+        except ValueError:
+            return jsonify({"error": "无效的会话ID"}), 400
+        
+        if request.method == 'POST':
+            logger.info(f"启动FAQ语音预热 - 会话: {session_id}")
+            return jsonify(tts_prewarmer.prewarm(session_id))
+        
+        progress = tts_prewarmer.get_progress(session_id)
+        if not progress:
+            return jsonify({"error": "该会话尚未预热语音"}), 404
+        return jsonify(progress)
+        
+    except Exception as e:
+        logger.error(f"FAQ语音预热异常: {str(e)}", exc_info=True)
+        return jsonify({"error": f"服务器错误: {str(e)}"}), 500
@@ -0,0 +1,35 @@
+"""
+运行指标路由 - 暴露缓存、后台写入等进程内计数
+"""
+from flask import Blueprint, jsonify
+from database import db
+from services import ai_flight, bullet_ws, chat_async
+from services.bullet_worker import bullet_worker
+from services.event_hub import event_hub
+from services.tts_jobs import tts_jobs
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+metrics_bp = Blueprint('metrics', __name__, url_prefix='/api')
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    """获取当前进程的运行指标"""
+    try:
+        return jsonify({
+            "qa_cache": db.get_qa_cache_stats(),
+            "session_cache": db.get_session_cache_stats(),
+            "conversation_writer": db.get_conversation_writer_stats(),
+            "bullet_writer": db.get_bullet_writer_stats(),
+            "bullet_clusters": db.get_bullet_cluster_stats(),
+            "bullet_worker": bullet_worker.stats(),
+            "events": event_hub.stats(),
+            "ws": bullet_ws.stats(),
+            "ai_single_flight": ai_flight.stats(),
+            "chat_async": chat_async.stats(),
+            "tts_jobs": tts_jobs.stats()
+        })
+    except Exception as e:
+        logger.error(f"获取运行指标异常: {str(e)}", exc_info=True)
+        return jsonify({"error": f"服务器错误: {str(e)}"}), 500
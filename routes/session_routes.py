@@ -125,7 +125,11 @@ def create_session():
 
 @session_bp.route('/<session_id>', methods=['GET'])
 def get_session(session_id):
-    """获取会话信息"""
+    """获取会话信息
+    
+    默认不含对话历史；?include_history=1 时附带最近 history_limit（默认 50，最大 500）条对话，
+    完整历史请用 /api/session/<id>/conversations 分页获取
+    """
     try:
         # 验证session_id格式
         try:
@@ -133,10 +137,13 @@ def get_session(session_id):
         except ValueError:
             return jsonify({"error": "无效的会话ID"}), 400
         
-        logger.info(f"查询会话 - ID: {session_id}")
+        include_history = request.args.get('include_history', '').lower() in ('1', 'true', 'yes')
+        history_limit = max(1, min(request.args.get('history_limit', 50, type=int), 500))
+        
+        logger.info(f"查询会话 - ID: {session_id}, 含历史: {include_history}")
         
         # 获取会话
-        session = db.get_session(session_id)
+        session = db.get_session(session_id, include_history=include_history, history_limit=history_limit)
         if not session:
             return jsonify({"error": "会话不存在"}), 404
         
@@ -145,3 +152,41 @@ def get_session(session_id):
     except Exception as e:
         logger.error(f"查询会话异常: {str(e)}", exc_info=True)
         return jsonify({"error": f"服务器错误: {str(e)}"}), 500
+
+@session_bp.route('/<session_id>/conversations', methods=['GET'])
+def get_conversations(session_id):
+    """分页获取对话历史（游标分页）
+    
+    参数: after_id（默认 0，从头开始）、limit（默认 50，最大 200）
+    返回的 next_after_id 作为下一页的 after_id；has_more 为 false 时已到末尾
+    """
+    try:
+        try:
+            uuid.UUID(session_id)
+        except ValueError:
+            return jsonify({"error": "无效的会话ID"}), 400
+        
+        after_id = request.args.get('after_id', 0, type=int)
+        if after_id < 0:
+            return jsonify({"error": "after_id 必须是非负整数"}), 400
+        limit = max(1, min(request.args.get('limit', 50, type=int), 200))
+        
+        if not db.session_exists(session_id):
+            return jsonify({"error": "会话不存在"}), 404
+        
+        # 多取一条判断是否还有下一页
+        rows = db.get_conversations(session_id, after_id=after_id, limit=limit + 1)
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        
+        return jsonify({
+            "session_id": session_id,
+            "conversations": rows,
+            "count": len(rows),
+            "next_after_id": rows[-1]['id'] if rows else after_id,
+            "has_more": has_more
+        })
+        
+    except Exception as e:
+        logger.error(f"查询对话历史异常: {str(e)}", exc_info=True)
+        return jsonify({"error": f"服务器错误: {str(e)}"}), 500
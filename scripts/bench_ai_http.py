@@ -0,0 +1,83 @@
+"""
+AI 调用延迟基准测试：对比每次 `requests.post`（新建连接）与 AIService 的共享连接池。
+上游为本地桩服务（scripts/stub_deepseek.py），不消耗真实 API 额度。
+
+用法：
+  python scripts/bench_ai_http.py --count 200 --concurrency 8
+  python scripts/bench_ai_http.py --url https://api.deepseek.com/chat/completions  # 对真实端点（需 Key）
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (ROOT, os.path.dirname(os.path.abspath(__file__))):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+import requests
+from stub_deepseek import start_stub_server
+from services import AIService
+
+PAYLOAD = {
+    'model': 'deepseek-chat',
+    'messages': [{'role': 'user', 'content': '多少钱一斤'}],
+    'temperature': 0.7,
+    'max_tokens': 500,
+}
+
+
+def summarize(name, latencies, elapsed):
+    latencies = sorted(latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f'{name:<10} 总耗时 {elapsed:6.2f}s  平均 {statistics.mean(latencies) * 1000:7.2f} ms  '
+          f'p50 {statistics.median(latencies) * 1000:7.2f} ms  p95 {p95 * 1000:7.2f} ms')
+
+
+def run(fn, count, concurrency):
+    latencies = []
+
+    def one(_):
+        t0 = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(count)))
+    return latencies, time.perf_counter() - t0
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument('--count', type=int, default=200)
+    p.add_argument('--concurrency', type=int, default=8)
+    p.add_argument('--latency', type=float, default=0.0, help='桩服务模拟的生成耗时（秒）')
+    p.add_argument('--url', default=None, help='上游地址，默认启动本地桩服务')
+    args = p.parse_args()
+
+    url = args.url
+    if not url:
+        _, base = start_stub_server(latency=args.latency)
+        url = base + '/chat/completions'
+
+    def bare():
+        r = requests.post(url, json=PAYLOAD, timeout=30)
+        r.raise_for_status()
+
+    service = AIService()
+    service.api_url = url
+
+    def pooled():
+        assert service.call_api('多少钱一斤') is not None
+
+    print(f'上游: {url}, 请求数: {args.count}, 并发: {args.concurrency}')
+    summarize('无连接池', *run(bare, args.count, args.concurrency))
+    summarize('连接池', *run(pooled, args.count, args.concurrency))
+
+
+if __name__ == '__main__':
+    main()
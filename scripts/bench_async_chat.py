@@ -0,0 +1,120 @@
+"""
+同步/异步对话路径并排基准测试：对 Flask（app.py）与 ASGI（asgi.py）两个服务以相同并发发送 /api/chat 请求，
+每个请求的问题都不同（不命中 FAQ/缓存，也不会被合并），对比吞吐与延迟；并先核对两边的错误响应完全一致。
+（唯一已知差异：请求体不是合法 JSON 时 Flask 返回 500，异步路径按空请求返回 400。）
+
+准备（上游为本地桩服务，不消耗真实 API 额度）：
+  python scripts/stub_deepseek.py --port 8765 --latency 1.0 --token-delay 0
+  DEEPSEEK_API_URL=http://127.0.0.1:8765/chat/completions python app.py                 # 同步，5000 端口
+  DEEPSEEK_API_URL=http://127.0.0.1:8765/chat/completions uvicorn asgi:app --port 5001   # 异步
+用法：
+  python scripts/bench_async_chat.py --sync http://127.0.0.1:5000 --async http://127.0.0.1:5001 --requests 2000 --concurrency 500
+"""
+import os
+import sys
+import time
+import argparse
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+# 与 Flask 版本逐字节比较的请求（不依赖数据库内容）
+CONTRACT_CASES = [
+    ('空请求', {}),
+    ('缺少会话ID', {'message': '你好'}),
+    ('会话ID格式错误', {'session_id': 'not-a-uuid', 'message': '你好'}),
+    ('空消息', {'session_id': '00000000-0000-0000-0000-000000000000', 'message': '   '}),
+    ('消息过长', {'session_id': '00000000-0000-0000-0000-000000000000', 'message': '长' * 501}),
+]
+
+
+def create_session(api):
+    r = requests.post(api + '/api/session', timeout=10, json={
+        'host_name': '压测主播', 'live_theme': '异步对话压测', 'products': [{'name': '示例商品', 'price': 10}]})
+    r.raise_for_status()
+    return r.json()['session_id']
+
+
+def check_contract(sync_api, async_api):
+    same = True
+    for name, body in CONTRACT_CASES:
+        results = []
+        for api in (sync_api, async_api):
+            r = requests.post(api + '/api/chat', json=body, timeout=10)
+            results.append((r.status_code, r.content))
+        ok = results[0] == results[1]
+        same &= ok
+        print(f"  {'一致' if ok else '不一致'}: {name} -> {results[0][0]} {results[0][1][:60]!r}"
+              + ('' if ok else f" / 异步 {results[1][0]} {results[1][1][:60]!r}"))
+    return same
+
+
+def run(api, session_id, total, concurrency, tag):
+    local = threading.local()
+    latencies = []
+    statuses = Counter()
+    lock = threading.Lock()
+
+    def one(i):
+        http = getattr(local, 'http', None)
+        if http is None:
+            http = local.http = requests.Session()
+        t0 = time.perf_counter()
+        try:
+            r = http.post(api + '/api/chat', timeout=120, json={
+                'session_id': session_id, 'message': f'第{tag}-{i}位观众想问：这个适合送长辈吗'})
+            status = r.status_code
+            if status == 200 and 'response' not in r.json():
+                status = 'bad-body'
+        except requests.RequestException as e:
+            status = type(e).__name__
+        elapsed = time.perf_counter() - t0
+        with lock:
+            latencies.append(elapsed)
+            statuses[status] += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(total)))
+    duration = time.perf_counter() - started
+    latencies.sort()
+    pct = lambda q: latencies[min(len(latencies) - 1, int(len(latencies) * q))] * 1000
+    return {
+        'duration': duration,
+        'rps': total / duration,
+        'ok': statuses.get(200, 0),
+        'statuses': dict(statuses),
+        'p50': pct(0.5), 'p95': pct(0.95), 'p99': pct(0.99),
+    }
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument('--sync', default='http://127.0.0.1:5000', help='Flask 服务地址')
+    p.add_argument('--async', dest='async_', default='http://127.0.0.1:5001', help='ASGI 服务地址')
+    p.add_argument('--session', default=None, help='会话ID，默认新建（两个服务共用同一数据库）')
+    p.add_argument('--requests', type=int, default=2000, help='每个服务的请求数')
+    p.add_argument('--concurrency', type=int, default=500, help='并发请求数')
+    args = p.parse_args()
+
+    sync_api, async_api = args.sync.rstrip('/'), args.async_.rstrip('/')
+    print('响应契约核对:')
+    check_contract(sync_api, async_api)
+
+    session_id = args.session or create_session(sync_api)
+    tag = int(time.time())
+    print(f'\n{args.requests} 个请求, 并发 {args.concurrency}:')
+    for name, api in (('同步 Flask', sync_api), ('异步 ASGI', async_api)):
+        r = run(api, session_id, args.requests, args.concurrency, f'{tag}{name[:2]}')
+        print(f"  {name}: {r['rps']:.1f} 请求/秒, 成功 {r['ok']}/{args.requests}, 耗时 {r['duration']:.1f}s, "
+              f"延迟 p50 {r['p50']:.0f} ms / p95 {r['p95']:.0f} ms / p99 {r['p99']:.0f} ms, 状态 {r['statuses']}")
+
+
+if __name__ == '__main__':
+    main()
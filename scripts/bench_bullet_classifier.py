@@ -0,0 +1,92 @@
+"""
+弹幕规则分类器基准测试：单核分类吞吐与小样本标注集上的准确率。
+不依赖数据库；会话关键词取 data/whitelist.json 中全部 FAQ 模板的 pattern 加若干商品名。
+
+用法：
+  python scripts/bench_bullet_classifier.py --count 50000
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+from collections import Counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from utils.bullet_classifier import BulletClassifier, default_classifier
+
+PRODUCTS = ['赣南脐橙', '阳光玫瑰', '土鸡蛋', '五常大米', '竹编篮', '手工辣酱', '草莓', '猕猴桃']
+
+# 人工标注样本 (消息, 期望类别)
+LABELED = [
+    ('这件怎么卖？', 'price'), ('有优惠吗？', 'price'), ('色泽不错，多少钱一斤？', 'price'),
+    ('脐橙多少钱', 'price'), ('能便宜点吗', 'price'), ('链接在哪', 'price'), ('还有货吗', 'price'),
+    ('包邮吗', 'shipping'), ('什么时候发货呀', 'shipping'), ('发顺丰吗', 'shipping'),
+    ('坏果包赔吗', 'shipping'), ('几天到北京', 'shipping'), ('可以退货吗', 'shipping'),
+    ('能讲一下产地吗？', 'product_question'), ('能试吃吗？', 'product_question'), ('包装怎样？', 'product_question'),
+    ('甜不甜', 'product_question'), ('保质期多久', 'product_question'), ('草莓新鲜吗', 'product_question'),
+    ('大米是今年的新米吗', 'product_question'), ('这个辣酱辣不辣', 'product_question'),
+    ('主播介绍一下吧', 'product_question'), ('土鸡蛋是散养的吗', 'product_question'),
+    ('主播好', 'chit_chat'), ('哈哈哈', 'chit_chat'), ('666', 'chit_chat'), ('来了来了', 'chit_chat'),
+    ('主播加油', 'chit_chat'), ('晚上好呀', 'chit_chat'), ('好看', 'chit_chat'), ('打卡', 'chit_chat'),
+    ('加v了解更多 13800138000', 'spam'), ('兼职日赚500私聊', 'spam'), ('看我主页有惊喜', 'spam'),
+    ('www.example.com 低价', 'spam'), ('啊啊啊啊啊啊啊啊啊啊', 'spam'),
+]
+
+
+def load_faq_patterns():
+    try:
+        with open(os.path.join(ROOT, 'data', 'whitelist.json'), 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return []
+    return [item['pattern'] for items in data.values() if isinstance(items, list)
+            for item in items if isinstance(item, dict) and item.get('pattern')]
+
+
+def bench(classifier, messages):
+    t0 = time.perf_counter()
+    for m in messages:
+        classifier.classify(m)
+    return time.perf_counter() - t0
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument('--count', type=int, default=50000, help='消息条数')
+    args = p.parse_args()
+
+    terms = PRODUCTS + load_faq_patterns()
+    t0 = time.perf_counter()
+    session_classifier = BulletClassifier(terms)
+    build_ms = (time.perf_counter() - t0) * 1000
+
+    rnd = random.Random(7)
+    messages = [rnd.choice(LABELED)[0] for _ in range(args.count)]
+
+    print(f'会话关键词: {len(terms)} 个, 分类器构建: {build_ms:.2f} ms')
+    for name, classifier in (('通用词表', default_classifier), ('含会话关键词', session_classifier)):
+        elapsed = bench(classifier, messages)
+        print(f'{name}: {len(messages)} 条 {elapsed * 1000:.1f} ms, '
+              f'{len(messages) / elapsed:,.0f} 条/秒, {elapsed / len(messages) * 1e6:.1f} us/条')
+
+    correct = 0
+    confusion = Counter()
+    for message, expected in LABELED:
+        category, confidence = session_classifier.classify(message)
+        if category == expected:
+            correct += 1
+        else:
+            confusion[(expected, category)] += 1
+            print(f'  误判: {message!r} 期望 {expected}, 实际 {category} ({confidence})')
+    print(f'标注样本准确率: {correct}/{len(LABELED)} ({correct / len(LABELED):.0%})')
+    dist = Counter(session_classifier.classify(m)[0] for m in messages)
+    print('类别分布:', dict(dist.most_common()))
+
+
+if __name__ == '__main__':
+    main()
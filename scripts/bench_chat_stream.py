@@ -0,0 +1,57 @@
+"""
+首字延迟（time-to-first-token）基准测试：对比 AIService.call_api（等待完整回复）
+与 AIService.stream_api（流式）。上游为本地桩服务（scripts/stub_deepseek.py）。
+
+用法：
+  python scripts/bench_chat_stream.py --count 10 --latency 0.3 --token-delay 0.05
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (ROOT, os.path.dirname(os.path.abspath(__file__))):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from stub_deepseek import start_stub_server
+from services import AIService
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument('--count', type=int, default=10)
+    p.add_argument('--latency', type=float, default=0.3, help='首个片段前的模拟耗时（秒）')
+    p.add_argument('--token-delay', type=float, default=0.05, help='片段间隔（秒）')
+    args = p.parse_args()
+
+    _, base = start_stub_server(latency=args.latency, token_delay=args.token_delay)
+    service = AIService()
+    service.api_url = base + '/chat/completions'
+
+    blocking_ttft, stream_ttft, stream_total = [], [], []
+    for _ in range(args.count):
+        t0 = time.perf_counter()
+        full = service.call_api('多少钱一斤')
+        blocking_ttft.append(time.perf_counter() - t0)
+
+        t0 = time.perf_counter()
+        first = None
+        parts = []
+        for text in service.stream_api('多少钱一斤'):
+            if first is None:
+                first = time.perf_counter() - t0
+            parts.append(text)
+        stream_ttft.append(first)
+        stream_total.append(time.perf_counter() - t0)
+        assert ''.join(parts) == full, '流式拼接结果与非流式不一致'
+
+    print(f'请求数: {args.count}, 首片段耗时: {args.latency}s, 片段间隔: {args.token_delay}s')
+    print(f'非流式  首字延迟 {statistics.mean(blocking_ttft) * 1000:8.1f} ms（= 完整回复耗时）')
+    print(f'流式    首字延迟 {statistics.mean(stream_ttft) * 1000:8.1f} ms，完整回复 {statistics.mean(stream_total) * 1000:8.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
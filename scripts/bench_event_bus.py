@@ -0,0 +1,136 @@
+"""
+多进程事件推送基准测试：启动 N 个工作进程模拟多 worker 部署，每个进程有自己的 EventHub 与 SSE 订阅者，
+各进程同时发布事件，经事件总线（默认为本地代理 scripts/event_broker.py）转发到所有进程，
+统计整体发布吞吐（条/秒）、跨进程送达吞吐与发布到订阅者收到的延迟。
+
+用法：
+  python scripts/bench_event_bus.py --workers 4 --count 20000
+  python scripts/bench_event_bus.py --workers 8 --count 5000 --rate 1000     # 每进程限速
+  python scripts/bench_event_bus.py --unix /tmp/xiaoju-bench.sock             # 本地代理走 Unix socket
+  python scripts/bench_event_bus.py --url redis://127.0.0.1:6379              # 对真实 Redis
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+import multiprocessing as mp
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (ROOT, os.path.dirname(os.path.abspath(__file__))):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+ROOM = 'bench-room'
+
+
+def worker(idx, url, count, rate, subscribers, barrier, results):
+    import logging
+    logging.disable(logging.WARNING)
+    from services.event_bus import create_bus
+    from services.event_hub import EventHub
+    from utils.rate_limiter import RateLimiter
+
+    hub = EventHub(max_queue=10 ** 6, bus=create_bus(url))
+    subs = [hub.subscribe(ROOM) for _ in range(subscribers)]
+    deadline = time.time() + 10
+    while not hub.bus.stats().get('connected', True) and time.time() < deadline:
+        time.sleep(0.05)
+
+    expected = count * barrier.parties
+    state = {'received': 0, 'remote': 0, 'latencies': []}
+
+    def consume(sub, record):
+        received = 0
+        while received < expected:
+            frame = sub.get(timeout=30)
+            if frame is None:
+                break
+            event = json.loads(frame[6:])
+            received += 1
+            if record:
+                state['latencies'].append(time.time() - event['ts'])
+                state['remote'] += event['w'] != idx
+        if record:
+            state['received'] = received
+
+    # 只解析第一个订阅者的事件计算延迟，其余订阅者只取帧（与 SSE 生成器一致）
+    threads = [threading.Thread(target=consume, args=(sub, i == 0), daemon=True) for i, sub in enumerate(subs)]
+    for t in threads:
+        t.start()
+
+    barrier.wait()
+    limiter = RateLimiter(rate) if rate else None
+    started = time.perf_counter()
+    for i in range(count):
+        if limiter:
+            limiter.acquire()
+        hub.publish(ROOM, {'type': 'bullet', 'w': idx, 'i': i, 'username': f'观众{i % 100:02d}', 'message': f'压测弹幕{i}'})
+    publish_s = time.perf_counter() - started
+    for t in threads:
+        t.join(60)
+    results.put({
+        'idx': idx,
+        'publish_s': publish_s,
+        'done_s': time.perf_counter() - started,
+        'received': state['received'],
+        'remote': state['remote'],
+        'expected': expected,
+        'latencies': state['latencies'],
+        'bus': hub.bus.stats(),
+    })
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument('--workers', type=int, default=4, help='工作进程数')
+    p.add_argument('--count', type=int, default=20000, help='每个进程发布的事件数')
+    p.add_argument('--rate', type=float, default=0, help='每个进程每秒发布条数，0 为不限速')
+    p.add_argument('--subscribers', type=int, default=1, help='每个进程的 SSE 订阅者数')
+    p.add_argument('--url', default=None, help='事件总线地址，默认在本进程启动本地代理')
+    p.add_argument('--port', type=int, default=6390, help='本地代理端口')
+    p.add_argument('--unix', default=None, help='本地代理改为监听该 Unix socket 路径')
+    args = p.parse_args()
+
+    url = args.url
+    broker = None
+    if not url:
+        from event_broker import start_broker
+        broker = start_broker(port=args.port, unix_path=args.unix)
+        url = f'unix://{args.unix}' if args.unix else f'redis://127.0.0.1:{args.port}'
+
+    ctx = mp.get_context('spawn')
+    barrier = ctx.Barrier(args.workers)
+    results = ctx.Queue()
+    procs = [ctx.Process(target=worker, args=(i, url, args.count, args.rate, args.subscribers, barrier, results))
+             for i in range(args.workers)]
+    for proc in procs:
+        proc.start()
+    rows = [results.get(timeout=600) for _ in procs]
+    for proc in procs:
+        proc.join()
+
+    total_published = args.count * args.workers
+    wall = max(r['done_s'] for r in rows)
+    publish_wall = max(r['publish_s'] for r in rows)
+    received = sum(r['received'] for r in rows)
+    expected = sum(r['expected'] for r in rows)
+    remote = sum(r['remote'] for r in rows)
+    latencies = sorted(l for r in rows for l in r['latencies'])
+
+    print(f'总线: {url}, 进程: {args.workers}, 每进程订阅者: {args.subscribers}')
+    print(f'发布: {total_published} 条, 耗时 {publish_wall:.2f}s, {total_published / publish_wall:,.0f} 条/秒')
+    print(f'送达: {received}/{expected} ({received / expected:.1%}), 其中跨进程 {remote} 条, '
+          f'全部送达耗时 {wall:.2f}s, {received / wall:,.0f} 条/秒（每进程一个订阅者计）')
+    if latencies:
+        pct = lambda q: latencies[min(len(latencies) - 1, int(len(latencies) * q))] * 1000
+        print(f'延迟: p50 {pct(0.5):.1f} ms, p95 {pct(0.95):.1f} ms, p99 {pct(0.99):.1f} ms, 最大 {latencies[-1] * 1000:.1f} ms')
+    dropped = sum(r['bus'].get('dropped', 0) for r in rows)
+    print(f'总线丢弃: {dropped}')
+    if broker is not None:
+        print(f'代理: 转发 {broker.published} 条, 投递 {broker.delivered} 次, 断开慢连接 {broker.dropped_clients} 个')
+
+
+if __name__ == '__main__':
+    main()
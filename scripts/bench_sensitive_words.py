@@ -0,0 +1,80 @@
+"""
+敏感词检测基准测试：对比旧的逐词 `in` 扫描与 Aho-Corasick 自动机。
+不依赖数据库，直接读取 data/blacklist.json 的 `_global` 词表。
+
+用法：
+  python scripts/bench_sensitive_words.py --count 20000 --extra-words 2000
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from utils.ac_automaton import AhoCorasick
+
+SAMPLE_MSGS = ['这件怎么卖？', '有优惠吗？', '能讲一下产地吗？', '能试吃吗？', '包装怎样？',
+               '色泽不错，多少钱一斤？', '主播介绍一下吧', '草莓甜不甜，坏果包赔吗，什么时候发货呀']
+
+
+def load_words(extra):
+    with open(os.path.join(ROOT, 'data', 'blacklist.json'), 'r', encoding='utf-8') as f:
+        words = list(json.load(f).get('_global', []))
+    # 追加随机生成的词，模拟大词表
+    rnd = random.Random(42)
+    for _ in range(extra):
+        words.append(''.join(chr(rnd.randint(0x4e00, 0x9fa5)) for _ in range(rnd.randint(2, 4))))
+    return words
+
+
+def old_loop(words, message):
+    """旧实现：逐词小写化后做子串判断"""
+    msg_lower = message.lower().strip()
+    matched = []
+    for word in words:
+        if not word:
+            continue
+        if word.lower().strip() in msg_lower:
+            matched.append(word)
+    return matched
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument('--count', type=int, default=20000, help='消息条数')
+    p.add_argument('--extra-words', type=int, default=0, help='额外追加的随机敏感词数量')
+    args = p.parse_args()
+
+    words = load_words(args.extra_words)
+    rnd = random.Random(7)
+    messages = [rnd.choice(SAMPLE_MSGS) for _ in range(args.count)]
+    total_chars = sum(len(m) for m in messages)
+
+    t0 = time.perf_counter()
+    matcher = AhoCorasick([w.lower().strip() for w in words])
+    build_ms = (time.perf_counter() - t0) * 1000
+
+    t0 = time.perf_counter()
+    old_hits = [old_loop(words, m) for m in messages]
+    old_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    new_hits = [[words[i] for i in matcher.find_all(m.lower())] for m in messages]
+    new_s = time.perf_counter() - t0
+
+    assert old_hits == new_hits, '两种实现的匹配结果不一致'
+
+    print(f'词表: {len(words)} 个, 消息: {len(messages)} 条, 总字符: {total_chars}')
+    print(f'自动机构建: {build_ms:.2f} ms')
+    print(f'旧循环:   {old_s * 1000:.1f} ms  ({old_s / total_chars * 1e9:.0f} ns/字符)')
+    print(f'自动机:   {new_s * 1000:.1f} ms  ({new_s / total_chars * 1e9:.0f} ns/字符)')
+    print(f'加速比:   {old_s / new_s:.1f}x')
+
+
+if __name__ == '__main__':
+    main()
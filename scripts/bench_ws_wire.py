@@ -0,0 +1,173 @@
+"""
+WebSocket 推送格式基准测试：同一组弹幕/答案事件分别以默认 JSON 格式与紧凑批量格式推送给 N 个客户端，
+对比每条事件的负载字节数、帧数，以及服务端与客户端每条事件的 CPU 时间。
+
+服务端（bullet_ws）在本进程启动，客户端在子进程中运行（websocket-client），两边的 CPU 分开统计。
+注意：浏览器通常会协商 permessage-deflate 压缩，这里统计的是压缩前的负载字节。
+
+用法（需要安装 websockets 与 websocket-client）：
+  python scripts/bench_ws_wire.py --clients 50 --events 5000 --rate 500 --batch-ms 20
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+import multiprocessing as mp
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+SESSION_ID = '2f1c6a9e-5b7d-4e2a-9c3f-8d6b1a0e7f42'
+MESSAGES = ['这个多少钱一斤', '包邮吗', '什么时候发货呀', '甜不甜', '主播好', '还有货吗', '能便宜点吗',
+            '保质期多久', '链接在哪', '666', '坏果包赔吗', '产地是哪里的', '五斤装多少钱', '来了来了']
+
+
+def make_events(count, answer_ratio, seed=7):
+    rnd = random.Random(seed)
+    events = []
+    for i in range(count):
+        if events and rnd.random() < answer_ratio:
+            events.append({'type': 'answer', 'bullet_id': i, 'username': f'观众{rnd.randrange(10000):04d}',
+                           'message': rnd.choice(MESSAGES), 'cluster_count': rnd.randint(1, 5),
+                           'answer': '这款草莓是今早现摘的，九分甜！现在下单次日发货，坏果包赔。', 'source': 'faq',
+                           'audio_url': None, 'audio_job_id': None})
+        else:
+            events.append({'type': 'bullet', 'id': 100000 + i, 'username': f'观众{rnd.randrange(10000):04d}',
+                           'message': rnd.choice(MESSAGES), 'merged': False})
+    return events
+
+
+def run_clients(url, clients, expected, results):
+    """子进程：建立 clients 个连接，收满 expected 条事件后汇报字节数、帧数、延迟与 CPU"""
+    import websocket
+    from utils import compact_frames
+
+    compact = 'format=compact' in url
+    stats = []
+    ready = threading.Barrier(clients + 1)
+
+    def client():
+        ws = websocket.create_connection(url, timeout=60)
+        nbytes = frames = events = 0
+        latencies = []
+        schema = None
+        ready.wait()
+        try:
+            while events < expected:
+                raw = ws.recv()
+                frames += 1
+                nbytes += len(raw.encode('utf-8'))
+                now = time.time()
+                if compact and raw.startswith('['):
+                    batch = compact_frames.decode_batch(raw, schema)
+                    events += len(batch)
+                    latencies.extend(now - e['ts'] for e in batch)
+                else:
+                    msg = json.loads(raw)
+                    if msg.get('type') == 'hello':
+                        schema = msg['schema']
+                        frames -= 1
+                        nbytes -= len(raw.encode('utf-8'))
+                        continue
+                    if msg.get('type') in ('bullet', 'answer'):
+                        events += 1
+                        latencies.append(now - msg['ts'])
+        except Exception:
+            pass
+        finally:
+            ws.close()
+        stats.append((nbytes, frames, events, latencies))
+
+    threads = [threading.Thread(target=client, daemon=True) for _ in range(clients)]
+    for t in threads:
+        t.start()
+    ready.wait()
+    results.put('ready')
+    cpu0 = time.process_time()
+    for t in threads:
+        t.join(300)
+    results.put({
+        'bytes': sum(s[0] for s in stats),
+        'frames': sum(s[1] for s in stats),
+        'events': sum(s[2] for s in stats),
+        'latencies': sorted(l for s in stats for l in s[3]),
+        'cpu': time.process_time() - cpu0,
+    })
+
+
+def bench(mode, port, args, events):
+    from services import bullet_ws
+
+    url = f'ws://127.0.0.1:{port}/?session_id={SESSION_ID}' + ('&format=compact' if mode == 'compact' else '')
+    ctx = mp.get_context('spawn')
+    results = ctx.Queue()
+    proc = ctx.Process(target=run_clients, args=(url, args.clients, len(events), results))
+    proc.start()
+    results.get(timeout=60)
+    time.sleep(0.3)
+
+    interval = 1.0 / args.rate
+    cpu0 = time.process_time()
+    started = time.perf_counter()
+    for i, event in enumerate(events):
+        target = started + i * interval
+        delay = target - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        bullet_ws.broadcast(dict(event, session_id=SESSION_ID, ts=time.time()))
+    row = results.get(timeout=300)
+    server_cpu = time.process_time() - cpu0
+    proc.join()
+    row['server_cpu'] = server_cpu
+    return row
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument('--clients', type=int, default=50, help='订阅客户端数')
+    p.add_argument('--events', type=int, default=5000, help='推送事件数')
+    p.add_argument('--rate', type=float, default=500, help='每秒推送事件数')
+    p.add_argument('--answer-ratio', type=float, default=0.1, help='答案事件占比')
+    p.add_argument('--batch-ms', type=float, default=20, help='紧凑格式合并窗口（毫秒）')
+    p.add_argument('--port', type=int, default=6795)
+    args = p.parse_args()
+
+    import logging
+    logging.disable(logging.WARNING)
+    from config import Config
+    from services import bullet_ws
+
+    Config.WS_BATCH_MS = args.batch_ms
+    Config.WS_CLIENT_QUEUE_MAX = max(Config.WS_CLIENT_QUEUE_MAX, args.events + 10)
+    if not bullet_ws.start_server('127.0.0.1', args.port):
+        print('需要安装 websockets')
+        return
+    while not bullet_ws.stats()['enabled']:
+        time.sleep(0.05)
+
+    events = make_events(args.events, args.answer_ratio)
+    print(f'{args.clients} 个客户端, {args.events} 条事件 @ {args.rate:g}/s（答案占比 {args.answer_ratio:.0%}）, '
+          f'紧凑格式窗口 {args.batch_ms:g} ms')
+    rows = {}
+    for mode in ('json', 'compact'):
+        row = rows[mode] = bench(mode, args.port, args, events)
+        n = row['events'] or 1
+        lat = row['latencies']
+        pct = lambda q: lat[min(len(lat) - 1, int(len(lat) * q))] * 1000 if lat else 0
+        print(f'{mode:>7}: 送达 {row["events"]}/{args.events * args.clients}, '
+              f'{row["bytes"] / n:.1f} 字节/条, {row["frames"] / n:.3f} 帧/条, '
+              f'服务端 CPU {row["server_cpu"] / n * 1e6:.2f} us/条, 客户端 CPU {row["cpu"] / n * 1e6:.2f} us/条, '
+              f'延迟 p50 {pct(0.5):.1f} ms / p99 {pct(0.99):.1f} ms')
+    j, c = rows['json'], rows['compact']
+    if j['events'] and c['events']:
+        ratio = lambda key: (c[key] / c['events']) / (j[key] / j['events'])
+        print(f'紧凑格式相对 JSON: 字节 {1 - ratio("bytes"):.1%} 减少, 帧数 {1 - ratio("frames"):.1%} 减少, '
+              f'服务端 CPU {1 - ratio("server_cpu"):.1%} 减少, 客户端 CPU {1 - ratio("cpu"):.1%} 减少')
+
+
+if __name__ == '__main__':
+    main()
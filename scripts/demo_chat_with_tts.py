@@ -3,6 +3,7 @@ This runs in-process using Flask test_client so it doesn't require the server to
 running separately.
 """
 import json
+import time
 from pathlib import Path
 import dotenv
 
@@ -32,6 +33,17 @@ def main():
         data = chat_resp.get_json()
         print(json.dumps(data, ensure_ascii=False, indent=2))
 
+        # TTS 在后台合成：轮询任务状态直到完成
+        job_id = data.get('audio_job_id')
+        for _ in range(100):
+            if not job_id:
+                break
+            status = c.get(f'/api/tts/status?job={job_id}').get_json()
+            if status.get('status') != 'pending':
+                print('tts status:', status.get('status'), status.get('error') or '')
+                break
+            time.sleep(0.2)
+
         # check audio file
         audio_url = data.get('audio_url')
         if audio_url:
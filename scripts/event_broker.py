@@ -0,0 +1,187 @@
+"""
+本地事件总线代理：实现 Redis 协议中 PUBLISH / SUBSCRIBE / UNSUBSCRIBE / PING / AUTH 的最小子集，
+用于在没有 Redis 的机器上联调或压测多进程事件推送（EVENT_BUS_URL 指向本服务即可，换成真实 Redis 无需改代码）。
+
+用法：
+  python scripts/event_broker.py --port 6380
+  python scripts/event_broker.py --unix /tmp/xiaoju-events.sock
+  然后设置 EVENT_BUS_URL=redis://127.0.0.1:6380（或 unix:///tmp/xiaoju-events.sock）启动多个应用进程
+
+也可以在其它脚本中 `from event_broker import start_broker` 以后台线程启动。
+与 Redis 的 client-output-buffer-limit 类似，订阅连接的待发送数据超过 --max-buffer 字节时断开该连接。
+"""
+import os
+import asyncio
+import argparse
+import threading
+
+
+def _encode(*args):
+    out = [b'*%d\r\n' % len(args)]
+    for arg in args:
+        if isinstance(arg, int):
+            out.append(b':%d\r\n' % arg)
+        else:
+            out.append(b'$%d\r\n%s\r\n' % (len(arg), arg))
+    return b''.join(out)
+
+
+def _parse(buf, pos):
+    """从 buf[pos:] 解析一条 RESP 数组命令，返回 (参数列表, 新位置)；数据不完整返回 (None, pos)"""
+    end = buf.find(b'\r\n', pos)
+    if end < 0:
+        return None, pos
+    if buf[pos:pos + 1] != b'*':
+        # 内联命令（如 redis-cli 之外的 telnet 调试）
+        return buf[pos:end].split(), end + 2
+    count = int(buf[pos + 1:end])
+    args = []
+    p = end + 2
+    for _ in range(count):
+        end = buf.find(b'\r\n', p)
+        if end < 0:
+            return None, pos
+        n = int(buf[p + 1:end])
+        start = end + 2
+        if len(buf) < start + n + 2:
+            return None, pos
+        args.append(bytes(buf[start:start + n]))
+        p = start + n + 2
+    return args, p
+
+
+class Broker:
+    """频道 -> 订阅连接 的转发表；所有回调都在同一个事件循环线程中执行"""
+
+    def __init__(self, max_buffer=64 * 1024 * 1024):
+        self.max_buffer = max_buffer
+        self.channels = {}
+        self.published = 0
+        self.delivered = 0
+        self.dropped_clients = 0
+
+    def publish(self, channel, message):
+        subscribers = self.channels.get(channel, ())
+        if subscribers:
+            frame = _encode(b'message', channel, message)
+            for conn in list(subscribers):
+                conn.write(frame)
+        self.published += 1
+        self.delivered += len(subscribers)
+        return len(subscribers)
+
+
+class BrokerProtocol(asyncio.Protocol):
+
+    def __init__(self, broker):
+        self.broker = broker
+        self.transport = None
+        self.buffer = bytearray()
+        self.subscriptions = set()
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def connection_lost(self, exc):
+        for channel in self.subscriptions:
+            members = self.broker.channels.get(channel)
+            if members is not None:
+                members.discard(self)
+                if not members:
+                    del self.broker.channels[channel]
+        self.subscriptions.clear()
+
+    def write(self, frame):
+        if self.transport.is_closing():
+            return
+        if self.transport.get_write_buffer_size() > self.broker.max_buffer:
+            self.broker.dropped_clients += 1
+            self.transport.abort()
+            return
+        self.transport.write(frame)
+
+    def data_received(self, data):
+        self.buffer += data
+        pos = 0
+        replies = []
+        while True:
+            args, pos = _parse(self.buffer, pos)
+            if args is None:
+                break
+            if args:
+                replies.append(self.handle(args))
+        del self.buffer[:pos]
+        if replies:
+            self.transport.write(b''.join(replies))
+
+    def handle(self, args):
+        cmd = args[0].upper()
+        if cmd == b'PUBLISH' and len(args) == 3:
+            return b':%d\r\n' % self.broker.publish(args[1], args[2])
+        if cmd == b'SUBSCRIBE' and len(args) >= 2:
+            out = []
+            for channel in args[1:]:
+                self.broker.channels.setdefault(channel, set()).add(self)
+                self.subscriptions.add(channel)
+                out.append(_encode(b'subscribe', channel, len(self.subscriptions)))
+            return b''.join(out)
+        if cmd == b'UNSUBSCRIBE':
+            out = []
+            for channel in args[1:] or list(self.subscriptions):
+                self.broker.channels.get(channel, set()).discard(self)
+                self.subscriptions.discard(channel)
+                out.append(_encode(b'unsubscribe', channel, len(self.subscriptions)))
+            return b''.join(out)
+        if cmd == b'PING':
+            return b'+PONG\r\n'
+        if cmd in (b'AUTH', b'SELECT'):
+            return b'+OK\r\n'
+        if cmd == b'QUIT':
+            self.transport.close()
+            return b'+OK\r\n'
+        return b'-ERR unknown command\r\n'
+
+
+def start_broker(host='127.0.0.1', port=6380, unix_path=None, max_buffer=64 * 1024 * 1024):
+    """在后台线程启动代理，返回 Broker（可读取计数）"""
+    broker = Broker(max_buffer)
+    ready = threading.Event()
+
+    def _run():
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        if unix_path:
+            if os.path.exists(unix_path):
+                os.unlink(unix_path)
+            server = loop.run_until_complete(loop.create_unix_server(lambda: BrokerProtocol(broker), unix_path))
+        else:
+            server = loop.run_until_complete(loop.create_server(lambda: BrokerProtocol(broker), host, port))
+        ready.set()
+        try:
+            loop.run_forever()
+        finally:
+            server.close()
+
+    threading.Thread(target=_run, daemon=True).start()
+    ready.wait(5)
+    return broker
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument('--host', default='127.0.0.1')
+    p.add_argument('--port', type=int, default=6380)
+    p.add_argument('--unix', default=None, help='监听 Unix socket 路径（优先于 host/port）')
+    p.add_argument('--max-buffer', type=int, default=64 * 1024 * 1024, help='订阅连接待发送数据上限（字节）')
+    args = p.parse_args()
+
+    broker = start_broker(args.host, args.port, args.unix, args.max_buffer)
+    print(f"事件总线代理已启动: {'unix://' + args.unix if args.unix else f'redis://{args.host}:{args.port}'}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        print(f'已转发 {broker.published} 条, 投递 {broker.delivered} 次, 断开慢连接 {broker.dropped_clients} 个')
+
+
+if __name__ == '__main__':
+    main()
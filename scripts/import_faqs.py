@@ -89,7 +89,11 @@ def import_faqs_to_session(session_id, product_types=None):
             success_count += 1
         
         conn.commit()
+        # 同进程内的 FAQ 索引立即失效；运行中的服务进程会在 FAQ_INDEX_TTL 内自动重建
+        db.invalidate_whitelist_index(session_id)
         print(f"\n🎉 成功导入 {success_count} 条FAQ到会话 {session_id}")
+        if success_count:
+            prewarm_tts(session_id)
         return success_count
         
     except Exception as e:
@@ -98,6 +102,19 @@ def import_faqs_to_session(session_id, product_types=None):
     finally:
         conn.close()
 
+def prewarm_tts(session_id):
+    """把会话的 FAQ 答案预合成到 static/audio（与服务进程共享的音频缓存）"""
+    from services.tts_prewarm import tts_prewarmer
+    
+    progress = tts_prewarmer.prewarm(session_id)
+    if progress['status'] == 'skipped':
+        print("⏭️  未配置百度 TTS，跳过语音预热")
+        return progress
+    print(f"🔊 预热FAQ语音: {progress['total']} 条答案...")
+    progress = tts_prewarmer.wait(session_id)
+    print(f"✅ 语音预热完成: 新合成 {progress['synthesized']} 条, 已缓存 {progress['cached']} 条, 失败 {progress['failed']} 条")
+    return progress
+
 def show_available_faqs():
     """显示可用的FAQ统计"""
     whitelist_file = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'whitelist.json')
@@ -0,0 +1,139 @@
+"""
+会话事件推送压测：N 个 SSE 订阅者同时订阅一个会话，按固定速率发送弹幕，
+统计每条弹幕事件从发布到各订阅者收到的延迟，以及与轮询方案相比省掉的数据库查询。
+
+用法（服务需已启动）：
+  python scripts/load_test_events.py --session <session_id> --subscribers 300 --bullets 200 --rate 20
+未指定 --session 时会先创建一个临时会话。
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+import http.client
+from urllib.parse import urlparse
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from utils.rate_limiter import RateLimiter
+
+DEFAULT_API = os.getenv('API_BASE', 'http://127.0.0.1:5000')
+
+
+class Subscriber(threading.Thread):
+    """一个 SSE 订阅连接，记录收到的弹幕事件延迟"""
+
+    def __init__(self, api, session_id, marker):
+        super().__init__(daemon=True)
+        self.url = urlparse(api)
+        self.session_id = session_id
+        self.marker = marker
+        self.connected = threading.Event()
+        self.latencies = []
+        self.received = 0
+        self.error = None
+        self._conn = None
+
+    def run(self):
+        try:
+            self._conn = http.client.HTTPConnection(self.url.hostname, self.url.port or 80, timeout=60)
+            self._conn.request('GET', f'/api/session/{self.session_id}/events')
+            resp = self._conn.getresponse()
+            if resp.status != 200:
+                self.error = f'HTTP {resp.status}'
+                self.connected.set()
+                return
+            while True:
+                line = resp.readline()
+                if not line:
+                    return
+                if not line.startswith(b'data: '):
+                    continue
+                event = json.loads(line[6:])
+                if event.get('type') == 'snapshot':
+                    self.connected.set()
+                elif event.get('type') == 'bullet' and event.get('message', '').startswith(self.marker):
+                    self.latencies.append(time.time() - event['ts'])
+                    self.received += 1
+        except Exception as e:
+            if not self.connected.is_set():
+                self.error = str(e)
+                self.connected.set()
+
+    def close(self):
+        try:
+            self._conn.sock.close()
+        except Exception:
+            pass
+
+
+def create_session(api):
+    r = requests.post(api.rstrip('/') + '/api/session', timeout=10, json={
+        'host_name': '压测主播', 'live_theme': '推送压测', 'products': [{'name': '示例商品', 'price': 10}]})
+    r.raise_for_status()
+    return r.json()['session_id']
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument('--api', default=DEFAULT_API)
+    p.add_argument('--session', default=None)
+    p.add_argument('--subscribers', type=int, default=300, help='并发订阅者数')
+    p.add_argument('--bullets', type=int, default=200, help='发送的弹幕数')
+    p.add_argument('--rate', type=float, default=20, help='每秒发送弹幕数')
+    p.add_argument('--poll-interval', type=float, default=1.0, help='对比用：轮询方案的轮询间隔（秒）')
+    args = p.parse_args()
+
+    api = args.api.rstrip('/')
+    session_id = args.session or create_session(api)
+    marker = f'压测{int(time.time())}-'
+
+    subs = [Subscriber(api, session_id, marker) for _ in range(args.subscribers)]
+    t0 = time.perf_counter()
+    for s in subs:
+        s.start()
+    for s in subs:
+        s.connected.wait(30)
+    failed = [s for s in subs if s.error or not s.connected.is_set()]
+    print(f'订阅者: {len(subs) - len(failed)}/{len(subs)} 已连接, 耗时 {time.perf_counter() - t0:.2f}s')
+    if failed:
+        print('  连接失败示例:', failed[0].error)
+
+    limiter = RateLimiter(args.rate)
+    http = requests.Session()
+    started = time.perf_counter()
+    sent = 0
+    for i in range(args.bullets):
+        limiter.acquire()
+        # 每条内容不同，避免被去重聚类合并
+        r = http.post(api + '/api/bullet-screen', timeout=10, json={
+            'session_id': session_id, 'username': f'观众{i % 100:02d}', 'message': f'{marker}{i}'})
+        sent += r.status_code == 200
+    duration = time.perf_counter() - started
+
+    time.sleep(2)  # 等待最后的事件送达
+    for s in subs:
+        s.close()
+
+    ok_subs = [s for s in subs if s not in failed]
+    expected = sent * len(ok_subs)
+    latencies = sorted(l for s in ok_subs for l in s.latencies)
+    received = len(latencies)
+    print(f'发送弹幕: {sent}/{args.bullets}, 耗时 {duration:.2f}s')
+    print(f'事件送达: {received}/{expected} ({received / expected:.1%})' if expected else '事件送达: 0')
+    if latencies:
+        pct = lambda q: latencies[min(len(latencies) - 1, int(len(latencies) * q))] * 1000
+        print(f'推送延迟: p50 {pct(0.5):.1f} ms, p95 {pct(0.95):.1f} ms, p99 {pct(0.99):.1f} ms, 最大 {latencies[-1] * 1000:.1f} ms')
+    polls = len(ok_subs) * duration / args.poll_interval
+    print(f'数据库查询: 推送 {len(ok_subs)} 次（每个订阅一次快照）；'
+          f'同样时长按 {args.poll_interval:g}s 轮询约 {polls:,.0f} 次')
+
+
+if __name__ == '__main__':
+    main()
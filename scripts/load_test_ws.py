@@ -0,0 +1,171 @@
+"""
+WebSocket 分房间推送压测：多个会话各有若干订阅者（可混入读得很慢的客户端），按固定速率向各会话发送弹幕，
+统计正常客户端的推送延迟、是否收到其他会话的消息，以及服务端 /api/metrics 中各房间的扇出延迟与丢弃计数。
+
+用法（服务需已启动，且 WS_ENABLED=true）：
+  python scripts/load_test_ws.py --sessions 4 --clients 50 --slow 2 --bullets 200 --rate 100
+"""
+import os
+import sys
+import json
+import time
+import random
+import socket
+import argparse
+import threading
+
+import requests
+import websocket
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from utils.rate_limiter import RateLimiter
+
+DEFAULT_API = os.getenv('API_BASE', 'http://127.0.0.1:5000')
+DEFAULT_WS = os.getenv('WS_BASE', 'ws://127.0.0.1:6789')
+
+
+class Client(threading.Thread):
+    """一个 WebSocket 订阅连接；read_delay > 0 时模拟读得慢的客户端"""
+
+    def __init__(self, ws_base, session_id, marker, read_delay=0.0):
+        super().__init__(daemon=True)
+        self.url = f"{ws_base.rstrip('/')}/?session_id={session_id}"
+        self.session_id = session_id
+        self.marker = marker
+        self.read_delay = read_delay
+        self.connected = threading.Event()
+        self.latencies = []
+        self.foreign = 0  # 收到的其他会话消息数（应为 0）
+        self.dropped = 0  # 服务端通知的丢弃条数
+        self.closed_by_server = False
+        self.error = None
+        self._ws = None
+        self._stop = False
+
+    def run(self):
+        try:
+            # 慢客户端缩小接收缓冲区，让积压尽快反映到服务端
+            sockopt = ((socket.SOL_SOCKET, socket.SO_RCVBUF, 4096),) if self.read_delay else ()
+            self._ws = websocket.create_connection(self.url, timeout=30, sockopt=sockopt)
+        except Exception as e:
+            self.error = str(e)
+            self.connected.set()
+            return
+        self.connected.set()
+        while not self._stop:
+            try:
+                raw = self._ws.recv()
+            except Exception:
+                self.closed_by_server = not self._stop
+                return
+            if not raw:
+                self.closed_by_server = not self._stop
+                return
+            event = json.loads(raw)
+            if event.get('type') == 'dropped':
+                self.dropped += event.get('count', 0)
+            elif event.get('type') == 'bullet' and event.get('message', '').startswith(self.marker):
+                if event.get('session_id') != self.session_id:
+                    self.foreign += 1
+                else:
+                    self.latencies.append(time.time() - event['ts'])
+            if self.read_delay:
+                time.sleep(self.read_delay)
+
+    def close(self):
+        self._stop = True
+        try:
+            self._ws.close()
+        except Exception:
+            pass
+
+
+def create_session(api):
+    r = requests.post(api + '/api/session', timeout=10, json={
+        'host_name': '压测主播', 'live_theme': 'WebSocket 推送压测', 'products': [{'name': '示例商品', 'price': 10}]})
+    r.raise_for_status()
+    return r.json()['session_id']
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument('--api', default=DEFAULT_API)
+    p.add_argument('--ws', default=DEFAULT_WS)
+    p.add_argument('--sessions', type=int, default=4, help='会话（房间）数')
+    p.add_argument('--clients', type=int, default=50, help='每个会话的正常订阅者数')
+    p.add_argument('--slow', type=int, default=1, help='每个会话的慢订阅者数')
+    p.add_argument('--slow-delay', type=float, default=0.2, help='慢订阅者每读一条消息停顿的秒数')
+    p.add_argument('--bullets', type=int, default=200, help='每个会话发送的弹幕数')
+    p.add_argument('--rate', type=float, default=100, help='每秒发送弹幕数（所有会话合计）')
+    p.add_argument('--padding', type=int, default=0, help='每条弹幕附加的字符数，用于放大慢客户端的积压')
+    args = p.parse_args()
+
+    api = args.api.rstrip('/')
+    sessions = [create_session(api) for _ in range(args.sessions)]
+    marker = f'WS压测{int(time.time())}-'
+
+    clients, slow_clients = [], []
+    for session_id in sessions:
+        clients += [Client(args.ws, session_id, marker) for _ in range(args.clients)]
+        slow_clients += [Client(args.ws, session_id, marker, args.slow_delay) for _ in range(args.slow)]
+    t0 = time.perf_counter()
+    for c in clients + slow_clients:
+        c.start()
+    for c in clients + slow_clients:
+        c.connected.wait(30)
+    failed = [c for c in clients + slow_clients if c.error]
+    print(f'订阅者: {len(clients) + len(slow_clients) - len(failed)}/{len(clients) + len(slow_clients)} 已连接 '
+          f'({args.sessions} 个会话, 每会话 {args.clients} 正常 + {args.slow} 慢), 耗时 {time.perf_counter() - t0:.2f}s')
+    if failed:
+        print('  连接失败示例:', failed[0].error)
+        return
+    time.sleep(0.5)
+
+    limiter = RateLimiter(args.rate)
+    http = requests.Session()
+    rnd = random.Random(7)
+    padding = 'x' * args.padding
+    jobs = [(session_id, i) for i in range(args.bullets) for session_id in sessions]
+    started = time.perf_counter()
+    sent = 0
+    for session_id, i in jobs:
+        limiter.acquire()
+        r = http.post(api + '/api/bullet-screen', timeout=10, json={
+            'session_id': session_id, 'username': f'观众{rnd.randrange(100):02d}',
+            'message': f'{marker}{i}-{session_id[:8]}{padding}'})
+        sent += r.status_code == 200
+    duration = time.perf_counter() - started
+
+    time.sleep(2)  # 等待最后的消息送达
+    metrics = http.get(api + '/api/metrics', timeout=10).json().get('ws', {})
+    for c in clients + slow_clients:
+        c.close()
+
+    per_session = sent / len(sessions)
+    expected = per_session * len(clients)
+    latencies = sorted(l for c in clients for l in c.latencies)
+    print(f'发送弹幕: {sent}/{len(jobs)}, 耗时 {duration:.2f}s')
+    print(f'正常订阅者送达: {len(latencies)}/{expected:.0f} ({len(latencies) / expected:.1%}), '
+          f'串房间消息: {sum(c.foreign for c in clients + slow_clients)}')
+    if latencies:
+        pct = lambda q: latencies[min(len(latencies) - 1, int(len(latencies) * q))] * 1000
+        print(f'推送延迟: p50 {pct(0.5):.1f} ms, p95 {pct(0.95):.1f} ms, p99 {pct(0.99):.1f} ms, 最大 {latencies[-1] * 1000:.1f} ms')
+    if slow_clients:
+        print(f'慢订阅者: 收到 {sum(len(c.latencies) for c in slow_clients)} 条, '
+              f'收到丢弃通知合计 {sum(c.dropped for c in slow_clients)} 条, '
+              f'被服务端断开 {sum(c.closed_by_server for c in slow_clients)}/{len(slow_clients)}')
+
+    print(f"服务端: 发布 {metrics.get('published')}, 送达 {metrics.get('delivered')}, "
+          f"丢弃 {metrics.get('dropped')}, 断开慢连接 {metrics.get('disconnected')}")
+    for session_id in sessions:
+        room = metrics.get('rooms', {}).get(session_id)
+        if room:
+            print(f"  房间 {session_id[:8]}: 连接 {room['subscribers']}, 送达 {room['delivered']}, 丢弃 {room['dropped']}, "
+                  f"扇出延迟 p50 {room['latency_ms_p50']} ms / p95 {room['latency_ms_p95']} ms / 最大 {room['latency_ms_max']} ms")
+
+
+if __name__ == '__main__':
+    main()
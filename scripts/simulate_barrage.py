@@ -3,18 +3,34 @@
 使用方法（PowerShell）：
   $env:API_BASE='http://127.0.0.1:5000'; python scripts/simulate_barrage.py --session <session_id>
 如果未提供 session，会尝试创建一个临时会话（需要 /api/session 可用）。
+
+吞吐压测：指定 --rate（每秒弹幕数）与 --concurrency（并发连接数），结束后输出吞吐与延迟统计；
+--bulk N 改用 `/api/bullet-screen/bulk` 每次提交 N 条。
+  python scripts/simulate_barrage.py --rate 500 --concurrency 16 --count 5000 --quiet
+  python scripts/simulate_barrage.py --rate 2000 --concurrency 4 --bulk 50 --count 20000 --quiet
 """
+import os
+import sys
 import time
 import random
 import argparse
+import threading
+import statistics
 import requests
 
-DEFAULT_API = 'http://127.0.0.1:5000'
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.rate_limiter import RateLimiter
+
+DEFAULT_API = os.getenv('API_BASE', 'http://127.0.0.1:5000')
 
 def random_msg():
     msgs = ['这件怎么卖？','有优惠吗？','能讲一下产地吗？','能试吃吗？','包装怎样？','色泽不错，多少钱一斤？','主播介绍一下吧']
     return random.choice(msgs)
 
+def random_user():
+    return '观众%03d' % random.randint(1, 999)
+
 def create_session(api_base, host='模拟主播', theme='模拟专场'):
     url = api_base.rstrip('/') + '/api/session'
     payload = {'host_name': host, 'live_theme': theme, 'products':[{'name':'示例商品','price':10}]}
@@ -22,18 +38,90 @@ def create_session(api_base, host='模拟主播', theme='模拟专场'):
     r.raise_for_status()
     return r.json()['session_id']
 
-def send_bullet(api_base, session_id, username, text):
+def send_bullet(api_base, session_id, username, text, http=requests):
     url = api_base.rstrip('/') + '/api/bullet-screen'
     payload = {'session_id': session_id, 'username': username, 'message': text}
-    r = requests.post(url, json=payload, timeout=5)
+    r = http.post(url, json=payload, timeout=5)
     return r.status_code == 200
 
+def send_bullets(api_base, session_id, bullets, http=requests):
+    """批量发送，返回成功入队的条数"""
+    url = api_base.rstrip('/') + '/api/bullet-screen/bulk'
+    r = http.post(url, json={'session_id': session_id, 'bullets': bullets}, timeout=10)
+    if r.status_code != 200:
+        return 0
+    return r.json().get('count', 0)
+
+def run_load(api, session, rate, concurrency, count, bulk, quiet):
+    """按目标速率并发发送弹幕，返回统计结果"""
+    per_request = max(1, bulk)
+    requests_total = -(-count // per_request)
+    limiter = RateLimiter(rate / per_request if rate else 0)
+    latencies = []
+    sent = [0, 0]  # 成功条数, 失败条数
+    lock = threading.Lock()
+    next_index = [0]
+
+    def worker():
+        http = requests.Session()  # 每个线程一个长连接
+        while True:
+            with lock:
+                i = next_index[0]
+                if i >= requests_total:
+                    return
+                next_index[0] += 1
+            n = min(per_request, count - i * per_request)
+            limiter.acquire()
+            t0 = time.perf_counter()
+            try:
+                if bulk:
+                    bullets = [{'username': random_user(), 'message': random_msg()} for _ in range(n)]
+                    ok = send_bullets(api, session, bullets, http)
+                else:
+                    who, m = random_user(), random_msg()
+                    ok = int(send_bullet(api, session, who, m, http))
+                    if not quiet:
+                        print(i + 1, who, m, 'OK' if ok else 'FAIL')
+            except requests.RequestException:
+                ok = 0
+            elapsed = time.perf_counter() - t0
+            with lock:
+                latencies.append(elapsed)
+                sent[0] += ok
+                sent[1] += n - ok
+
+    threads = [threading.Thread(target=worker) for _ in range(max(1, concurrency))]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    duration = time.perf_counter() - started
+
+    latencies.sort()
+    pct = lambda p: latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+    return {
+        'ok': sent[0],
+        'failed': sent[1],
+        'duration': duration,
+        'throughput': sent[0] / duration if duration else 0,
+        'requests': len(latencies),
+        'p50_ms': pct(0.50),
+        'p95_ms': pct(0.95),
+        'p99_ms': pct(0.99),
+        'mean_ms': statistics.mean(latencies) * 1000,
+    }
+
 def main():
     p = argparse.ArgumentParser()
     p.add_argument('--api', default=None)
     p.add_argument('--session', default=None)
     p.add_argument('--interval', type=float, default=1.5)
     p.add_argument('--count', type=int, default=0, help='发送次数，0 为无限')
+    p.add_argument('--rate', type=float, default=0, help='压测模式：目标弹幕数/秒（0 为不限速，需配合 --count）')
+    p.add_argument('--concurrency', type=int, default=1, help='压测模式：并发连接数')
+    p.add_argument('--bulk', type=int, default=0, help='压测模式：每次请求批量提交的弹幕数，0 为逐条提交')
+    p.add_argument('--quiet', action='store_true', help='压测模式下不逐条打印')
     args = p.parse_args()
     api = args.api or DEFAULT_API
     session = args.session
@@ -45,12 +133,22 @@ def main():
             print('创建会话失败，请先手动创建会话或指定 --session', e)
             return
 
+    if args.rate or args.concurrency > 1 or args.bulk:
+        count = args.count or 1000
+        mode = f'批量({args.bulk}条/请求)' if args.bulk else '逐条'
+        print(f'压测: {count} 条弹幕, 目标速率 {args.rate or "不限"}/s, 并发 {args.concurrency}, 模式 {mode}')
+        r = run_load(api, session, args.rate, args.concurrency, count, args.bulk, args.quiet)
+        print(f"入队 {r['ok']} 条, 失败 {r['failed']} 条, 耗时 {r['duration']:.2f}s, 吞吐 {r['throughput']:.0f} 条/s")
+        print(f"请求延迟（{r['requests']} 次）: 平均 {r['mean_ms']:.1f} ms, p50 {r['p50_ms']:.1f} ms, "
+              f"p95 {r['p95_ms']:.1f} ms, p99 {r['p99_ms']:.1f} ms")
+        return
+
     i = 0
     try:
         while True:
             if args.count and i >= args.count:
                 break
-            who = '观众%03d' % random.randint(1,999)
+            who = random_user()
             m = random_msg()
             ok = send_bullet(api, session, who, m)
             print(i+1, who, m, 'OK' if ok else 'FAIL')
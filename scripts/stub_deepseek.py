@@ -0,0 +1,134 @@
+"""
+本地 DeepSeek（OpenAI 兼容）接口桩服务，用于基准测试与联调，不消耗真实 API 额度。
+
+用法：
+  python scripts/stub_deepseek.py --port 8765 --latency 0.2 --fail-rate 0.1 --token-delay 0.05
+  然后设置 DEEPSEEK_API_URL=http://127.0.0.1:8765/chat/completions 启动应用
+
+也可以在其它脚本中 `from stub_deepseek import start_stub_server` 以后台线程启动。
+"""
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+STUB_ANSWER = '这款草莓是今早现摘的，九分甜！现在下单次日发货，坏果包赔。喜欢的朋友点下方链接就可以啦~'
+
+
+def _tokens():
+    """把固定答案切成每段 2 个字的片段"""
+    return [STUB_ANSWER[i:i + 2] for i in range(0, len(STUB_ANSWER), 2)]
+
+
+def _make_handler(latency, fail_rate, token_delay=0.0):
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'  # 支持 keep-alive
+        disable_nagle_algorithm = True  # 头与正文分两次写出，避免与延迟 ACK 叠加出 40ms 停顿
+        server_version = 'StubDeepSeek/1.0'
+
+        def log_message(self, fmt, *args):
+            pass
+
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            body = json.loads(self.rfile.read(length) or b'{}')
+            if latency:
+                time.sleep(latency)  # 模拟首个 token 前的排队/预填充耗时
+
+            if fail_rate and random.random() < fail_rate:
+                payload = json.dumps({'error': {'message': 'rate limited'}}).encode('utf-8')
+                self.send_response(429)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Retry-After', '0')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+                return
+
+            if body.get('stream'):
+                self._send_stream(body)
+                return
+
+            # 非流式：等全部片段"生成"完才返回
+            if token_delay:
+                time.sleep(token_delay * (len(_tokens()) - 1))
+
+            payload = json.dumps({
+                'id': 'stub',
+                'object': 'chat.completion',
+                'model': body.get('model', 'stub'),
+                'choices': [{
+                    'index': 0,
+                    'message': {'role': 'assistant', 'content': STUB_ANSWER},
+                    'finish_reason': 'stop',
+                }],
+            }, ensure_ascii=False).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def _send_stream(self, body):
+            """以 SSE + chunked 编码逐段返回，片段之间间隔 token_delay"""
+            tokens = _tokens()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            for i, token in enumerate(tokens):
+                if i and token_delay:
+                    time.sleep(token_delay)
+                chunk = {
+                    'id': 'stub',
+                    'object': 'chat.completion.chunk',
+                    'model': body.get('model', 'stub'),
+                    'choices': [{'index': 0, 'delta': {'content': token}, 'finish_reason': None}],
+                }
+                self._write_chunk(f'data: {json.dumps(chunk, ensure_ascii=False)}\n\n')
+            self._write_chunk('data: [DONE]\n\n')
+            self.wfile.write(b'0\r\n\r\n')
+
+        def _write_chunk(self, text):
+            data = text.encode('utf-8')
+            self.wfile.write(f'{len(data):x}\r\n'.encode('ascii') + data + b'\r\n')
+            self.wfile.flush()
+
+    return StubHandler
+
+
+class _StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024  # 默认 backlog 只有 5，数百个并发连接同时建立时会丢 SYN、重传等待 1s
+
+
+def start_stub_server(host='127.0.0.1', port=0, latency=0.0, fail_rate=0.0, token_delay=0.0):
+    """在后台线程启动桩服务，返回 (server, base_url)；port=0 时随机分配端口"""
+    server = _StubServer((host, port), _make_handler(latency, fail_rate, token_delay))
+    t = threading.Thread(target=server.serve_forever, daemon=True)
+    t.start()
+    return server, f'http://{host}:{server.server_address[1]}'
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument('--host', default='127.0.0.1')
+    p.add_argument('--port', type=int, default=8765)
+    p.add_argument('--latency', type=float, default=0.2, help='首个片段前的模拟耗时（秒）')
+    p.add_argument('--fail-rate', type=float, default=0.0, help='返回 429 的概率')
+    p.add_argument('--token-delay', type=float, default=0.05, help='流式模式下每个片段的间隔（秒）')
+    args = p.parse_args()
+
+    server = _StubServer((args.host, args.port),
+                         _make_handler(args.latency, args.fail_rate, args.token_delay))
+    print(f'Stub DeepSeek 已启动 -> http://{args.host}:{args.port}/chat/completions')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print('已停止')
+
+
+if __name__ == '__main__':
+    main()
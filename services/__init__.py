@@ -1,9 +1,12 @@
 """
 AI服务模块 - 处理与DeepSeek API的交互
 """
+import json
 import requests
 from config import Config
 from utils.logger import get_logger
+from utils.single_flight import SingleFlight
+from utils.http_client import create_session, request_with_retry
 
 logger = get_logger(__name__)
 
@@ -14,6 +17,9 @@ class AIService:
         self.api_key = Config.DEEPSEEK_API_KEY
         self.api_url = Config.DEEPSEEK_API_URL
         self.model = Config.DEEPSEEK_MODEL
+        self.timeout = (Config.AI_CONNECT_TIMEOUT, Config.AI_READ_TIMEOUT)
+        # 共享连接池：复用到 DeepSeek 的 TCP/TLS 连接，避免每次调用重新握手
+        self.session = create_session(pool_size=Config.AI_POOL_SIZE)
     
     def call_api(self, prompt, session_context=None):
         """
@@ -27,33 +33,20 @@ class AIService:
             AI回复内容，失败返回None
         """
         try:
-            # 构建系统提示词
-            system_prompt = self._build_system_prompt(session_context)
-            
-            # 构建请求
-            headers = {
-                'Content-Type': 'application/json',
-                'Authorization': f'Bearer {self.api_key}'
-            }
-            
-            payload = {
-                'model': self.model,
-                'messages': [
-                    {'role': 'system', 'content': system_prompt},
-                    {'role': 'user', 'content': prompt}
-                ],
-                'temperature': 0.7,
-                'max_tokens': 500
-            }
+            headers, payload = self._build_request(prompt, session_context)
             
             logger.info(f"调用AI API - 模型: {self.model}")
             
-            # 发送请求
-            response = requests.post(
+            # 发送请求（429/5xx 与连接错误按抖动退避重试）
+            response = request_with_retry(
+                self.session,
+                'POST',
                 self.api_url,
+                retries=Config.AI_MAX_RETRIES,
+                backoff=Config.AI_RETRY_BACKOFF,
                 headers=headers,
                 json=payload,
-                timeout=30
+                timeout=self.timeout
             )
             
             response.raise_for_status()
@@ -78,6 +71,79 @@ class AIService:
             logger.error(f"AI API调用异常: {str(e)}", exc_info=True)
             return None
     
+    def stream_api(self, prompt, session_context=None):
+        """
+        流式调用DeepSeek API（OpenAI 兼容的 stream 模式）
+        
+        Args:
+            prompt: 用户问题
+            session_context: 会话上下文（主播、主题、商品等）
+            
+        Yields:
+            str: 按到达顺序产出的回复文本片段
+            
+        Raises:
+            requests.exceptions.RequestException: 连接失败或上游返回错误状态
+        """
+        headers, payload = self._build_request(prompt, session_context)
+        payload['stream'] = True
+        
+        logger.info(f"调用AI API(流式) - 模型: {self.model}")
+        
+        response = request_with_retry(
+            self.session,
+            'POST',
+            self.api_url,
+            retries=Config.AI_MAX_RETRIES,
+            backoff=Config.AI_RETRY_BACKOFF,
+            headers=headers,
+            json=payload,
+            timeout=self.timeout,
+            stream=True
+        )
+        
+        with response:
+            response.raise_for_status()
+            # 逐行解析 SSE：data: {...} / data: [DONE]
+            for line in response.iter_lines(chunk_size=None):
+                if not line or not line.startswith(b'data:'):
+                    continue
+                data = line[5:].strip()
+                if data == b'[DONE]':
+                    break
+                try:
+                    chunk = json.loads(data)
+                    delta = chunk['choices'][0].get('delta') or {}
+                except (ValueError, KeyError, IndexError):
+                    logger.warning(f"AI API流式响应格式异常: {data[:200]!r}")
+                    continue
+                content = delta.get('content')
+                if content:
+                    yield content
+        
+        logger.info(f"✅ AI API流式调用完成")
+    
+    def _build_request(self, prompt, session_context):
+        """构建请求头与请求体"""
+        # 构建系统提示词
+        system_prompt = self._build_system_prompt(session_context)
+        
+        headers = {
+            'Content-Type': 'application/json',
+            'Authorization': f'Bearer {self.api_key}'
+        }
+        
+        payload = {
+            'model': self.model,
+            'messages': [
+                {'role': 'system', 'content': system_prompt},
+                {'role': 'user', 'content': prompt}
+            ],
+            'temperature': 0.7,
+            'max_tokens': 500
+        }
+        return headers, payload
+    
     def _build_system_prompt(self, session_context):
         """构建系统提示词"""
         if not session_context:
@@ -118,3 +184,6 @@ class AIService:
 
 # 单例
 ai_service = AIService()
+
+# 相同会话内相同（归一化后）问题的并发 AI 调用合并为一次
+ai_flight = SingleFlight()
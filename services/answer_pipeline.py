@@ -0,0 +1,111 @@
+"""
+问答流水线 - 敏感词之后的 FAQ 白名单 -> 问答缓存 -> AI 三级查找
+
+/api/chat、/api/chat/stream、异步对话路径（services/chat_async.py）与后台弹幕应答线程共用，
+保证各条路径的请求校验、命中顺序、缓存与对话记录写法一致。
+"""
+import uuid
+
+from database import db
+from services import ai_service, ai_flight
+from services.tts_jobs import tts_jobs
+from utils.helpers import question_hash
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def validate_chat_request(data):
+    """校验聊天请求，返回 (session_id, message, 错误)；错误为 (响应体, 状态码)，校验通过时为 None"""
+    if not data:
+        return None, None, ({"error": "请求数据不能为空"}, 400)
+    
+    session_id = data.get('session_id')
+    message = data.get('message')
+    
+    # 验证session_id格式
+    if not session_id:
+        return None, None, ({"error": "会话ID不能为空"}, 400)
+    
+    try:
+        uuid.UUID(session_id)
+    except ValueError:
+        return None, None, ({"error": "无效的会话ID格式"}, 400)
+    
+    # 验证消息
+    if not message or not isinstance(message, str):
+        return None, None, ({"error": "消息不能为空"}, 400)
+    
+    message = message.strip()
+    if not message:
+        return None, None, ({"error": "消息不能为空"}, 400)
+    
+    if len(message) > 500:
+        return None, None, ({"error": "消息长度不能超过500字符"}, 400)
+    
+    return session_id, message, None
+
+
+def sensitive_error(message):
+    """敏感词检查，命中时返回 (响应体, 400)，否则返回 None"""
+    is_sensitive, matched_words = db.check_sensitive_words(message)
+    if is_sensitive:
+        logger.warning(f"⚠️ 消息包含敏感词: {matched_words}")
+        return {
+            "error": "您的消息包含不当内容，请文明用语。",
+            "sensitive": True
+        }, 400
+    return None
+
+
+def submit_tts(text):
+    """提交后台 TTS 任务，返回需要合并进响应的语音字段
+    
+    audio_url 为预分配的文件地址，audio_job_id 可用于 /api/tts/status 轮询；
+    队列已满时两者均为 None。
+    """
+    job = tts_jobs.submit(text)
+    if not job:
+        return {"audio_url": None, "audio_job_id": None}
+    return {"audio_url": job['audio_url'], "audio_job_id": job['job_id']}
+
+
+def local_answer(session_id, message, save=True):
+    """FAQ白名单 -> 问答缓存，命中时保存对话并返回 (答案, 'faq'|'cached')，未命中返回 (None, None)
+
+    save=False 时不保存对话，由调用方在确认后自行保存（弹幕自动应答在 ack 成功后才写入）。
+    """
+    # ========== 检查FAQ白名单 ==========
+    faq_answer = db.get_whitelist_answer(session_id, message)
+    if faq_answer:
+        logger.info(f"✅ 返回FAQ答案 - 会话: {session_id}")
+        db.cache_qa(session_id, message, faq_answer)
+        if save:
+            db.save_conversation(session_id, message, faq_answer)
+        return faq_answer, 'faq'
+
+    # ========== 检查问答缓存 ==========
+    cached_answer = db.get_cached_answer(session_id, message)
+    if cached_answer:
+        logger.info(f"✅ 返回缓存答案 - 会话: {session_id}")
+        if save:
+            db.save_conversation(session_id, message, cached_answer)
+        return cached_answer, 'cached'
+
+    return None, None
+
+
+def ask_ai(session_id, message, session):
+    """调用AI回答并缓存问答对，返回 (答案, 是否复用了并发请求的结果)，失败时答案为 None
+
+    同一问题的并发请求只调用一次AI，其余请求等待并共享结果（只缓存一次）；
+    对话记录由调用方在拿到答案后保存。
+    """
+    def call():
+        logger.info(f"调用AI API - 会话: {session_id}")
+        answer = ai_service.call_api(message, session)
+        if answer:
+            db.cache_qa(session_id, message, answer)
+        return answer
+
+    return ai_flight.do((session_id, question_hash(message)), call)
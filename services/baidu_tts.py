@@ -9,6 +9,10 @@ Note: Baidu's TTS `aue` mapping may vary by account/region. This helper uses
 reasonable defaults and returns raw bytes when successful.
 """
 import os
+import json
+import time
+import hashlib
+import threading
 import requests
 import logging
 
@@ -17,11 +21,22 @@ logger = logging.getLogger(__name__)
 BAIDU_OAUTH_URL = 'https://aip.baidubce.com/oauth/2.0/token'
 BAIDU_TTS_URL = 'https://tsn.baidu.com/text2audio'
 
+# Baidu error codes meaning the access token is invalid or expired.
+TOKEN_ERROR_CODES = {502, 110, 111}
+
+DEFAULT_TOKEN_CACHE_FILE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'baidu_token.json')
+
 
 def _get_env(key, default=None):
     return os.environ.get(key, default)
 
 
+def is_configured():
+    """Whether Baidu TTS credentials are present in the environment."""
+    return bool(_get_env('BAIDU_TTS_API_KEY') and _get_env('BAIDU_TTS_SECRET_KEY'))
+
+
 def get_access_token(api_key=None, secret_key=None):
     """Get Baidu access token from API Key and Secret Key.
 
@@ -32,6 +47,12 @@ def get_access_token(api_key=None, secret_key=None):
     if not api_key or not secret_key:
         raise RuntimeError('BAIDU_TTS_API_KEY or BAIDU_TTS_SECRET_KEY not set')
 
+    token, _ = _request_access_token(api_key, secret_key)
+    return token
+
+
+def _request_access_token(api_key, secret_key):
+    """Run the OAuth client_credentials exchange. Returns (token, expires_in)."""
     params = {
         'grant_type': 'client_credentials',
         'client_id': api_key,
@@ -43,7 +64,118 @@ def get_access_token(api_key=None, secret_key=None):
     token = j.get('access_token')
     if not token:
         raise RuntimeError(f'Failed to obtain Baidu access token: {j}')
-    return token
+    return token, int(j.get('expires_in') or 0)
+
+
+class TokenCache:
+    """Thread-safe cache for the Baidu access token.
+
+    - Honors `expires_in` from the OAuth response.
+    - Once less than `refresh_margin` seconds remain, the next caller refreshes
+      the token while concurrent callers keep using the still-valid one.
+    - Refreshes are serialized, so a burst of syntheses triggers one OAuth call.
+    - The token is persisted to `cache_file` (keyed by the API key) so a
+      restart does not need to re-authenticate.
+    """
+
+    def __init__(self, cache_file=None, refresh_margin=24 * 3600):
+        self.cache_file = cache_file
+        self.refresh_margin = refresh_margin
+        self._lock = threading.Lock()
+        self._token = None
+        self._expires_at = 0.0
+        self._owner = None  # hash of the API key the token belongs to
+        self.refresh_count = 0
+
+    def get(self, api_key=None, secret_key=None):
+        api_key = api_key or _get_env('BAIDU_TTS_API_KEY')
+        secret_key = secret_key or _get_env('BAIDU_TTS_SECRET_KEY')
+        if not api_key or not secret_key:
+            raise RuntimeError('BAIDU_TTS_API_KEY or BAIDU_TTS_SECRET_KEY not set')
+        owner = hashlib.sha256(api_key.encode('utf-8')).hexdigest()
+
+        token, remaining = self._current(owner)
+        if token and remaining > self.refresh_margin:
+            return token
+
+        if token and remaining > 0:
+            # Still valid: refresh in this caller only if nobody else is doing it.
+            if not self._lock.acquire(blocking=False):
+                return token
+            try:
+                return self._refresh(owner, api_key, secret_key, fallback=token)
+            finally:
+                self._lock.release()
+
+        with self._lock:
+            token, remaining = self._current(owner)
+            if token and remaining > self.refresh_margin:
+                return token
+            return self._refresh(owner, api_key, secret_key, fallback=token if remaining > 0 else None)
+
+    def invalidate(self):
+        """Drop the cached token (e.g. after Baidu rejects it)."""
+        with self._lock:
+            self._token = None
+            self._expires_at = 0.0
+            if self.cache_file:
+                try:
+                    os.remove(self.cache_file)
+                except OSError:
+                    pass
+
+    def _current(self, owner):
+        if self._token is None and self.cache_file:
+            self._load(owner)
+        if self._token is None or self._owner != owner:
+            return None, 0
+        return self._token, self._expires_at - time.time()
+
+    def _refresh(self, owner, api_key, secret_key, fallback=None):
+        try:
+            token, expires_in = _request_access_token(api_key, secret_key)
+        except Exception as e:
+            if fallback:
+                logger.warning(f'Baidu token refresh failed, keeping current token: {e}')
+                return fallback
+            raise
+        self._token = token
+        self._owner = owner
+        # Baidu tokens normally last 30 days; assume that if expires_in is missing.
+        self._expires_at = time.time() + (expires_in or 30 * 24 * 3600)
+        self.refresh_count += 1
+        self._save()
+        logger.info(f'Baidu access token refreshed, expires in {expires_in or 30 * 24 * 3600}s')
+        return token
+
+    def _load(self, owner):
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get('owner') == owner and data.get('expires_at', 0) > time.time():
+            self._token = data.get('access_token')
+            self._expires_at = float(data['expires_at'])
+            self._owner = owner
+
+    def _save(self):
+        if not self.cache_file:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+            tmp = f'{self.cache_file}.{os.getpid()}.tmp'
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump({'access_token': self._token, 'expires_at': self._expires_at, 'owner': self._owner}, f)
+            os.replace(tmp, self.cache_file)
+        except OSError as e:
+            logger.warning(f'Failed to persist Baidu token cache: {e}')
+
+
+token_cache = TokenCache(
+    cache_file=_get_env('BAIDU_TTS_TOKEN_CACHE', DEFAULT_TOKEN_CACHE_FILE),
+    refresh_margin=int(_get_env('BAIDU_TTS_TOKEN_REFRESH_MARGIN', 24 * 3600)),
+)
 
 
 def _format_to_aue(format_name: str):
@@ -53,6 +185,36 @@ def _format_to_aue(format_name: str):
     return 3
 
 
+def resolve_options(voice=None, fmt=None, sample_rate=None, rate=None):
+    """Fill unset synthesis options from the environment defaults."""
+    return {
+        'voice': int(voice or _get_env('BAIDU_TTS_VOICE', 0)),
+        'fmt': (fmt or _get_env('BAIDU_TTS_FORMAT', 'wav')).lower(),
+        'sample_rate': int(sample_rate or _get_env('BAIDU_TTS_SAMPLE_RATE', 24000)),
+        'rate': float(rate or _get_env('BAIDU_TTS_RATE', 1.0)),
+    }
+
+
+def audio_key(text, voice=None, fmt=None, sample_rate=None, rate=None):
+    """Content hash identifying the audio for `text` under the given options.
+
+    Two calls with the same key produce the same audio, so the key can be used
+    as a cache file name.
+    """
+    opts = resolve_options(voice, fmt, sample_rate, rate)
+    raw = json.dumps([text, opts['voice'], opts['fmt'], opts['sample_rate'], _speed(opts['rate'])],
+                     ensure_ascii=False)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()[:32]
+
+
+def audio_extension(fmt=None):
+    return 'mp3' if _format_to_aue(resolve_options(fmt=fmt)['fmt']) == 4 else 'wav'
+
+
+def _speed(rate):
+    return int(max(0, min(9, round(rate * 5))))
+
+
 def synthesize(text: str,
                out_path: str = None,
                voice: int = None,
@@ -64,18 +226,29 @@ def synthesize(text: str,
 
     If `out_path` is provided the audio will be saved there and the path is
     returned. Otherwise the function returns the audio bytes.
+
+    Without an explicit `token` the cached token from `token_cache` is used;
+    if Baidu rejects it, the cache is invalidated and the call retried once.
     """
     if not text:
         raise ValueError('text must be provided')
 
-    token = token or get_access_token()
+    if token:
+        return _synthesize(text, token, out_path, voice, fmt, sample_rate, rate)
+    try:
+        return _synthesize(text, token_cache.get(), out_path, voice, fmt, sample_rate, rate)
+    except TokenRejected:
+        token_cache.invalidate()
+        return _synthesize(text, token_cache.get(), out_path, voice, fmt, sample_rate, rate)
+
+
+class TokenRejected(RuntimeError):
+    """Baidu TTS rejected the access token."""
 
-    voice = voice or int(_get_env('BAIDU_TTS_VOICE', 0))
-    fmt = fmt or _get_env('BAIDU_TTS_FORMAT', 'wav')
-    sample_rate = sample_rate or int(_get_env('BAIDU_TTS_SAMPLE_RATE', 24000))
-    rate = rate or float(_get_env('BAIDU_TTS_RATE', 1.0))
 
-    aue = _format_to_aue(fmt)
+def _synthesize(text, token, out_path, voice, fmt, sample_rate, rate):
+    opts = resolve_options(voice, fmt, sample_rate, rate)
+    aue = _format_to_aue(opts['fmt'])
 
     params = {
         'tex': text,
@@ -83,9 +256,9 @@ def synthesize(text: str,
         'cuid': _get_env('BAIDU_TTS_CUID', 'pj-local'),
         'ctp': 1,
         'lan': 'zh',
-        'per': voice,
+        'per': opts['voice'],
         'aue': aue,
-        'spd': int(max(0, min(9, round(rate * 5)))),
+        'spd': _speed(opts['rate']),
     }
 
     try:
@@ -97,6 +270,8 @@ def synthesize(text: str,
                 j = r.json()
             except Exception:
                 j = {'status_code': r.status_code, 'text': r.text}
+            if isinstance(j, dict) and j.get('err_no') in TOKEN_ERROR_CODES:
+                raise TokenRejected(f'Baidu TTS error: {j}')
             raise RuntimeError(f'Baidu TTS error: {j}')
 
         audio = r.content
@@ -0,0 +1,296 @@
+"""
+弹幕自动应答
+
+后台线程池按会话领取 bullet_screen_queue 中的弹幕（优先级高的先领），逐条走与 /api/chat 相同的
+敏感词 -> FAQ白名单 -> 问答缓存 -> AI 流水线，保存对话、确认弹幕，并通过 event_hub 推送答案；
+入队时被分类为 spam 的弹幕直接确认，不回答。
+
+调度方式：每个会话最多有 session_concurrency 个“令牌”在线程池的就绪队列中流转，
+线程取到令牌就为该会话领取一批弹幕，处理完把令牌放回队尾，多个会话因此轮流得到服务；
+领取为空时令牌退出，新弹幕入队时 notify() 再补发令牌。
+FAQ/缓存命中不占 AI 名额，只有需要调用 AI 的弹幕受 ai_concurrency 限制：等待名额最多到租约到期前，
+等不到就退还本次领取次数放回队列；拿到名额后先把租约延长到覆盖整个 AI 调用（含重试），租约已丢失则不再调用。
+对话在 ack 成功后才保存，租约过期被他人重新领取的弹幕不会留下重复的对话记录。
+"""
+import math
+import time
+import queue
+import threading
+
+from config import Config
+from database import db
+from services.answer_pipeline import local_answer, ask_ai
+from services.event_hub import event_hub
+from services.tts_jobs import tts_jobs
+from utils.http_client import MAX_BACKOFF
+from utils.logger import get_logger
+from utils.periodic import PeriodicTask
+
+logger = get_logger(__name__)
+
+# 等待 AI 名额时给租约留的余量（秒）：到期前这么久还没等到名额就放回队列
+LEASE_MARGIN = 5
+
+
+class BulletAnswerWorker:
+    """按会话消费弹幕队列并自动回答
+
+    Args:
+        threads: 工作线程数（所有会话共享）
+        session_concurrency: 单个会话同时处理的批次数
+        ai_concurrency: 所有会话合计同时进行的 AI 调用数，控制 DeepSeek 配额消耗
+        claim_batch: 每次领取的弹幕数
+        lease_seconds: 领取租约时长，应覆盖 FAQ/缓存应答与等待 AI 名额的时间（AI 调用前租约会自动延长）
+        poll_interval: 兜底轮询间隔（秒），捡回其它进程写入、租约过期或处理失败放回队列的弹幕
+        session_idle: 会话超过该时间（秒）没有新弹幕后不再轮询
+        enabled: False 时 notify() 不做任何事，弹幕只入队等待外部消费者领取
+    """
+
+    def __init__(self, threads=8, session_concurrency=2, ai_concurrency=4, claim_batch=1,
+                 lease_seconds=120, poll_interval=10, session_idle=600, enabled=True):
+        self.enabled = enabled
+        self.threads = max(1, threads)
+        self.session_concurrency = max(1, session_concurrency)
+        self.ai_concurrency = max(1, ai_concurrency)
+        self.claim_batch = max(1, claim_batch)
+        self.lease_seconds = lease_seconds
+        self.session_idle = session_idle
+        self._ai_slots = threading.BoundedSemaphore(self.ai_concurrency)
+        self._ready = queue.Queue()
+        self._sessions = {}  # session_id -> {'tokens', 'dirty', 'last_seen'}
+        self._lock = threading.Lock()
+        self._workers = []
+        self._stopped = False
+        self._poller = PeriodicTask(self._poll, poll_interval, name='bullet-worker-poll', final=lambda: None)
+        self._stats = {
+            'claimed': 0,
+            'answered': 0,
+            'faq': 0,
+            'cached': 0,
+            'ai': 0,
+            'sensitive': 0,
+            'spam': 0,
+            'failed': 0,
+            'stale_acks': 0,
+            'ai_slot_timeouts': 0,
+            'ai_inflight': 0,
+            'ai_wait_ms_total': 0.0,
+        }
+
+    def notify(self, session_id):
+        """会话有新弹幕入队：必要时补发令牌，唤醒空闲线程"""
+        if not self.enabled or self._stopped:
+            return
+        self._start()
+        with self._lock:
+            state = self._sessions.setdefault(session_id, {'tokens': 0, 'dirty': False, 'last_seen': 0.0})
+            state['dirty'] = True
+            state['last_seen'] = time.monotonic()
+            if state['tokens'] >= self.session_concurrency:
+                return
+            state['tokens'] += 1
+        self._ready.put(session_id)
+
+    def stop(self):
+        """停止领取新弹幕；已领取未确认的弹幕在租约到期后由其它进程重新领取"""
+        self._stopped = True
+        for _ in self._workers:
+            self._ready.put(None)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            active = {sid: state['tokens'] for sid, state in self._sessions.items() if state['tokens']}
+        ai_calls = stats['ai']
+        stats['ai_wait_ms_avg'] = round(stats.pop('ai_wait_ms_total') / ai_calls, 2) if ai_calls else 0.0
+        stats.update({
+            'enabled': self.enabled,
+            'threads': self.threads,
+            'session_concurrency': self.session_concurrency,
+            'ai_concurrency': self.ai_concurrency,
+            'ready_queue': self._ready.qsize(),
+            'active_sessions': len(active),
+            'busy_tokens': sum(active.values()),
+        })
+        return stats
+
+    def _start(self):
+        if self._workers:
+            return
+        with self._lock:
+            if self._workers:
+                return
+            self._workers = [
+                threading.Thread(target=self._run, name=f'bullet-worker-{i}', daemon=True)
+                for i in range(self.threads)
+            ]
+            for t in self._workers:
+                t.start()
+        self._poller.start()
+        logger.info(f"🚀 弹幕自动应答已启动 - 线程: {self.threads}, 单会话并发: {self.session_concurrency}, "
+                    f"AI并发: {self.ai_concurrency}")
+
+    def _poll(self):
+        """兜底：对近期活跃的会话补发令牌"""
+        now = time.monotonic()
+        with self._lock:
+            for session_id, state in list(self._sessions.items()):
+                if now - state['last_seen'] > self.session_idle and not state['tokens']:
+                    del self._sessions[session_id]
+            session_ids = [sid for sid, state in self._sessions.items() if not state['tokens']]
+        for session_id in session_ids:
+            with self._lock:
+                state = self._sessions.get(session_id)
+                if state is None or state['tokens']:
+                    continue
+                state['tokens'] = 1
+            self._ready.put(session_id)
+
+    def _count(self, **deltas):
+        with self._lock:
+            for key, value in deltas.items():
+                self._stats[key] += value
+
+    def _run(self):
+        while True:
+            session_id = self._ready.get()
+            if session_id is None or self._stopped:
+                return
+            try:
+                keep = self._drain_once(session_id)
+            except Exception:
+                logger.exception(f"弹幕自动应答异常 - 会话: {session_id}")
+                keep = False
+            self._release_token(session_id, keep)
+
+    def _release_token(self, session_id, keep):
+        """批次结束：队列可能还有弹幕时令牌回到就绪队列尾部，否则退出"""
+        with self._lock:
+            state = self._sessions.get(session_id)
+            if state is None:
+                return
+            if not keep and state['dirty'] and not self._stopped:
+                keep = True  # 领取期间又有新弹幕入队
+            if not keep:
+                state['tokens'] -= 1
+                return
+        self._ready.put(session_id)
+
+    def _drain_once(self, session_id):
+        """为会话领取并处理一批弹幕，返回令牌是否应继续流转"""
+        with self._lock:
+            state = self._sessions.get(session_id)
+            if state is not None:
+                state['dirty'] = False
+
+        lease_deadline = time.monotonic() + self.lease_seconds
+        lease_token, bullets = db.claim_bullet_screens(session_id, self.claim_batch, self.lease_seconds)
+        if not bullets:
+            return False
+        self._count(claimed=len(bullets))
+
+        session = None
+        all_ok = True
+        for bullet in bullets:
+            try:
+                if bullet.get('category') == 'spam':
+                    source, answer, error = 'spam', None, None
+                else:
+                    if session is None:
+                        session = db.get_session_context(session_id)
+                    source, answer, error = self._answer(session_id, bullet, session, lease_token, lease_deadline)
+            except Exception as e:
+                logger.warning(f"弹幕应答失败 - 会话: {session_id}, 弹幕: {bullet['id']}: {e}")
+                source, answer, error = None, None, str(e)
+
+            if source == 'busy':
+                # AI 名额在租约内等不到：弹幕本身没有失败，退还领取次数放回队列
+                all_ok = False
+                self._count(ai_slot_timeouts=1)
+                db.nack_bullet_screens(lease_token, [bullet['id']], error, count_attempt=False)
+                continue
+
+            if error:
+                all_ok = False
+                self._count(failed=1)
+                db.nack_bullet_screens(lease_token, [bullet['id']], error)
+                continue
+
+            if source == 'stale' or db.ack_bullet_screens(lease_token, [bullet['id']]) != 1:
+                # 租约已过期并被其它消费者领取：不保存、不推送，避免重复回答
+                self._count(stale_acks=1)
+                continue
+            self._count(**{source: 1}, answered=int(answer is not None))
+            if answer:
+                db.save_conversation(session_id, bullet['message'], answer)
+                self._push(session_id, bullet, answer, source)
+
+        # 本批有失败（多为 AI 不可用）时令牌退出，由兜底轮询稍后重试，避免紧密重试耗尽次数
+        return all_ok
+
+    def _answer(self, session_id, bullet, session, lease_token, lease_deadline):
+        """返回 (来源, 答案, 错误)，对话由调用方在 ack 成功后保存
+
+        敏感弹幕不回答（来源 sensitive，答案 None）；租约内等不到 AI 名额返回来源 busy，
+        延长租约时发现租约已丢失返回来源 stale，两者都不调用 AI。
+        """
+        message = bullet['message']
+        is_sensitive, matched_words = db.check_sensitive_words(message)
+        if is_sensitive:
+            logger.info(f"弹幕包含敏感词，跳过应答 - 会话: {session_id}, 命中: {matched_words}")
+            return 'sensitive', None, None
+
+        answer, source = local_answer(session_id, message, save=False)
+        if answer:
+            return source, answer, None
+
+        if not session:
+            return None, None, '会话不存在'
+
+        waited = time.perf_counter()
+        if not self._ai_slots.acquire(timeout=max(0.0, lease_deadline - time.monotonic() - LEASE_MARGIN)):
+            return 'busy', None, 'AI名额等待超时'
+        try:
+            self._count(ai_inflight=1, ai_wait_ms_total=(time.perf_counter() - waited) * 1000)
+            if db.extend_bullet_lease(lease_token, [bullet['id']], self._ai_lease_seconds()) != 1:
+                return 'stale', None, None
+            answer, _ = ask_ai(session_id, message, session)
+        finally:
+            self._count(ai_inflight=-1)
+            self._ai_slots.release()
+        if not answer:
+            return None, None, 'AI服务暂时不可用'
+        return 'ai', answer, None
+
+    def _ai_lease_seconds(self):
+        """拿到 AI 名额后的租约时长：覆盖一次 AI 调用的最长耗时（每次尝试的连接+读取超时，加重试退避上限）"""
+        retries = Config.AI_MAX_RETRIES
+        budget = (retries + 1) * (Config.AI_CONNECT_TIMEOUT + Config.AI_READ_TIMEOUT) + retries * MAX_BACKOFF
+        return max(self.lease_seconds, math.ceil(budget) + LEASE_MARGIN)
+
+    @staticmethod
+    def _push(session_id, bullet, answer, source):
+        job = tts_jobs.submit(answer)
+        event_hub.publish(session_id, {
+            'type': 'answer',
+            'bullet_id': bullet['id'],
+            'username': bullet.get('username'),
+            'message': bullet['message'],
+            'cluster_count': bullet.get('cluster_count', 1),
+            'answer': answer,
+            'source': source,
+            'audio_url': job['audio_url'] if job else None,
+            'audio_job_id': job['job_id'] if job else None,
+        })
+
+
+# 单例
+bullet_worker = BulletAnswerWorker(
+    threads=Config.BULLET_WORKER_THREADS,
+    session_concurrency=Config.BULLET_WORKER_SESSION_CONCURRENCY,
+    ai_concurrency=Config.BULLET_WORKER_AI_CONCURRENCY,
+    claim_batch=Config.BULLET_WORKER_CLAIM_BATCH,
+    lease_seconds=Config.BULLET_WORKER_LEASE_SECONDS,
+    poll_interval=Config.BULLET_WORKER_POLL_INTERVAL,
+    enabled=Config.BULLET_WORKER_ENABLED,
+)
@@ -3,18 +3,41 @@
 如果环境中没有安装 `websockets` 包，模块会静默失败并回退到轮询机制。
 
 启动：在 app 启动后调用 start_server(host, port)
-广播：调用 broadcast({'type':'bullet', ...})
+广播：调用 broadcast({'type':'bullet', 'session_id': ..., ...})
+
+按会话分房间：客户端连接 ws://host:port/?session_id=<id>，或连接后发送
+{"type": "subscribe", "session_id": "<id>"} 切换房间；未指定会话的客户端进入 '*' 房间，接收全部会话的事件（兼容旧前端）。
+每条消息只序列化一次，由事件循环放入各客户端的有界发送队列，每个客户端一个发送协程：
+队列满时丢弃最旧的消息，并在下一条消息前补发一条 {"type": "dropped", "count": n} 合并通知；
+单次发送超过 WS_SEND_TIMEOUT 秒的客户端直接断开，不拖慢同房间的其他客户端。
+
+紧凑格式（可选）：连接时带上 &format=compact（或在 subscribe 消息中带 "format": "compact"），
+先收到一条 hello 帧（会话 ID 与字段表），之后每 WS_BATCH_MS 毫秒内的事件按固定字段顺序编码为数组并合并为一帧，
+格式见 utils/compact_frames.py；JSON 对象帧（hello、dropped）为控制消息，数组帧为事件批次。
 """
 import threading
 import json
+import time
 import logging
+from collections import deque
+from urllib.parse import urlparse, parse_qs
+
+from config import Config
+from utils import compact_frames
+from utils.fanout_stats import FanoutStats
 
 logger = logging.getLogger(__name__)
 
+ALL_ROOM = '*'
+
 _websockets = None
 _loop = None
 _server = None
-_clients = set()
+_rooms = {}  # 房间 -> set(_Client)，只在事件循环线程修改
+_rooms_lock = threading.Lock()  # 供 stats() 在其他线程读取
+_batches = {}  # 房间 -> 等待合并发送给紧凑格式客户端的事件，只在事件循环线程访问
+_batch_timers = {}  # 房间 -> 当前批次的定时 flush 句柄，批次提前发出时取消
+_stats = FanoutStats()
 
 try:
     import asyncio
@@ -24,39 +47,137 @@ except Exception:
     _websockets = None
 
 
-async def _handler(ws, path):
-    # 注册客户端
-    _clients.add(ws)
-    logger.info(f"WS 客户端已连接: {ws.remote_address}")
+class _Client:
+    """一个 WebSocket 连接及其有界发送队列（只在事件循环线程访问）"""
+
+    def __init__(self, ws, room, max_queue):
+        self.ws = ws
+        self.room = room
+        self.compact = False
+        self.queue = deque()
+        self.max_queue = max_queue
+        self.dropped = 0  # 尚未通知客户端的丢弃条数
+        self.ready = asyncio.Event()
+
+    def push(self, room, data, ts, count=1):
+        """放入一帧；count 为帧内事件数，0 表示控制帧（不计入送达统计）"""
+        if len(self.queue) >= self.max_queue:
+            _, _, _, lost = self.queue.popleft()
+            self.dropped += lost
+            _stats.dropped(room, lost)
+        self.queue.append((room, data, ts, count))
+        self.ready.set()
+
+
+def _params_from_path(ws, path):
+    """从连接 URL 的查询参数取 (房间, 是否紧凑格式)"""
+    if path is None:
+        path = getattr(ws, 'path', None)
+        if path is None and getattr(ws, 'request', None) is not None:
+            path = ws.request.path
+    query = parse_qs(urlparse(path or '').query)
+    room = (query.get('session_id') or [''])[0] or ALL_ROOM
+    return room, (query.get('format') or [''])[0] == 'compact'
+
+
+def _join(client, room, compact=False):
+    with _rooms_lock:
+        members = _rooms.get(client.room)
+        if members is not None:
+            members.discard(client)
+            if not members:
+                del _rooms[client.room]
+        client.room = room
+        if room is not None:
+            _rooms.setdefault(room, set()).add(client)
+    # 紧凑格式需要固定的会话，'*' 房间只支持 JSON
+    client.compact = compact and room not in (None, ALL_ROOM)
+    if client.compact:
+        client.push(room, compact_frames.hello(room), None, 0)
+
+
+async def _sender(client):
+    """把客户端队列中的消息依次发出；发送超时视为慢消费者并断开"""
+    ws = client.ws
     try:
-        async for _ in ws:
-            # 本服务为单向广播，忽略客户端消息
-            continue
+        while True:
+            await client.ready.wait()
+            while client.queue:
+                if client.dropped:
+                    notice = json.dumps({'type': 'dropped', 'count': client.dropped})
+                    client.dropped = 0
+                    await asyncio.wait_for(ws.send(notice), Config.WS_SEND_TIMEOUT)
+                room, data, ts, count = client.queue.popleft()
+                await asyncio.wait_for(ws.send(data), Config.WS_SEND_TIMEOUT)
+                if count:
+                    _stats.delivered(room, time.time() - ts, count)
+            client.ready.clear()
+    except asyncio.TimeoutError:
+        _stats.disconnected(client.room)
+        logger.warning(f"WS 客户端发送超时，断开: {ws.remote_address} 房间: {client.room}")
+        await ws.close(code=1013, reason='slow consumer')
+    except asyncio.CancelledError:
+        raise
+    except Exception:
+        # 连接已关闭，由 _handler 清理
+        pass
+
+
+async def _handler(ws, path=None):
+    # 注册客户端（websockets 新版本只传 ws，旧版本额外传 path）
+    client = _Client(ws, None, Config.WS_CLIENT_QUEUE_MAX)
+    _join(client, *_params_from_path(ws, path))
+    sender = asyncio.ensure_future(_sender(client))
+    logger.info(f"WS 客户端已连接: {ws.remote_address} 房间: {client.room}")
+    try:
+        async for message in ws:
+            try:
+                msg = json.loads(message)
+            except (TypeError, ValueError):
+                continue
+            if isinstance(msg, dict) and msg.get('type') == 'subscribe':
+                _join(client, str(msg.get('session_id') or ALL_ROOM), msg.get('format') == 'compact')
     except Exception:
         pass
     finally:
-        try:
-            _clients.discard(ws)
-        except Exception:
-            pass
+        sender.cancel()
+        _join(client, None)
         logger.info(f"WS 客户端断开: {ws.remote_address}")
 
 
-async def _broadcast_json(obj):
-    if not _clients:
+def _fanout(room, data, ts, event=None):
+    """在事件循环线程中把已序列化的消息放入房间（及 '*' 房间）内各客户端的队列；紧凑格式客户端的事件先进入批次"""
+    _stats.published(room)
+    compact = False
+    for key in (room, ALL_ROOM) if room != ALL_ROOM else (ALL_ROOM,):
+        for client in _rooms.get(key, ()):
+            if client.compact:
+                compact = True
+            else:
+                client.push(room, data, ts)
+    if compact:
+        batch = _batches.get(room)
+        if batch is None:
+            batch = _batches[room] = []
+            _batch_timers[room] = _loop.call_later(Config.WS_BATCH_MS / 1000, _flush_batch, room)
+        batch.append(event if event is not None else json.loads(data))
+        if len(batch) >= Config.WS_BATCH_MAX:
+            _flush_batch(room)
+
+
+def _flush_batch(room):
+    """把房间积攒的事件编码为一帧（只编码一次），放入紧凑格式客户端的队列"""
+    timer = _batch_timers.pop(room, None)
+    if timer is not None:
+        timer.cancel()
+    events = _batches.pop(room, None)
+    if not events:
         return
-    data = json.dumps(obj, ensure_ascii=False)
-    coros = []
-    for ws in list(_clients):
-        try:
-            coros.append(ws.send(data))
-        except Exception:
-            try:
-                _clients.discard(ws)
-            except Exception:
-                pass
-    if coros:
-        await asyncio.wait(coros)
+    ts = events[0].get('ts') or time.time()
+    data = compact_frames.encode_batch(events, ts)
+    for client in _rooms.get(room, ()):
+        if client.compact:
+            client.push(room, data, ts, len(events))
 
 
 def start_server(host='127.0.0.1', port=6789):
@@ -68,17 +189,18 @@ def start_server(host='127.0.0.1', port=6789):
 
     def _run():
         global _loop, _server
-        _loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(_loop)
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
         start_coro = _websockets.serve(_handler, host, port)
-        _server = _loop.run_until_complete(start_coro)
+        _server = loop.run_until_complete(start_coro)
+        _loop = loop
         logger.info(f'WebSocket 广播服务已启动 -> ws://{host}:{port}')
         try:
-            _loop.run_forever()
+            loop.run_forever()
         finally:
             try:
                 _server.close()
-                _loop.run_until_complete(_server.wait_closed())
+                loop.run_until_complete(_server.wait_closed())
             except Exception:
                 pass
 
@@ -87,15 +209,42 @@ def start_server(host='127.0.0.1', port=6789):
     return True
 
 
-def broadcast(obj):
-    """向所有已连接客户端广播 JSON 可序列化对象。"""
-    global _loop
+def broadcast(obj, data=None):
+    """向 obj['session_id'] 房间（无会话时为全部客户端）广播 JSON 可序列化对象。
+
+    data 为调用方已序列化好的 JSON 字符串时直接复用；不阻塞调用线程。
+    """
+    if _websockets is None or _loop is None:
+        return False
+    if data is None:
+        data = json.dumps(obj, ensure_ascii=False, default=str)
+    return send_room(str(obj.get('session_id') or ALL_ROOM), data, obj.get('ts') or time.time(), obj)
+
+
+def send_room(room, data, ts, event=None):
+    """把已序列化的 JSON 字符串推送给房间内的客户端；ts 为事件发布时间，用于统计扇出延迟。
+
+    event 为对应的事件字典（可选），有紧凑格式客户端时用于编码，省去反序列化。
+    """
     if _websockets is None or _loop is None:
         return False
     try:
-        fut = asyncio.run_coroutine_threadsafe(_broadcast_json(obj), _loop)
-        # 不阻塞，丢弃结果
+        _loop.call_soon_threadsafe(_fanout, room, data, ts, event)
         return True
     except Exception as e:
         logger.warning(f'广播失败: {e}')
         return False
+
+
+def stats():
+    """WebSocket 推送指标：各房间连接数、发布/送达/丢弃条数与扇出延迟"""
+    with _rooms_lock:
+        subscribers = {room: len(members) for room, members in _rooms.items()}
+        compact = sum(client.compact for members in _rooms.values() for client in members)
+    return {
+        'enabled': _loop is not None,
+        'connections': sum(subscribers.values()),
+        'compact_connections': compact,
+        **_stats.totals(),
+        'rooms': _stats.snapshot(subscribers),
+    }
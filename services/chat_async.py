@@ -0,0 +1,220 @@
+"""
+异步对话路径
+
+与 /api/chat 相同的处理流程与 JSON 契约，供 ASGI 入口（asgi.py）使用：等待 DeepSeek 时不占用线程，
+单个进程可以同时挂起数百个 AI 调用，并发上限由 AI_ASYNC_MAX_CONNECTIONS 决定而不是线程数。
+
+- AI 调用使用 aiohttp.ClientSession，提示词与重试策略与同步的 AIService 一致
+- 数据库访问（敏感词、FAQ、问答缓存、会话上下文多为进程内缓存命中，对话记录为缓冲写入）
+  在 ASYNC_DB_THREADS 个线程中执行，只在真正查库时短暂占用线程
+- 语音合成本来就是后台任务（services/tts_jobs.py），请求中只提交任务
+
+依赖 aiohttp（pip install -r requirements-async.txt）；未安装时 asgi.py 启动即报错，本模块仍可导入（指标接口会引用）。
+"""
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from config import Config
+from database import db
+from services import AIService
+from services.answer_pipeline import validate_chat_request, sensitive_error, local_answer, submit_tts
+from utils.helpers import question_hash
+from utils.http_client import async_request_with_retry
+from utils.logger import get_logger
+from utils.single_flight import AsyncSingleFlight
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+logger = get_logger(__name__)
+
+_db_executor = ThreadPoolExecutor(max_workers=Config.ASYNC_DB_THREADS, thread_name_prefix='async-db')
+
+
+async def run_blocking(fn, *args):
+    """在数据库线程池中执行同步调用"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_db_executor, functools.partial(fn, *args))
+
+
+class AsyncAIService(AIService):
+    """AIService 的异步版本：复用提示词构建与配置，HTTP 调用走 aiohttp.ClientSession"""
+
+    def __init__(self):
+        super().__init__()
+        self._client = None
+        self.in_flight = 0
+        self.calls = 0
+        self.failures = 0
+
+    def _get_client(self):
+        # ClientSession 绑定首次使用它的事件循环；ASGI 服务器每个进程只有一个循环
+        if self._client is None:
+            self._client = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=None, sock_connect=Config.AI_CONNECT_TIMEOUT,
+                                              sock_read=Config.AI_READ_TIMEOUT),
+                connector=aiohttp.TCPConnector(limit=Config.AI_ASYNC_MAX_CONNECTIONS)
+            )
+        return self._client
+
+    async def acall_api(self, prompt, session_context=None):
+        """
+        异步调用DeepSeek API
+
+        Args:
+            prompt: 用户问题
+            session_context: 会话上下文（主播、主题、商品等）
+
+        Returns:
+            AI回复内容，失败返回None
+        """
+        if aiohttp is None:
+            logger.error("❌ 未安装 aiohttp（pip install -r requirements-async.txt），异步对话路径无法调用AI API")
+            return None
+        self.calls += 1
+        self.in_flight += 1
+        try:
+            headers, payload = self._build_request(prompt, session_context)
+
+            logger.info(f"调用AI API(异步) - 模型: {self.model}")
+
+            response = await async_request_with_retry(
+                self._get_client(),
+                'POST',
+                self.api_url,
+                retries=Config.AI_MAX_RETRIES,
+                backoff=Config.AI_RETRY_BACKOFF,
+                headers=headers,
+                json=payload
+            )
+
+            async with response:
+                response.raise_for_status()
+                result = await response.json(content_type=None)
+
+            if 'choices' in result and len(result['choices']) > 0:
+                ai_response = result['choices'][0]['message']['content']
+                logger.info(f"✅ AI API调用成功")
+                return ai_response
+            else:
+                self.failures += 1
+                logger.error(f"AI API响应格式异常: {result}")
+                return None
+
+        except asyncio.TimeoutError:
+            self.failures += 1
+            logger.error("AI API调用超时")
+            return None
+        except aiohttp.ClientError as e:
+            self.failures += 1
+            logger.error(f"AI API请求失败: {str(e)}")
+            return None
+        except Exception as e:
+            self.failures += 1
+            logger.error(f"AI API调用异常: {str(e)}", exc_info=True)
+            return None
+        finally:
+            self.in_flight -= 1
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
+    def stats(self):
+        return {
+            'available': aiohttp is not None,
+            'in_flight': self.in_flight,
+            'calls': self.calls,
+            'failures': self.failures,
+        }
+
+
+# 单例
+async_ai_service = AsyncAIService()
+
+# 异步路径的 AI 调用合并（与线程版 ai_flight 相互独立）
+ai_flight_async = AsyncSingleFlight()
+
+
+def _before_ai(session_id, message):
+    """敏感词 -> FAQ白名单 -> 问答缓存 -> 会话上下文（同步，在数据库线程中执行）
+
+    Returns:
+        tuple: ((响应体, 状态码), None) 表示直接返回；(None, 会话上下文) 表示需要调用AI
+    """
+    error = sensitive_error(message)
+    if error:
+        return error, None
+
+    answer, source = local_answer(session_id, message)
+    if answer:
+        # FAQ/缓存答案重复率高，语音通常已在磁盘上，直接返回可播放的地址
+        return ({"response": answer, source: True, **submit_tts(answer)}, 200), None
+
+    # 获取会话上下文（进程内缓存，不加载对话历史）
+    session = db.get_session_context(session_id)
+    if not session:
+        return ({"error": "会话不存在"}, 404), None
+    return None, session
+
+
+def _after_ai(session_id, message, ai_response):
+    """保存对话并提交语音合成（同步，在数据库线程中执行）"""
+    db.save_conversation(session_id, message, ai_response)
+    return {"response": ai_response, "status": "success", **submit_tts(ai_response)}, 200
+
+
+async def ask_ai_async(session_id, message, session):
+    """ask_ai 的异步版本，返回 (答案, 是否复用了并发请求的结果)，失败时答案为 None"""
+    async def call():
+        logger.info(f"调用AI API - 会话: {session_id}")
+        answer = await async_ai_service.acall_api(message, session)
+        if answer:
+            await run_blocking(db.cache_qa, session_id, message, answer)
+        return answer
+
+    return await ai_flight_async.do((session_id, question_hash(message)), call)
+
+
+async def chat(data):
+    """与 /api/chat 相同的处理流程，返回 (响应体, 状态码)"""
+    try:
+        session_id, message, error = validate_chat_request(data)
+        if error:
+            return error
+
+        logger.info(f"收到聊天请求(异步) - 会话: {session_id}, 消息长度: {len(message)}")
+
+        # ========== 敏感词、FAQ白名单、问答缓存 ==========
+        result, session = await run_blocking(_before_ai, session_id, message)
+        if result:
+            return result
+
+        # ========== 调用AI API（不占用线程） ==========
+        ai_response, coalesced = await ask_ai_async(session_id, message, session)
+
+        if not ai_response:
+            return {"error": "AI服务暂时不可用，请稍后重试"}, 503
+
+        if coalesced:
+            logger.info(f"✅ 复用并发请求的AI响应 - 会话: {session_id}")
+        else:
+            logger.info(f"✅ AI响应成功 - 会话: {session_id}")
+
+        # ========== 保存对话并提交后台 TTS 任务 ==========
+        return await run_blocking(_after_ai, session_id, message, ai_response)
+
+    except Exception as e:
+        logger.error(f"聊天处理异常: {str(e)}", exc_info=True)
+        return {"error": f"服务器错误: {str(e)}"}, 500
+
+
+def stats():
+    return {
+        'ai': async_ai_service.stats(),
+        'single_flight': ai_flight_async.stats(),
+    }
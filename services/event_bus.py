@@ -0,0 +1,232 @@
+"""
+跨进程事件总线
+
+EventHub 发布事件时先投递给本进程的订阅者，再交给总线转发给其他进程；其他进程收到后投递给各自的订阅者，
+因此多进程部署（gunicorn 多 worker 等）时，任一进程入队的弹幕都能推送到连接在任意进程上的 SSE/WebSocket 客户端。
+
+EVENT_BUS_URL 选择后端：
+  空 / memory://              单进程，不跨进程转发（默认）
+  redis://[:密码@]host:port   Redis PUBLISH/SUBSCRIBE
+  unix:///path/to/broker.sock 同上，走 Unix socket
+协议只用到 Redis 的 PUBLISH / SUBSCRIBE，可以用 scripts/event_broker.py 这个本地替身代替 Redis，
+不依赖 redis 客户端库。
+
+转发是“至多一次”：总线断开期间发布的事件只在本进程投递，重连前积压超过 EVENT_BUS_MAX_PENDING 的事件丢弃最旧的。
+"""
+import os
+import time
+import socket
+import threading
+import uuid
+from collections import deque
+from urllib.parse import urlparse, unquote
+
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class MemoryBus:
+    """单进程总线：事件已由 EventHub 在本进程投递，无需转发"""
+
+    backend = 'memory'
+
+    def start(self, handler):
+        pass
+
+    def publish(self, session_id, data, ts):
+        pass
+
+    def stats(self):
+        return {'backend': self.backend}
+
+
+def _encode_command(*args):
+    out = [b'*%d\r\n' % len(args)]
+    for arg in args:
+        if isinstance(arg, str):
+            arg = arg.encode('utf-8')
+        out.append(b'$%d\r\n%s\r\n' % (len(arg), arg))
+    return b''.join(out)
+
+
+def _read_reply(f):
+    """从缓冲文件读取一条 RESP 回复"""
+    line = f.readline()
+    if not line:
+        raise ConnectionError('总线连接已关闭')
+    prefix, body = line[:1], line[1:-2]
+    if prefix == b'+':
+        return body
+    if prefix == b'-':
+        raise RuntimeError(body.decode('utf-8', 'replace'))
+    if prefix == b':':
+        return int(body)
+    if prefix == b'$':
+        n = int(body)
+        return None if n < 0 else f.read(n + 2)[:-2]
+    if prefix == b'*':
+        n = int(body)
+        return None if n < 0 else [_read_reply(f) for _ in range(n)]
+    raise ConnectionError(f'无法解析的总线回复: {line[:50]!r}')
+
+
+class RespBus:
+    """基于 Redis PUBLISH/SUBSCRIBE 协议的跨进程总线
+
+    一个发布线程把积压的事件批量流水线写出，一个订阅线程接收其他进程的事件并回调 handler；
+    两个线程在首次使用时启动，fork 出的子进程会重新启动自己的线程。
+
+    Args:
+        url: redis://host:port 或 unix:///path
+        channel: 发布/订阅的频道名
+        max_pending: 发布积压上限，超出丢弃最旧的事件
+    """
+
+    backend = 'resp'
+
+    def __init__(self, url, channel='xiaoju:events', max_pending=10000):
+        self.url = url
+        self.channel = channel
+        self.max_pending = max_pending
+        self.node_id = uuid.uuid4().hex[:12]
+        self._handler = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._pending = deque()
+        self._cond = threading.Condition()
+        self.published = 0
+        self.received = 0
+        self.dropped = 0
+        self.connected = False
+
+    def start(self, handler):
+        """启动发布/订阅线程（幂等）；handler(session_id, data, ts) 在订阅线程中调用"""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            # fork 后父进程的线程与连接不可用，子进程使用新的节点 ID 与状态
+            self._pid = os.getpid()
+            self.node_id = uuid.uuid4().hex[:12]
+            self._handler = handler
+            self._pending.clear()
+            self._cond = threading.Condition()
+            threading.Thread(target=self._publish_loop, daemon=True, name='event-bus-pub').start()
+            threading.Thread(target=self._subscribe_loop, daemon=True, name='event-bus-sub').start()
+
+    def publish(self, session_id, data, ts):
+        payload = f"{self.node_id}\t{session_id}\t{ts!r}\t{data}".encode('utf-8')
+        with self._cond:
+            if len(self._pending) >= self.max_pending:
+                self._pending.popleft()
+                self.dropped += 1
+            self._pending.append(payload)
+            self._cond.notify()
+
+    def stats(self):
+        return {
+            'backend': self.backend,
+            'url': self._safe_url(),
+            'connected': self.connected,
+            'published': self.published,
+            'received': self.received,
+            'dropped': self.dropped,
+            'pending': len(self._pending),
+        }
+
+    def _safe_url(self):
+        parsed = urlparse(self.url)
+        if parsed.password:
+            return self.url.replace(f':{parsed.password}@', ':***@')
+        return self.url
+
+    def _connect(self):
+        parsed = urlparse(self.url)
+        if parsed.scheme == 'unix':
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.connect(unquote(parsed.path))
+        else:
+            sock = socket.create_connection((parsed.hostname or '127.0.0.1', parsed.port or 6379), timeout=5)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.settimeout(None)
+        f = sock.makefile('rb')
+        if parsed.password:
+            sock.sendall(_encode_command('AUTH', unquote(parsed.password)))
+            _read_reply(f)
+        return sock, f
+
+    def _publish_loop(self):
+        sock = f = None
+        backoff = 0.5
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                batch = [self._pending.popleft() for _ in range(min(len(self._pending), 1000))]
+            try:
+                if sock is None:
+                    sock, f = self._connect()
+                sock.sendall(b''.join(_encode_command('PUBLISH', self.channel, p) for p in batch))
+                for _ in batch:
+                    _read_reply(f)
+                self.published += len(batch)
+                backoff = 0.5
+            except Exception as e:
+                self.dropped += len(batch)
+                logger.warning(f"事件总线发布失败，{backoff:g}s 后重连: {e}")
+                sock = self._close(sock)
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 5)
+
+    def _subscribe_loop(self):
+        backoff = 0.5
+        while True:
+            sock = None
+            try:
+                sock, f = self._connect()
+                sock.sendall(_encode_command('SUBSCRIBE', self.channel))
+                _read_reply(f)
+                self.connected = True
+                backoff = 0.5
+                logger.info(f"事件总线已连接: {self._safe_url()} 频道: {self.channel}")
+                prefix = self.node_id.encode() + b'\t'
+                while True:
+                    reply = _read_reply(f)
+                    if not isinstance(reply, list) or len(reply) != 3 or reply[0] != b'message':
+                        continue
+                    payload = reply[2]
+                    if payload.startswith(prefix):
+                        continue  # 本进程发布的事件已在本地投递
+                    try:
+                        _, session_id, ts, data = payload.decode('utf-8').split('\t', 3)
+                        self.received += 1
+                        self._handler(session_id, data, float(ts))
+                    except Exception:
+                        logger.warning('事件总线消息处理失败', exc_info=True)
+            except Exception as e:
+                logger.warning(f"事件总线订阅断开，{backoff:g}s 后重连: {e}")
+            self.connected = False
+            self._close(sock)
+            time.sleep(backoff)
+            backoff = min(backoff * 2, 5)
+
+    @staticmethod
+    def _close(sock):
+        if sock is not None:
+            try:
+                sock.close()
+            except Exception:
+                pass
+        return None
+
+
+def create_bus(url, channel='xiaoju:events', max_pending=10000):
+    """按 URL 创建事件总线"""
+    scheme = urlparse(url).scheme if url else 'memory'
+    if scheme in ('', 'memory'):
+        return MemoryBus()
+    if scheme in ('redis', 'tcp', 'unix'):
+        return RespBus(url, channel, max_pending)
+    raise ValueError(f'不支持的事件总线地址: {url}')
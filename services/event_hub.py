@@ -0,0 +1,145 @@
+"""
+会话事件推送
+
+弹幕入队、自动应答产生答案时调用 publish(session_id, event)，事件只投递给订阅了该会话的客户端
+（/api/session/<session_id>/events 的 SSE 连接），客户端不再需要轮询 /api/bullet-screen/pending。
+同时转发给可选的 bullet_ws 广播服务，兼容已有的 WebSocket 客户端。
+
+每个事件只序列化一次，SSE 帧与 WebSocket 消息共用同一份 JSON；订阅者积压超过上限时丢弃最旧的事件，
+并在下一条事件前补发一条 {"type": "dropped", "count": n} 合并通知，慢消费者不影响发布方与其他订阅者。
+
+多进程部署时配置 EVENT_BUS_URL，事件经跨进程总线（services/event_bus.py）转发给其他进程的订阅者。
+"""
+import json
+import time
+import threading
+from collections import deque
+
+from config import Config
+from services import bullet_ws
+from services.event_bus import MemoryBus, create_bus
+from utils.fanout_stats import FanoutStats
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def _frame(data):
+    return f"data: {data}\n\n"
+
+
+class Subscription:
+    """一个订阅者的有界事件队列；队列满时丢弃最旧的事件并计数"""
+
+    def __init__(self, session_id, max_queue, stats=None):
+        self.session_id = session_id
+        self.max_queue = max_queue
+        self.dropped = 0  # 累计丢弃条数
+        self._pending_dropped = 0  # 尚未通知客户端的丢弃条数
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._stats = stats
+
+    def put(self, frame, ts):
+        """放入一条已编码的 SSE 帧，返回是否挤掉了旧事件"""
+        with self._cond:
+            overflow = len(self._queue) >= self.max_queue
+            if overflow:
+                self._queue.popleft()
+                self.dropped += 1
+                self._pending_dropped += 1
+            self._queue.append((frame, ts))
+            self._cond.notify()
+        return overflow
+
+    def get(self, timeout=None):
+        """取下一条 SSE 帧，超时返回 None"""
+        with self._cond:
+            if not self._queue and not self._cond.wait_for(lambda: self._queue, timeout):
+                return None
+            if self._pending_dropped:
+                count, self._pending_dropped = self._pending_dropped, 0
+                return _frame(json.dumps({"type": "dropped", "count": count}))
+            frame, ts = self._queue.popleft()
+        if self._stats is not None:
+            self._stats.delivered(self.session_id, time.time() - ts)
+        return frame
+
+
+class EventHub:
+    """按会话分组的发布/订阅
+
+    Args:
+        max_queue: 每个订阅者最多积压的事件数
+        bus: 跨进程事件总线，默认只在本进程投递
+    """
+
+    def __init__(self, max_queue=256, bus=None):
+        self.max_queue = max_queue
+        self.bus = bus or MemoryBus()
+        self._rooms = {}  # session_id -> set(Subscription)
+        self._lock = threading.Lock()
+        self._stats = FanoutStats()
+
+    def start(self):
+        """连接跨进程总线，接收其他进程发布的事件（幂等，fork 后的子进程会重新连接）"""
+        self.bus.start(self._deliver)
+
+    def subscribe(self, session_id):
+        self.start()
+        sub = Subscription(session_id, self.max_queue, self._stats)
+        with self._lock:
+            self._rooms.setdefault(session_id, set()).add(sub)
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            room = self._rooms.get(sub.session_id)
+            if room is not None:
+                room.discard(sub)
+                if not room:
+                    del self._rooms[sub.session_id]
+
+    def publish(self, session_id, event):
+        """向会话的全部订阅者（含其他进程）投递事件（不阻塞），返回本进程投递到的订阅者数"""
+        event.setdefault('session_id', session_id)
+        ts = event.setdefault('ts', time.time())
+        data = json.dumps(event, ensure_ascii=False, default=str)
+        self.start()
+        delivered = self._deliver(session_id, data, ts, event)
+        self.bus.publish(session_id, data, ts)
+        return delivered
+
+    def _deliver(self, session_id, data, ts, event=None):
+        """把已序列化的事件投递给本进程的 SSE 订阅者与 WebSocket 房间；event 为本进程发布时的原事件"""
+        frame = _frame(data)
+        with self._lock:
+            subscribers = list(self._rooms.get(session_id, ()))
+        self._stats.published(session_id)
+        dropped = sum(sub.put(frame, ts) for sub in subscribers)
+        if dropped:
+            self._stats.dropped(session_id, dropped)
+            logger.warning(f"订阅者事件积压已满，丢弃最旧事件 - 会话: {session_id}, 订阅者: {dropped}")
+        try:
+            bullet_ws.send_room(session_id, data, ts, event)
+        except Exception:
+            logger.warning('WebSocket 广播失败', exc_info=True)
+        return len(subscribers)
+
+    def stats(self):
+        with self._lock:
+            subscribers = {session_id: len(room) for session_id, room in self._rooms.items()}
+        return {
+            'sessions': len(subscribers),
+            'subscribers': sum(subscribers.values()),
+            **self._stats.totals(),
+            'bus': self.bus.stats(),
+            'rooms': self._stats.snapshot(subscribers),
+        }
+
+
+# 单例
+event_hub = EventHub(
+    max_queue=Config.EVENT_QUEUE_MAX,
+    bus=create_bus(Config.EVENT_BUS_URL, Config.EVENT_BUS_CHANNEL, Config.EVENT_BUS_MAX_PENDING)
+)
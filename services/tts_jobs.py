@@ -0,0 +1,282 @@
+"""
+后台 TTS 任务队列
+
+把百度 TTS 合成移出请求路径：提交任务后立即返回 job_id 与预分配的 audio_url，
+由有界线程池在后台合成；前端通过 /api/tts/status 轮询任务状态。
+
+音频按内容寻址：文件名 tts-<key>.<ext> 中的 key 是 (文本, 音色, 格式, 采样率, 语速)
+的哈希，同时也是 job_id。相同答案再次提交时直接复用磁盘上的文件或进行中的任务；
+后台清理任务按最近使用时间淘汰文件，把目录控制在 max_bytes / max_files 以内。
+"""
+import os
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from config import Config
+from services import baidu_tts
+from utils.logger import get_logger
+from utils.periodic import PeriodicTask
+
+logger = get_logger(__name__)
+
+PENDING = 'pending'
+DONE = 'done'
+FAILED = 'failed'
+
+AUDIO_EXTENSIONS = ('.wav', '.mp3')
+# 残留的临时文件超过该时间视为合成中断，可以清理
+STALE_TMP_SECONDS = 3600
+
+
+class TTSJobQueue:
+    """有界的后台 TTS 合成队列
+
+    Args:
+        workers: 并发合成线程数
+        max_pending: 排队+执行中的任务上限，超过时拒绝提交（本次回答不带语音）
+        out_dir: 音频输出目录（对应 /static/audio/）
+        max_jobs: 保留的任务记录条数，超出后淘汰最早的记录
+        max_bytes: 音频目录总大小上限，0 表示不限制
+        max_files: 音频文件数上限，0 表示不限制
+        sweep_interval: 清理音频目录的间隔（秒）
+    """
+
+    def __init__(self, workers=2, max_pending=32, out_dir=None, max_jobs=1000,
+                 max_bytes=0, max_files=0, sweep_interval=300):
+        self.out_dir = out_dir or Config.AUDIO_DIR
+        self.max_pending = max_pending
+        self.max_jobs = max_jobs
+        self.max_bytes = max_bytes
+        self.max_files = max_files
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='tts')
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.submitted = 0
+        self.rejected = 0
+        self.failed = 0
+        self.disk_hits = 0
+        self.deduplicated = 0
+        self.evicted = 0
+        self._sweeper = PeriodicTask(self.sweep, sweep_interval, name='tts-audio-sweeper',
+                                     final=lambda: None)
+
+    def submit(self, text):
+        """提交合成任务
+
+        相同内容的音频已在磁盘上时直接返回 done 状态；正在合成时返回进行中的任务。
+
+        Returns:
+            dict: 任务信息 {job_id, status, ready, audio_url, error}；队列已满返回 None
+        """
+        if not text:
+            return None
+        job_id, filename, out_path = self._locate(text)
+        self._sweeper.start()
+
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job and job['status'] == PENDING:
+                self.deduplicated += 1
+                return self._public(job)
+
+            if self._touch(out_path):
+                self.disk_hits += 1
+                job = self._remember(job_id, filename, DONE)
+                return self._public(job)
+
+            if self._pending >= self.max_pending:
+                self.rejected += 1
+                logger.warning(f"TTS 队列已满（{self._pending}），本次回答不合成语音")
+                return None
+            self._pending += 1
+            self.submitted += 1
+            job = self._remember(job_id, filename, PENDING)
+
+        self._executor.submit(self._run, job, text, out_path)
+        return self._public(job)
+
+    def render(self, text):
+        """同步确保 text 的音频已在缓存中（供 FAQ 预热使用，不占用实时队列名额）
+
+        Returns:
+            str: 'cached'（已在磁盘或正在被实时任务合成）或 'synthesized'；合成失败抛出异常
+        """
+        job_id, filename, out_path = self._locate(text)
+        self._sweeper.start()
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if (job and job['status'] == PENDING) or self._touch(out_path):
+                return 'cached'
+        self._synthesize_file(text, job_id, out_path)
+        with self._lock:
+            if job_id not in self._jobs or self._jobs[job_id]['status'] != PENDING:
+                self._remember(job_id, filename, DONE)
+        return 'synthesized'
+
+    def get(self, job_id):
+        """查询任务状态，不存在返回 None
+
+        任务记录已被淘汰但音频仍在磁盘上时视为已完成。
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job:
+                return self._public(job)
+        for ext in AUDIO_EXTENSIONS:
+            filename = f"tts-{job_id}{ext}"
+            if os.path.isfile(os.path.join(self.out_dir, filename)):
+                return self._public(self._new_job(job_id, filename, DONE))
+        return None
+
+    def stats(self):
+        with self._lock:
+            return {
+                'pending': self._pending,
+                'submitted': self.submitted,
+                'rejected': self.rejected,
+                'failed': self.failed,
+                'disk_hits': self.disk_hits,
+                'deduplicated': self.deduplicated,
+                'evicted_files': self.evicted,
+            }
+
+    def sweep(self):
+        """按最近使用时间（mtime，命中时会刷新）淘汰音频，直到满足大小与数量上限
+
+        Returns:
+            int: 删除的文件数
+        """
+        if not self.max_bytes and not self.max_files:
+            return 0
+        try:
+            names = os.listdir(self.out_dir)
+        except FileNotFoundError:
+            return 0
+
+        now = time.time()
+        files = []
+        removed = 0
+        with self._lock:
+            in_flight = {job['audio_url'].rsplit('/', 1)[-1]
+                         for job in self._jobs.values() if job['status'] == PENDING}
+        for name in names:
+            path = os.path.join(self.out_dir, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            if name.endswith('.tmp'):
+                if now - st.st_mtime > STALE_TMP_SECONDS and self._remove(path):
+                    removed += 1
+                continue
+            if name.endswith(AUDIO_EXTENSIONS) and name not in in_flight:
+                files.append((st.st_mtime, st.st_size, path))
+
+        files.sort()
+        total = sum(size for _, size, _ in files)
+        count = len(files)
+        for _, size, path in files:
+            if (not self.max_bytes or total <= self.max_bytes) and (not self.max_files or count <= self.max_files):
+                break
+            if self._remove(path):
+                total -= size
+                count -= 1
+                removed += 1
+
+        if removed:
+            with self._lock:
+                self.evicted += removed
+            logger.info(f"🧹 清理 TTS 音频 {removed} 个，剩余 {count} 个 / {total / 1024 / 1024:.1f}MB")
+        return removed
+
+    def _run(self, job, text, out_path):
+        try:
+            self._synthesize_file(text, job['job_id'], out_path)
+            status, error = DONE, None
+        except Exception as e:
+            status, error = FAILED, str(e)
+            logger.warning(f'Baidu TTS 合成失败: {e}', exc_info=True)
+        with self._lock:
+            job['status'] = status
+            job['error'] = error
+            self._pending -= 1
+            if status == FAILED:
+                self.failed += 1
+
+    def _synthesize_file(self, text, job_id, out_path):
+        """合成到 out_path；先写临时文件再原子改名，避免半个文件被当成缓存命中"""
+        started = time.perf_counter()
+        tmp_path = f"{out_path}.{job_id[:8]}.{threading.get_ident()}.tmp"
+        os.makedirs(os.path.dirname(out_path), exist_ok=True)
+        try:
+            baidu_tts.synthesize(text, out_path=tmp_path)
+            os.replace(tmp_path, out_path)
+        except Exception:
+            self._remove(tmp_path)
+            raise
+        logger.info(f"✅ TTS 合成完成 - 任务: {job_id}, 耗时: {(time.perf_counter() - started) * 1000:.0f}ms")
+
+    def _locate(self, text):
+        """返回 (job_id, 文件名, 文件路径)"""
+        job_id = baidu_tts.audio_key(text)
+        filename = f"tts-{job_id}.{baidu_tts.audio_extension()}"
+        return job_id, filename, os.path.join(self.out_dir, filename)
+
+    def _remember(self, job_id, filename, status):
+        """记录任务（调用方持有锁），同 key 的旧记录被替换并移到队尾"""
+        job = self._new_job(job_id, filename, status)
+        self._jobs.pop(job_id, None)
+        self._jobs[job_id] = job
+        while len(self._jobs) > self.max_jobs:
+            self._jobs.popitem(last=False)
+        return job
+
+    @staticmethod
+    def _new_job(job_id, filename, status):
+        return {
+            'job_id': job_id,
+            'status': status,
+            'audio_url': f"/static/audio/{filename}",
+            'error': None,
+            'created_at': time.time(),
+        }
+
+    @staticmethod
+    def _touch(path):
+        """文件存在时刷新 mtime（供 LRU 淘汰使用）并返回 True"""
+        try:
+            os.utime(path, None)
+            return True
+        except OSError:
+            return False
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False
+
+    @staticmethod
+    def _public(job):
+        return {
+            'job_id': job['job_id'],
+            'status': job['status'],
+            'ready': job['status'] == DONE,
+            'audio_url': job['audio_url'],
+            'error': job['error'],
+        }
+
+
+# 单例
+tts_jobs = TTSJobQueue(
+    workers=Config.TTS_WORKERS,
+    max_pending=Config.TTS_MAX_PENDING,
+    max_bytes=Config.TTS_AUDIO_MAX_MB * 1024 * 1024,
+    max_files=Config.TTS_AUDIO_MAX_FILES,
+    sweep_interval=Config.TTS_AUDIO_SWEEP_INTERVAL,
+)
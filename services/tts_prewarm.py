@@ -0,0 +1,150 @@
+"""
+FAQ 语音预热
+
+会话的 FAQ 答案在开播前就已确定（apply_faq_template / scripts/import_faqs.py 写入白名单后），
+预热任务在后台把这些答案逐条合成进内容寻址的音频缓存，直播中 FAQ 命中时即可直接返回音频。
+合成并发与调用频率都有上限，避免占满百度 TTS 的 QPS 配额影响实时回答的语音。
+"""
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from config import Config
+from database import db
+from services import baidu_tts
+from services.tts_jobs import tts_jobs
+from utils.logger import get_logger
+from utils.rate_limiter import RateLimiter
+from utils.sentence_splitter import split_sentences
+
+logger = get_logger(__name__)
+
+RUNNING = 'running'
+DONE = 'done'
+SKIPPED = 'skipped'
+
+
+class TTSPrewarmer:
+    """按会话预合成 FAQ 答案语音
+
+    Args:
+        concurrency: 同时进行的合成数（所有会话共享）
+        rate: 每秒最多发起的合成次数（所有会话共享），<= 0 不限速
+        jobs: 音频缓存所在的 TTSJobQueue
+    """
+
+    def __init__(self, concurrency=2, rate=5.0, jobs=None):
+        self.jobs = jobs or tts_jobs
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='tts-prewarm')
+        self._limiter = RateLimiter(rate)
+        self._progress = {}
+        self._queued = {}  # session_id -> 当前一轮已排队的文本，正在预热时用于只追加新答案
+        self._lock = threading.Lock()
+
+    def prewarm(self, session_id, answers=None):
+        """启动会话的预热任务；同一会话正在预热时只把尚未排队的答案追加到当前任务
+
+        Args:
+            session_id: 会话ID
+            answers: 要合成的答案列表，默认取会话当前全部 FAQ 答案
+
+        Returns:
+            dict: 预热进度（total 为去重后的待合成文本数，含分句）
+        """
+        if not baidu_tts.is_configured():
+            with self._lock:
+                progress = self._new_progress(session_id, 0, SKIPPED)
+                self._progress[session_id] = progress
+                return dict(progress)
+
+        if answers is None:
+            answers = db.get_faq_answers(session_id)
+        texts = list(dict.fromkeys(self._texts(answers)))
+
+        # 检查与登记在同一次加锁内完成，并发的预热请求不会各自启动一轮
+        with self._lock:
+            progress = self._progress.get(session_id)
+            appending = bool(progress) and progress['status'] == RUNNING
+            if appending:
+                queued = self._queued[session_id]
+                texts = [t for t in texts if t not in queued]
+                progress['total'] += len(texts)
+            else:
+                progress = self._new_progress(session_id, len(texts), RUNNING if texts else DONE)
+                self._progress[session_id] = progress
+                queued = self._queued[session_id] = set()
+            queued.update(texts)
+            snapshot = dict(progress)
+
+        if texts:
+            logger.info(f"🔊 {'追加' if appending else '开始'}预热FAQ语音 - 会话: {session_id}, 答案数: {len(texts)}")
+            for text in texts:
+                self._executor.submit(self._render_one, session_id, progress, text)
+        return snapshot
+
+    def get_progress(self, session_id):
+        """获取会话的预热进度，未预热过返回 None"""
+        with self._lock:
+            progress = self._progress.get(session_id)
+            return dict(progress) if progress else None
+
+    def wait(self, session_id, timeout=None, poll_interval=0.2):
+        """阻塞直到会话预热结束或超时，返回最终进度（供脚本使用）"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            progress = self.get_progress(session_id)
+            if not progress or progress['status'] != RUNNING:
+                return progress
+            if deadline is not None and time.monotonic() >= deadline:
+                return progress
+            time.sleep(poll_interval)
+
+    @staticmethod
+    def _texts(answers):
+        """需要合成的文本：整段答案（/api/chat）及分句模式下的每一句（/api/chat/stream）
+
+        FAQ 答案大多只有一两句，分句结果常与整段相同，内容寻址缓存下不会重复合成。
+        """
+        for answer in answers:
+            if not answer:
+                continue
+            yield answer
+            if Config.TTS_SENTENCE_CHUNKS:
+                yield from split_sentences(answer, Config.TTS_CHUNK_MIN_CHARS, Config.TTS_CHUNK_MAX_CHARS)
+
+    @staticmethod
+    def _new_progress(session_id, total, status):
+        return {
+            'session_id': session_id,
+            'status': status,
+            'total': total,
+            'completed': 0,
+            'synthesized': 0,
+            'cached': 0,
+            'failed': 0,
+            'started_at': time.time(),
+            'finished_at': None if status == RUNNING else time.time(),
+        }
+
+    def _render_one(self, session_id, progress, answer):
+        """合成一条文本并计入所属这一轮的进度（progress 为该轮自己的对象，不随会话的新一轮变化）"""
+        try:
+            self._limiter.acquire()
+            result = self.jobs.render(answer)
+        except Exception as e:
+            result = 'failed'
+            logger.warning(f"FAQ语音预热失败 - 会话: {session_id}: {e}")
+        with self._lock:
+            progress[result] += 1
+            progress['completed'] += 1
+            if progress['completed'] >= progress['total']:
+                progress['status'] = DONE
+                progress['finished_at'] = time.time()
+                if self._progress.get(session_id) is progress:
+                    self._queued.pop(session_id, None)
+                logger.info(f"✅ FAQ语音预热完成 - 会话: {session_id}, 新合成: {progress['synthesized']}, "
+                            f"已缓存: {progress['cached']}, 失败: {progress['failed']}")
+
+
+# 单例
+tts_prewarmer = TTSPrewarmer(concurrency=Config.TTS_PREWARM_CONCURRENCY, rate=Config.TTS_PREWARM_RATE)
@@ -388,7 +388,7 @@ function populateSuggestionProducts(products) {
     });
 }
 
-// 从 /api/tts/tts-<hash>.wav 提取文件名
+// 从 /static/audio/tts-<job_id>.wav|.mp3 提取文件名
 function extractTTSFileId(audioUrl) {
     try {
         const u = new URL(audioUrl, window.location.origin);
@@ -399,23 +399,25 @@ function extractTTSFileId(audioUrl) {
     }
 }
 
-// 短轮询等待 TTS 就绪，避免刚开始就触发404
-async function waitForTTSReady(audioUrl, maxWaitMs = 1500, pollIntervalMs = 150) {
+// 轮询后台 TTS 任务直到就绪或失败，返回最终状态（'done' / 'failed' / 'unknown'）
+async function waitForTTSReady(audioUrl, maxWaitMs = 30000, pollIntervalMs = 300) {
     const start = Date.now();
     const file = extractTTSFileId(audioUrl);
-    if (!file || !file.startsWith('tts-')) return; // 无法识别则直接返回
+    if (!file || !file.startsWith('tts-')) return 'unknown'; // 无法识别则直接返回
     while (Date.now() - start < maxWaitMs) {
         try {
             const resp = await fetch(`${API_BASE}/api/tts/status?file=${encodeURIComponent(file)}`, { cache: 'no-store' });
             if (!resp.ok) break; // 端点不可用则直接跳出
             const data = await resp.json();
-            if (data && data.ready) return; // 就绪
+            if (data && data.ready) return 'done'; // 就绪
+            if (data && data.status === 'failed') return 'failed';
             // 未就绪则短暂等待
         } catch (e) {
             break; // 网络或其他问题，直接跳出，后续走audio自带重试
         }
         await new Promise(r => setTimeout(r, pollIntervalMs));
     }
+    return 'unknown';
 }
 
 // 发送消息
@@ -442,7 +444,7 @@ async function sendMessage() {
     status.textContent = '小聚正在思考...';
 
     try {
-        const response = await fetch(`${API_BASE}/api/chat`, {
+        const response = await fetch(`${API_BASE}/api/chat/stream`, {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json'
@@ -453,15 +455,49 @@ async function sendMessage() {
             })
         });
 
-        const data = await response.json();
-
-        if (response.ok) {
-            addMessage('assistant', data.response, data.audio_url);
-            status.textContent = '✅ 思考完毕';
-        } else {
+        // 校验失败、敏感词等情况仍以 JSON 错误返回
+        const contentType = response.headers.get('Content-Type') || '';
+        if (!response.ok || !contentType.includes('text/event-stream')) {
+            const data = await response.json();
+            if (response.ok) {
+                addMessage('assistant', data.response, data.audio_url);
+                status.textContent = '✅ 思考完毕';
+                return;
+            }
             throw new Error(data.error || '请求失败');
         }
 
+        // 逐段渲染 AI 输出
+        const messageDiv = addMessage('assistant', '');
+        const textP = messageDiv.querySelector('p');
+        const chatContainer = document.getElementById('chatContainer');
+        status.textContent = '小聚正在回答...';
+        let playlist = null; // 分句语音：第一句合成好就开始播放
+        const queued = new Set();
+        const enqueueAudio = (item) => {
+            if (!item || !item.audio_url || queued.has(item.index)) return;
+            queued.add(item.index);
+            if (!playlist) playlist = createAudioPlaylist(messageDiv);
+            playlist.add(item.audio_url);
+        };
+
+        await readEventStream(response, (event) => {
+            if (event.type === 'delta') {
+                textP.textContent += event.text;
+                chatContainer.scrollTop = chatContainer.scrollHeight;
+            } else if (event.type === 'audio') {
+                enqueueAudio(event);
+            } else if (event.type === 'done') {
+                textP.textContent = event.response;
+                if (event.audio_playlist) event.audio_playlist.forEach(enqueueAudio);
+                else if (event.audio_url) attachAudio(messageDiv, event.audio_url);
+                status.textContent = '✅ 思考完毕';
+            } else if (event.type === 'error') {
+                if (!textP.textContent) messageDiv.remove();
+                throw new Error(event.error || '请求失败');
+            }
+        });
+
     } catch (error) {
         console.error('发送消息错误:', error);
         addMessage('assistant', `❌ 抱歉，出现了错误：${error.message}`);
@@ -474,6 +510,28 @@ async function sendMessage() {
     }
 }
 
+// 读取 SSE 响应体（fetch 流），每解析出一条 data 事件调用一次 onEvent
+async function readEventStream(response, onEvent) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder('utf-8');
+    let buffer = '';
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        let sep;
+        while ((sep = buffer.indexOf('\n\n')) !== -1) {
+            const raw = buffer.slice(0, sep);
+            buffer = buffer.slice(sep + 2);
+            const data = raw.split('\n')
+                .filter(line => line.startsWith('data:'))
+                .map(line => line.slice(5).trim())
+                .join('\n');
+            if (data) onEvent(JSON.parse(data));
+        }
+    }
+}
+
 // 添加消息到聊天界面
 function addMessage(role, content, audioUrl) {
     const chatContainer = document.getElementById('chatContainer');
@@ -486,46 +544,109 @@ function addMessage(role, content, audioUrl) {
 
     // 若附带语音
     if (role === 'assistant' && audioUrl) {
-        const audioWrap = document.createElement('div');
-        audioWrap.className = 'audio-wrap';
-        const audio = document.createElement('audio');
-        audio.controls = true;
-        audio.preload = 'auto';
-        // 自动播放（可能受浏览器自动播放策略限制）
-        audio.addEventListener('canplay', () => {
-            const playPromise = audio.play();
-            if (playPromise !== undefined) {
-                playPromise.catch(() => {/* 静默失败，用户可手动播放 */});
-            }
-        });
-        // 若TTS文件尚未生成或被系统短暂占用，采用指数退避重试加载（最长约20s）
-        let retry = 0;
-        audio.addEventListener('error', () => {
-            if (retry < 15) { // 最多重试15次
-                retry++;
-                const delay = Math.min(5000, 400 + Math.pow(1.35, retry) * 200); // 400ms起步，指数增长，封顶5s
-                setTimeout(() => {
-                    const bust = `__r=${Date.now()}`;
-                    const url = new URL(audioUrl, window.location.origin);
-                    url.searchParams.set('__r', bust);
-                    audio.src = url.pathname + url.search;
-                    audio.load();
-                }, delay);
-            }
-        });
-        // 先做一次短轮询，等到ready后再首次设置src，避免一上来就是404
-        waitForTTSReady(audioUrl, 1500, 150).finally(() => {
-            const bust = `__r=${Date.now()}`;
-            const url = new URL(audioUrl, window.location.origin);
-            url.searchParams.set('__r', bust);
-            audio.src = url.pathname + url.search;
-            audio.load();
-        });
-        audioWrap.appendChild(audio);
-        messageDiv.appendChild(audioWrap);
+        attachAudio(messageDiv, audioUrl);
     }
     chatContainer.appendChild(messageDiv);
     chatContainer.scrollTop = chatContainer.scrollHeight;
+    return messageDiv;
+}
+
+// 为消息附加语音播放器
+function attachAudio(messageDiv, audioUrl) {
+    const audioWrap = document.createElement('div');
+    audioWrap.className = 'audio-wrap';
+    const audio = document.createElement('audio');
+    audio.controls = true;
+    audio.preload = 'auto';
+    // 自动播放（可能受浏览器自动播放策略限制）
+    audio.addEventListener('canplay', () => {
+        const playPromise = audio.play();
+        if (playPromise !== undefined) {
+            playPromise.catch(() => {/* 静默失败，用户可手动播放 */});
+        }
+    });
+    // 若TTS文件尚未生成或被系统短暂占用，采用指数退避重试加载（最长约20s）
+    let retry = 0;
+    audio.addEventListener('error', () => {
+        if (retry < 15) { // 最多重试15次
+            retry++;
+            const delay = Math.min(5000, 400 + Math.pow(1.35, retry) * 200); // 400ms起步，指数增长，封顶5s
+            setTimeout(() => {
+                const bust = `__r=${Date.now()}`;
+                const url = new URL(audioUrl, window.location.origin);
+                url.searchParams.set('__r', bust);
+                audio.src = url.pathname + url.search;
+                audio.load();
+            }, delay);
+        }
+    });
+    // 语音在后台合成：轮询任务状态，就绪后再首次设置src，避免一上来就是404
+    waitForTTSReady(audioUrl).then((state) => {
+        if (state === 'failed') {
+            audioWrap.remove(); // 合成失败则不显示播放器
+            return;
+        }
+        const bust = `__r=${Date.now()}`;
+        const url = new URL(audioUrl, window.location.origin);
+        url.searchParams.set('__r', bust);
+        audio.src = url.pathname + url.search;
+        audio.load();
+    });
+    audioWrap.appendChild(audio);
+    messageDiv.appendChild(audioWrap);
+    const chatContainer = document.getElementById('chatContainer');
+    chatContainer.scrollTop = chatContainer.scrollHeight;
+}
+
+// 为消息创建分句语音播放列表：按加入顺序逐句等待合成完成并连续播放
+function createAudioPlaylist(messageDiv) {
+    const audioWrap = document.createElement('div');
+    audioWrap.className = 'audio-wrap';
+    const audio = document.createElement('audio');
+    audio.controls = true;
+    audio.preload = 'auto';
+    audioWrap.appendChild(audio);
+    messageDiv.appendChild(audioWrap);
+
+    const queue = [];
+    let busy = false;
+
+    async function playNext() {
+        if (busy || queue.length === 0) return;
+        busy = true;
+        const audioUrl = queue.shift();
+        const state = await waitForTTSReady(audioUrl);
+        if (state === 'failed') { // 该句合成失败则跳过
+            busy = false;
+            playNext();
+            return;
+        }
+        const url = new URL(audioUrl, window.location.origin);
+        url.searchParams.set('__r', `__r=${Date.now()}`);
+        audio.src = url.pathname + url.search;
+        const playPromise = audio.play();
+        if (playPromise !== undefined) {
+            playPromise.catch(() => {/* 自动播放受限时静默失败，用户手动播放后会继续下一句 */});
+        }
+    }
+
+    audio.addEventListener('ended', () => {
+        busy = false;
+        playNext();
+    });
+    audio.addEventListener('error', () => {
+        busy = false;
+        playNext();
+    });
+
+    const chatContainer = document.getElementById('chatContainer');
+    chatContainer.scrollTop = chatContainer.scrollHeight;
+    return {
+        add(audioUrl) {
+            queue.push(audioUrl);
+            playNext();
+        }
+    };
 }
 
 // 显示错误信息
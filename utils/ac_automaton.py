@@ -0,0 +1,123 @@
+"""
+Aho-Corasick 多模式匹配自动机
+
+一次构建、多次查询：对输入文本做单遍扫描即可找出所有命中的模式串，
+耗时只与文本长度和命中数相关，而与模式串数量无关。
+用于敏感词过滤、FAQ 关键词匹配等需要"一条消息对多个关键词"的场景。
+"""
+
+
+class AhoCorasick:
+    """Aho-Corasick 自动机（构建后只读，可在多线程间共享）
+
+    用法:
+        ac = AhoCorasick(['赌博', '博彩'])
+        ac.find_all('不要赌博彩票')   # -> [0, 1]（命中模式的下标，按下标升序）
+
+    模式串按原样匹配（不做大小写转换），调用方需自行保证模式与文本使用同一种归一化。
+    """
+
+    def __init__(self, patterns):
+        """
+        Args:
+            patterns: 模式串序列；空串会被忽略。模式的下标即为匹配结果中的 id
+        """
+        self.patterns = list(patterns)
+        # 只保存与根节点不同的跳转，未命中时再查根节点（避免 节点数×字符集 的内存膨胀）
+        self._delta = [{}]
+        self._out = [()]
+        self._build()
+
+    def __len__(self):
+        return len(self.patterns)
+
+    def _build(self):
+        goto = [{}]
+        out = [[]]
+
+        # 1. 构建 trie
+        for pid, pattern in enumerate(self.patterns):
+            if not pattern:
+                continue
+            node = 0
+            for ch in pattern:
+                nxt = goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[node][ch] = nxt
+                    goto.append({})
+                    out.append([])
+                node = nxt
+            out[node].append(pid)
+
+        # 2. BFS 计算失败指针与完整跳转（delta 只存非根跳转）
+        fail = [0] * len(goto)
+        delta = [dict() for _ in goto]
+        root_goto = goto[0]
+        queue = list(root_goto.values())
+        for child in queue:
+            fail[child] = 0
+        head = 0
+        while head < len(queue):
+            node = queue[head]
+            head += 1
+            f = fail[node]
+            # 继承失败节点的输出（字典后缀链接展开）
+            if out[f]:
+                out[node].extend(out[f])
+            # 继承失败节点的非根跳转，再用本节点的 trie 边覆盖
+            trans = dict(delta[f])
+            for ch, child in goto[node].items():
+                trans[ch] = child
+                # 子节点的失败指针 = 从 f 出发读入 ch 到达的状态
+                fail[child] = delta[f].get(ch) or root_goto.get(ch, 0)
+                queue.append(child)
+            # 与根跳转相同的条目无需保存
+            delta[node] = {ch: nxt for ch, nxt in trans.items() if root_goto.get(ch, 0) != nxt}
+
+        self._root = root_goto
+        self._delta = delta
+        self._out = [tuple(sorted(set(o))) for o in out]
+
+    def iter_matches(self, text):
+        """逐个产出 (结束位置, 模式id)，同一模式可能出现多次"""
+        if not text:
+            return
+        root = self._root
+        delta = self._delta
+        out = self._out
+        node = 0
+        for i, ch in enumerate(text):
+            node = delta[node].get(ch) or root.get(ch, 0)
+            if out[node]:
+                for pid in out[node]:
+                    yield i, pid
+
+    def find_all(self, text):
+        """返回文本中命中的所有模式 id（去重，按 id 升序）"""
+        if not text:
+            return []
+        root = self._root
+        delta = self._delta
+        out = self._out
+        hits = set()
+        node = 0
+        for ch in text:
+            node = delta[node].get(ch) or root.get(ch, 0)
+            if out[node]:
+                hits.update(out[node])
+        return sorted(hits)
+
+    def contains_any(self, text):
+        """文本是否命中任意模式（命中即返回，不扫描剩余部分）"""
+        if not text:
+            return False
+        root = self._root
+        delta = self._delta
+        out = self._out
+        node = 0
+        for ch in text:
+            node = delta[node].get(ch) or root.get(ch, 0)
+            if out[node]:
+                return True
+        return False
@@ -0,0 +1,256 @@
+"""
+批量写入缓冲（write-behind）
+
+热路径只把记录放进内存中的有界缓冲区，由后台线程在攒够 batch_size 条或
+距上次写入超过 interval 秒时，把整批记录交给 flush 回调（通常是一条多行 INSERT）。
+写库失败时记录追加到本地 JSON Lines 溢出文件，数据库恢复后自动回放；
+进程退出时再做一次 flush。读路径可用 wait_flushed 等待自己关心的记录落库，而不在请求线程中写库。
+"""
+import os
+import json
+import time
+import atexit
+import threading
+import logging
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class BatchWriter:
+    """线程安全的批量写入器
+
+    Args:
+        flush_fn: 回调 flush_fn(records)，写入成功返回 True；返回 False 或抛异常视为失败
+        batch_size: 缓冲达到该条数时立即唤醒后台线程写入
+        max_buffer: 缓冲区上限；写满时由调用方线程同步 flush（背压），仍失败则丢弃最旧记录
+        interval: 最长写入间隔（秒）
+        spill_file: 写库失败时的溢出文件（JSON Lines，记录须可 JSON 序列化），None 表示不溢出
+        name: 后台线程名
+    """
+
+    def __init__(self, flush_fn, batch_size=100, max_buffer=5000, interval=1.0, spill_file=None, name='batch-writer'):
+        self._flush_fn = flush_fn
+        self.batch_size = max(1, batch_size)
+        self.max_buffer = max(self.batch_size, max_buffer)
+        self.interval = interval
+        self.spill_file = spill_file
+        self._name = name
+        self._buffer = deque()
+        self._inflight = []  # 后台线程正在写入的批次
+        self._flush_requested = False
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._stopped = False
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            'enqueued': 0,
+            'written': 0,
+            'flushes': 0,
+            'failures': 0,
+            'spilled': 0,
+            'replayed': 0,
+            'dropped': 0,
+            'last_flush_ms': 0.0,
+            'max_flush_ms': 0.0,
+            'total_flush_ms': 0.0,
+        }
+
+    def put(self, record):
+        """放入一条记录（只操作内存；缓冲区写满时同步 flush）"""
+        self._start()
+        with self._cond:
+            full = len(self._buffer) >= self.max_buffer
+        if full:
+            self.flush()
+        with self._cond:
+            dropped = len(self._buffer) >= self.max_buffer
+            if dropped:
+                self._buffer.popleft()
+            self._buffer.append(record)
+            if len(self._buffer) >= self.batch_size:
+                self._cond.notify_all()
+        if dropped:
+            logger.error(f"{self._name} 缓冲区已满且写入失败，丢弃最旧记录")
+        self._count(enqueued=1, dropped=int(dropped))
+
+    def flush(self):
+        """立即写入缓冲区中的全部记录，返回是否成功（无记录时返回 True）"""
+        with self._flush_lock:
+            with self._cond:
+                batch = list(self._buffer)
+                self._buffer.clear()
+                self._inflight = batch
+                self._flush_requested = False
+            try:
+                ok = self._write(batch) if batch else True
+                if not ok:
+                    self._spill_or_requeue(batch)
+            finally:
+                with self._cond:
+                    self._inflight = []
+                    self._cond.notify_all()
+            if ok and self.spill_file:
+                self._replay_spill()
+            return ok
+
+    def wait_flushed(self, predicate, timeout):
+        """等待缓冲区（含正在写入的批次）中满足 predicate 的记录由后台线程写完
+
+        调用方线程不写库、不回放溢出文件；写库失败的记录会放回缓冲区，此时等到超时为止。
+
+        Returns:
+            bool: 没有待写入的匹配记录返回 True，超时或后台线程已停止返回 False
+        """
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while any(predicate(r) for r in self._buffer) or any(predicate(r) for r in self._inflight):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or self._thread is None or self._stopped:
+                    return False
+                self._flush_requested = True
+                self._cond.notify_all()
+                self._cond.wait(remaining)
+        return True
+
+    def stop(self):
+        """停止后台线程并做最后一次 flush"""
+        with self._cond:
+            if self._stopped:
+                return
+            self._stopped = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 5)
+        self.flush()
+
+    def stats(self):
+        with self._cond:
+            depth = len(self._buffer)
+        with self._stats_lock:
+            stats = dict(self._stats)
+        flushes = stats.pop('flushes')
+        total_ms = stats.pop('total_flush_ms')
+        stats.update({
+            'buffer_depth': depth,
+            'max_buffer': self.max_buffer,
+            'flushes': flushes,
+            'avg_flush_ms': round(total_ms / flushes, 2) if flushes else 0.0,
+            'spill_bytes': self._spill_size(),
+        })
+        return stats
+
+    def _start(self):
+        if self._thread is not None:
+            return
+        with self._cond:
+            if self._thread is not None or self._stopped:
+                return
+            self._thread = threading.Thread(target=self._run, name=self._name, daemon=True)
+            self._thread.start()
+        atexit.register(self.stop)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._stopped and not self._flush_requested and len(self._buffer) < self.batch_size:
+                    self._cond.wait(self.interval)
+                if self._stopped:
+                    return
+            try:
+                self.flush()
+            except Exception:
+                logger.exception(f"{self._name} 写入失败")
+
+    def _write(self, records):
+        started = time.perf_counter()
+        try:
+            ok = bool(self._flush_fn(records))
+        except Exception as e:
+            logger.warning(f"{self._name} 批量写入失败（{len(records)} 条）: {e}")
+            ok = False
+        elapsed = (time.perf_counter() - started) * 1000
+        with self._stats_lock:
+            self._stats['flushes'] += 1
+            self._stats['last_flush_ms'] = round(elapsed, 2)
+            self._stats['max_flush_ms'] = max(self._stats['max_flush_ms'], round(elapsed, 2))
+            self._stats['total_flush_ms'] += elapsed
+        if ok:
+            self._count(written=len(records))
+        else:
+            self._count(failures=1)
+        return ok
+
+    def _count(self, **deltas):
+        with self._stats_lock:
+            for key, value in deltas.items():
+                self._stats[key] += value
+
+    def _spill_or_requeue(self, batch):
+        """写库失败：有溢出文件时追加到文件，否则放回缓冲区头部等待重试"""
+        if self.spill_file:
+            try:
+                os.makedirs(os.path.dirname(self.spill_file) or '.', exist_ok=True)
+                with open(self.spill_file, 'a', encoding='utf-8') as f:
+                    for record in batch:
+                        f.write(json.dumps(record, ensure_ascii=False, default=str) + '\n')
+                    f.flush()
+                    os.fsync(f.fileno())
+                self._count(spilled=len(batch))
+                logger.warning(f"{self._name} 已把 {len(batch)} 条记录写入溢出文件 {self.spill_file}")
+                return
+            except OSError as e:
+                logger.error(f"{self._name} 写入溢出文件失败: {e}")
+
+        dropped = 0
+        with self._cond:
+            self._buffer.extendleft(reversed(batch))
+            while len(self._buffer) > self.max_buffer:
+                self._buffer.pop()
+                dropped += 1
+        self._count(dropped=dropped)
+
+    def _replay_spill(self):
+        """数据库可用后回放溢出文件（调用方持有 _flush_lock）"""
+        if not self._spill_size():
+            return
+        replay_path = f"{self.spill_file}.replay"
+        try:
+            if not os.path.exists(replay_path):
+                os.replace(self.spill_file, replay_path)
+            with open(replay_path, 'r', encoding='utf-8') as f:
+                records = [json.loads(line) for line in f if line.strip()]
+        except (OSError, ValueError) as e:
+            logger.error(f"{self._name} 读取溢出文件失败: {e}")
+            return
+
+        for start in range(0, len(records), self.batch_size):
+            chunk = records[start:start + self.batch_size]
+            if not self._write(chunk):
+                # 剩余记录写回溢出文件，下次再试
+                rest = records[start:]
+                try:
+                    with open(replay_path, 'w', encoding='utf-8') as f:
+                        for record in rest:
+                            f.write(json.dumps(record, ensure_ascii=False, default=str) + '\n')
+                except OSError as e:
+                    logger.error(f"{self._name} 更新溢出文件失败: {e}")
+                return
+            self._count(replayed=len(chunk))
+        try:
+            os.remove(replay_path)
+        except OSError:
+            pass
+        logger.info(f"✅ {self._name} 已回放溢出文件 {len(records)} 条记录")
+
+    def _spill_size(self):
+        if not self.spill_file:
+            return 0
+        size = 0
+        for path in (self.spill_file, f"{self.spill_file}.replay"):
+            try:
+                size += os.path.getsize(path)
+            except OSError:
+                pass
+        return size
@@ -0,0 +1,126 @@
+"""
+弹幕规则分类器
+
+入队时给弹幕打上类别、置信度与优先级，使待处理队列按 priority 排序时购买类问题排在前面：
+  price             价格/优惠/下单
+  shipping          发货/物流/售后
+  product_question  商品本身的问题（产地、口味、规格……），以及命中会话商品名或 FAQ 关键词的弹幕
+  chit_chat         打招呼、刷屏互动
+  spam              引流广告、联系方式、长串重复字符
+
+关键词（通用词表 + 会话商品名 + FAQ 白名单关键词）编译进一个 Aho-Corasick 自动机，
+每条消息单遍扫描累加各类别权重；广告特征用一个预编译正则判断。不依赖模型与网络。
+"""
+import re
+
+from utils.ac_automaton import AhoCorasick
+
+PRICE = 'price'
+SHIPPING = 'shipping'
+PRODUCT_QUESTION = 'product_question'
+CHIT_CHAT = 'chit_chat'
+SPAM = 'spam'
+
+# 各类别的基础优先级（入队 priority = 调用方给定的优先级 + 基础优先级）
+CATEGORY_PRIORITY = {
+    PRICE: 30,
+    PRODUCT_QUESTION: 25,
+    SHIPPING: 20,
+    CHIT_CHAT: 0,
+    SPAM: -100,
+}
+
+# (关键词, 权重)；权重 1.0 为强特征，0.5 为弱特征
+KEYWORDS = {
+    PRICE: [
+        ('多少钱', 1.0), ('价格', 1.0), ('价钱', 1.0), ('怎么卖', 1.0), ('几块', 1.0), ('几元', 1.0),
+        ('优惠', 1.0), ('便宜', 1.0), ('打折', 1.0), ('折扣', 1.0), ('优惠券', 1.0), ('满减', 1.0),
+        ('秒杀', 1.0), ('福利价', 1.0), ('下单', 1.0), ('链接', 1.0), ('上车', 0.5), ('拍几号', 1.0),
+        ('划算', 0.5), ('贵', 0.5), ('券', 0.5), ('怎么买', 1.0), ('库存', 0.5), ('还有货', 1.0),
+    ],
+    SHIPPING: [
+        ('发货', 1.0), ('快递', 1.0), ('物流', 1.0), ('包邮', 1.0), ('运费', 1.0), ('邮费', 1.0),
+        ('顺丰', 1.0), ('几天到', 1.0), ('多久到', 1.0), ('到货', 1.0), ('送货', 1.0), ('配送', 1.0),
+        ('退货', 1.0), ('退换', 1.0), ('售后', 1.0), ('坏果', 1.0), ('包赔', 1.0), ('破损', 1.0),
+    ],
+    PRODUCT_QUESTION: [
+        ('产地', 1.0), ('原料', 1.0), ('成分', 1.0), ('配料', 1.0), ('保质期', 1.0), ('口感', 1.0),
+        ('口味', 1.0), ('味道', 1.0), ('甜不甜', 1.0), ('酸不酸', 1.0), ('辣不辣', 1.0), ('新鲜', 1.0),
+        ('规格', 1.0), ('尺寸', 1.0), ('重量', 1.0), ('几斤', 1.0), ('多大', 1.0), ('怎么吃', 1.0),
+        ('怎么做', 1.0), ('怎么用', 1.0), ('材质', 1.0), ('质量', 1.0), ('试吃', 1.0), ('包装', 1.0),
+        ('保存', 1.0), ('储存', 1.0), ('有机', 1.0), ('农药', 1.0), ('介绍', 0.5), ('讲一下', 0.5),
+        ('好吃吗', 1.0), ('好用吗', 1.0), ('适合', 0.5), ('区别', 1.0),
+    ],
+    CHIT_CHAT: [
+        ('哈哈', 0.5), ('主播好', 1.0), ('大家好', 1.0), ('晚上好', 1.0), ('早上好', 1.0), ('下午好', 1.0),
+        ('你好', 0.5), ('666', 1.0), ('来了', 0.5), ('支持', 0.5), ('加油', 1.0), ('好看', 0.5),
+        ('漂亮', 0.5), ('关注', 0.5), ('点赞', 1.0), ('路过', 1.0), ('打卡', 1.0), ('冲冲冲', 1.0),
+    ],
+}
+
+# 会话商品名、FAQ 关键词命中时计入商品问题的权重
+SESSION_TERM_WEIGHT = 1.0
+
+_SPAM_RE = re.compile(
+    r'https?://|www\.|\.com|'
+    r'(加|\+|➕)\s*(v|vx|wx|微|薇|威|q|扣扣|qq)|'
+    r'(私聊|私信我|看我主页|兼职|刷单|返利|代理|日赚|躺赚)|'
+    r'\d{7,}|'
+    r'(?P<ch>.)(?P=ch){7,}',
+    re.IGNORECASE
+)
+
+_QUESTION_RE = re.compile(r'[?？]|吗|呢|么|怎么|什么|哪|几|多少|是否|能不能|有没有|可不可以|可以')
+
+
+class BulletClassifier:
+    """不可变的规则分类器，构建后可在多线程间共享
+
+    Args:
+        session_terms: 会话相关的关键词（商品名、FAQ 白名单 pattern），命中计入 product_question
+    """
+
+    def __init__(self, session_terms=()):
+        entries = [(word, category, weight) for category, words in KEYWORDS.items() for word, weight in words]
+        seen = {word for word, _, _ in entries}
+        for term in session_terms:
+            term = (term or '').strip().lower()
+            if len(term) >= 2 and term not in seen:
+                seen.add(term)
+                entries.append((term, PRODUCT_QUESTION, SESSION_TERM_WEIGHT))
+        self._entries = entries
+        self._matcher = AhoCorasick([word.lower() for word, _, _ in entries])
+
+    def classify(self, message):
+        """返回 (类别, 置信度 0~1)"""
+        text = (message or '').strip().lower()
+        if not text:
+            return CHIT_CHAT, 0.0
+        if _SPAM_RE.search(text):
+            return SPAM, 0.9
+
+        scores = {}
+        for pid in self._matcher.find_all(text):
+            _, category, weight = self._entries[pid]
+            scores[category] = scores.get(category, 0.0) + weight
+
+        if not scores:
+            # 没有关键词：像问句的当作商品问题（低置信度），否则视为闲聊
+            if _QUESTION_RE.search(text):
+                return PRODUCT_QUESTION, 0.3
+            return CHIT_CHAT, 0.3
+
+        # 同分时按优先级取更“值钱”的类别
+        category = max(scores, key=lambda c: (scores[c], CATEGORY_PRIORITY[c]))
+        total = sum(scores.values())
+        confidence = scores[category] / total * min(1.0, 0.5 + scores[category] / 2)
+        return category, round(confidence, 3)
+
+    @staticmethod
+    def priority(category):
+        """类别的基础优先级"""
+        return CATEGORY_PRIORITY.get(category, 0)
+
+
+# 没有会话信息时使用的通用分类器
+default_classifier = BulletClassifier()
@@ -0,0 +1,156 @@
+"""
+弹幕去重聚类
+
+弹幕高峰时大量弹幕是同一个问题的不同说法（“多少钱”“多少钱啊”“这个多少钱？”）。
+入队前按会话把时间窗口内的弹幕聚成簇：先按 normalize_question 结果（再去掉“请问”“这个”等
+不影响语义的前缀词）精确匹配，再用字符二元组的 Dice 系数做近似匹配。每簇只有第一条（代表）写入队列，
+后续同簇弹幕只给代表累加计数，由调用方据此提高代表的优先级。
+"""
+import re
+import time
+import threading
+from collections import OrderedDict
+
+from utils.helpers import normalize_question
+from utils.lru_cache import LRUCache
+
+
+# 不改变问题语义的填充词，匹配前去掉（“这个多少钱”与“多少钱”视为同一问题）
+_FILLERS = re.compile(r'请问|主播|这个|那个|这款|那款|一下|吗')
+
+
+def _cluster_key(message):
+    key = ''.join(normalize_question(message).split())
+    return _FILLERS.sub('', key) or key
+
+
+def _bigrams(text):
+    """带首尾标记的字符二元组，短问题前后多一个字（“梨多少钱”与“多少钱”）时相似度明显下降"""
+    padded = f'^{text}$'
+    return frozenset(padded[i:i + 2] for i in range(len(padded) - 1))
+
+
+class BulletCluster:
+    """一个弹幕簇；bullet_id 为代表弹幕在队列中的 id，写库完成前为 None"""
+
+    __slots__ = ('session_id', 'key', 'grams', 'created', 'count', 'bullet_id', 'unbound', '_ready')
+
+    def __init__(self, session_id, key, grams, created):
+        self.session_id = session_id
+        self.key = key
+        self.grams = grams
+        self.created = created
+        self.count = 1
+        self.bullet_id = None
+        self.unbound = 0  # 代表写库前加入的弹幕数
+        self._ready = threading.Event()
+
+    def wait(self, timeout=None):
+        """等待代表写库完成，返回其 id（写库失败或超时返回 None）"""
+        self._ready.wait(timeout)
+        return self.bullet_id
+
+
+class BulletClusterer:
+    """按会话维护时间窗口内的弹幕簇
+
+    Args:
+        window: 簇从代表入队起保持的秒数，<= 0 关闭去重
+        similarity: 近似匹配阈值（二元组 Dice 系数，0~1），>= 1 时只做归一化后的精确匹配
+        max_clusters: 每个会话同时保留的簇数上限，超出时淘汰最早的簇
+        max_sessions: 保留聚类状态的会话数上限
+        on_join: 回调 on_join(bullet_id, n)，已写库的代表新增 n 条同簇弹幕时调用（在锁外调用）
+    """
+
+    def __init__(self, window=10.0, similarity=0.7, max_clusters=200, max_sessions=256, on_join=None):
+        self.window = window
+        self.similarity = similarity
+        self.max_clusters = max(1, max_clusters)
+        self._on_join = on_join
+        self._sessions = LRUCache(max_sessions)  # session_id -> OrderedDict(key -> BulletCluster)，按创建时间排序
+        self._lock = threading.Lock()
+        self.clusters = 0
+        self.merged = 0
+
+    @property
+    def enabled(self):
+        return self.window > 0
+
+    def assign(self, session_id, message):
+        """把弹幕分配到簇，返回 (簇, 是否新簇)；新簇的代表需由调用方写库后 bind() 或 discard()"""
+        key = _cluster_key(message)
+        now = time.monotonic()
+        if not self.enabled or not key:
+            return BulletCluster(session_id, key, frozenset(), now), True
+
+        bound_id = None
+        with self._lock:
+            clusters = self._sessions.peek(session_id)
+            if clusters is None:
+                clusters = OrderedDict()
+                self._sessions.set(session_id, clusters)
+            while clusters:
+                oldest = next(iter(clusters.values()))
+                if now - oldest.created <= self.window and len(clusters) < self.max_clusters:
+                    break
+                clusters.popitem(last=False)
+
+            grams = _bigrams(key)
+            cluster = clusters.get(key) or self._find_similar(clusters, key, grams)
+            if cluster is None:
+                cluster = BulletCluster(session_id, key, grams, now)
+                clusters[key] = cluster
+                self.clusters += 1
+                return cluster, True
+
+            cluster.count += 1
+            self.merged += 1
+            if cluster.bullet_id is None:
+                cluster.unbound += 1
+            else:
+                bound_id = cluster.bullet_id
+
+        if bound_id is not None and self._on_join:
+            self._on_join(bound_id, 1)
+        return cluster, False
+
+    def bind(self, cluster, bullet_id):
+        """代表写库完成：记录其 id，并把写库期间加入的弹幕数交给 on_join"""
+        with self._lock:
+            cluster.bullet_id = bullet_id
+            joined, cluster.unbound = cluster.unbound, 0
+        cluster._ready.set()
+        if joined and self._on_join:
+            self._on_join(bullet_id, joined)
+
+    def discard(self, cluster):
+        """代表写库失败：移除该簇，等待中的同簇弹幕得到 None"""
+        with self._lock:
+            clusters = self._sessions.peek(cluster.session_id)
+            if clusters is not None and clusters.get(cluster.key) is cluster:
+                del clusters[cluster.key]
+        cluster._ready.set()
+
+    def stats(self):
+        with self._lock:
+            total = self.clusters + self.merged
+            return {
+                'enabled': self.enabled,
+                'clusters': self.clusters,
+                'merged': self.merged,
+                'merge_ratio': round(self.merged / total, 4) if total else 0.0,
+                'sessions': len(self._sessions),
+            }
+
+    def _find_similar(self, clusters, key, grams):
+        """近似匹配：二元组 Dice 系数达到阈值的最相似簇（“梨多少钱”与“多少钱”只有 0.67，不会合并）"""
+        if self.similarity >= 1 or len(grams) < 3:
+            return None
+        best, best_score = None, self.similarity
+        for cluster in reversed(clusters.values()):
+            if len(cluster.grams) < 3:
+                continue
+            score = 2 * len(grams & cluster.grams) / (len(grams) + len(cluster.grams))
+            if score >= best_score:
+                best, best_score = cluster, score
+        return best
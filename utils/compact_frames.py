@@ -0,0 +1,77 @@
+"""
+紧凑推送帧
+
+默认推送格式每条事件一个 JSON 对象，type/session_id/username 等键名随每条消息重复发送。
+紧凑格式按固定字段顺序把事件编码为数组，会话 ID 与字段表只在连接时的 hello 帧中发送一次，
+并把短时间窗口内的多条事件合并为一帧：
+
+  hello: {"type": "hello", "format": "compact", "session_id": "...", "schema": {"b": ["bullet", [字段...]], "a": ["answer", [...]]}}
+  批量帧: [基准时间毫秒, [代码, 相对毫秒, 字段1, 字段2, ...], ...]
+
+代码 b=bullet、a=answer 按 schema 中的字段顺序取值（末尾的 null 省略）；
+其他类型的事件编码为 ["e", 相对毫秒, {原事件去掉 session_id/ts}]。
+"""
+import json
+
+# 事件类型 -> (代码, 字段顺序)
+SCHEMA = {
+    'bullet': ('b', ('id', 'username', 'message', 'merged')),
+    'answer': ('a', ('bullet_id', 'answer', 'source', 'cluster_count', 'username', 'message', 'audio_url', 'audio_job_id')),
+}
+
+_SKIP_KEYS = ('session_id', 'ts')
+
+
+def _hello_schema():
+    return {code: [event_type, list(fields)] for event_type, (code, fields) in SCHEMA.items()}
+
+
+def hello(session_id):
+    """连接（或切换会话）时发送的 hello 帧"""
+    return json.dumps({
+        'type': 'hello',
+        'format': 'compact',
+        'session_id': session_id,
+        'schema': _hello_schema(),
+    }, ensure_ascii=False, separators=(',', ':'))
+
+
+def encode_row(event, base_ts):
+    """把一条事件编码为数组行；base_ts 为所在批次的基准时间（秒）"""
+    dt = int(round((event.get('ts', base_ts) - base_ts) * 1000))
+    spec = SCHEMA.get(event.get('type'))
+    if spec is None:
+        return ['e', dt, {k: v for k, v in event.items() if k not in _SKIP_KEYS}]
+    code, fields = spec
+    row = [code, dt]
+    row.extend(event.get(name) for name in fields)
+    while len(row) > 2 and row[-1] is None:
+        row.pop()
+    return row
+
+
+def encode_batch(events, base_ts):
+    """把一批事件编码为一帧 JSON 文本"""
+    rows = [int(base_ts * 1000)]
+    rows.extend(encode_row(event, base_ts) for event in events)
+    return json.dumps(rows, ensure_ascii=False, separators=(',', ':'), default=str)
+
+
+def decode_batch(text, schema=None):
+    """把批量帧还原为事件字典列表（供压测与 Python 客户端使用）；schema 为 hello 帧中的 schema"""
+    schema = schema or _hello_schema()
+    frame = json.loads(text)
+    base_ms = frame[0]
+    events = []
+    for row in frame[1:]:
+        code, dt = row[0], row[1]
+        if code == 'e':
+            event = dict(row[2])
+        else:
+            event_type, fields = schema[code]
+            values = row[2:]
+            event = {'type': event_type}
+            event.update((name, values[i] if i < len(values) else None) for i, name in enumerate(fields))
+        event['ts'] = (base_ms + dt) / 1000
+        events.append(event)
+    return events
@@ -0,0 +1,101 @@
+"""
+推送扇出统计
+
+按房间（会话）记录发布的消息数、送达次数、因慢消费者丢弃的消息数，
+以及从发布到写给客户端的延迟（保留最近若干样本计算分位数）。
+SSE 事件中心与 WebSocket 广播共用。
+"""
+import threading
+from collections import OrderedDict, deque
+
+
+class _Room:
+    __slots__ = ('published', 'delivered', 'dropped', 'disconnected', 'latencies', 'max_ms')
+
+    def __init__(self, samples):
+        self.published = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.disconnected = 0
+        self.latencies = deque(maxlen=samples)
+        self.max_ms = 0.0
+
+
+class FanoutStats:
+    """线程安全的按房间扇出统计
+
+    Args:
+        samples: 每个房间保留的延迟样本数
+        max_rooms: 保留统计的房间数上限（淘汰最久未活动的房间）
+    """
+
+    def __init__(self, samples=1000, max_rooms=256):
+        self.samples = samples
+        self.max_rooms = max_rooms
+        self._rooms = OrderedDict()
+        self._lock = threading.Lock()
+
+    def published(self, room):
+        with self._lock:
+            self._room(room).published += 1
+
+    def delivered(self, room, latency_s, count=1):
+        """记录一次写出；count 为该帧包含的事件数（批量帧大于 1）"""
+        ms = latency_s * 1000
+        with self._lock:
+            entry = self._room(room)
+            entry.delivered += count
+            entry.latencies.append(ms)
+            if ms > entry.max_ms:
+                entry.max_ms = ms
+
+    def dropped(self, room, count=1):
+        with self._lock:
+            self._room(room).dropped += count
+
+    def disconnected(self, room):
+        """慢消费者被断开"""
+        with self._lock:
+            self._room(room).disconnected += 1
+
+    def snapshot(self, subscribers=None):
+        """返回 {房间: 统计}；subscribers 为 {房间: 当前订阅者数}"""
+        subscribers = subscribers or {}
+        with self._lock:
+            items = [(room, entry, sorted(entry.latencies)) for room, entry in self._rooms.items()]
+        result = {}
+        for room, entry, latencies in items:
+            def pct(q):
+                return round(latencies[min(len(latencies) - 1, int(len(latencies) * q))], 2) if latencies else 0.0
+            result[room] = {
+                'subscribers': subscribers.get(room, 0),
+                'published': entry.published,
+                'delivered': entry.delivered,
+                'dropped': entry.dropped,
+                'disconnected': entry.disconnected,
+                'latency_ms_p50': pct(0.5),
+                'latency_ms_p95': pct(0.95),
+                'latency_ms_max': round(entry.max_ms, 2),
+            }
+        return result
+
+    def totals(self):
+        with self._lock:
+            entries = list(self._rooms.values())
+        return {
+            'published': sum(e.published for e in entries),
+            'delivered': sum(e.delivered for e in entries),
+            'dropped': sum(e.dropped for e in entries),
+            'disconnected': sum(e.disconnected for e in entries),
+        }
+
+    def _room(self, room):
+        """取房间统计并刷新活跃顺序（调用方持有锁）"""
+        entry = self._rooms.get(room)
+        if entry is None:
+            entry = self._rooms[room] = _Room(self.samples)
+            while len(self._rooms) > self.max_rooms:
+                self._rooms.popitem(last=False)
+        else:
+            self._rooms.move_to_end(room)
+        return entry
@@ -0,0 +1,48 @@
+"""
+会话级 FAQ 白名单索引
+
+把一个会话可用的 FAQ 条目预先按 (priority, len(pattern)) 排好序并编译成
+Aho-Corasick 自动机，查询时对消息做一次扫描即可得到最佳匹配，不再逐条做子串判断。
+"""
+from utils.ac_automaton import AhoCorasick
+
+
+class FaqIndex:
+    """不可变的 FAQ 索引，构建后可在多线程间共享
+
+    条目按 优先级降序、pattern 长度降序 排列（同分保持原顺序），
+    因此命中的条目中下标最小者即为最佳答案，与逐条比较 (priority, len) 的结果一致。
+    """
+
+    def __init__(self, items):
+        """
+        Args:
+            items: 已按商品类型过滤的 FAQ 条目，dict 至少包含 pattern/answer，
+                可选 priority、id（数据库条目才有 id）
+        """
+        ranked = []
+        for order, item in enumerate(items):
+            pattern = item.get('pattern')
+            if not pattern:
+                continue
+            try:
+                priority = int(item.get('priority') or 0)
+            except (TypeError, ValueError):
+                priority = 0
+            ranked.append(((-priority, -len(pattern), order), item))
+        ranked.sort(key=lambda x: x[0])
+
+        self.entries = [item for _, item in ranked]
+        self._matcher = AhoCorasick([item['pattern'].lower() for item in self.entries])
+
+    def __len__(self):
+        return len(self.entries)
+
+    def match(self, message):
+        """返回最佳匹配的条目，未命中返回 None"""
+        if not message or not self.entries:
+            return None
+        hits = self._matcher.find_all(message.lower())
+        if not hits:
+            return None
+        return self.entries[hits[0]]
@@ -26,8 +26,8 @@ def normalize_question(question):
     # 统一"么"为"吗"
     normalized = normalized.replace('么', '吗')
     
-    # 转小写并去除多余空格
-    normalized = normalized.lower().strip()
+    # 转小写并合并多余空格
+    normalized = ' '.join(normalized.split()).lower()
     
     return normalized
 
@@ -35,6 +35,10 @@ def calculate_hash(text):
     """计算文本的SHA256哈希值"""
     return hashlib.sha256(text.encode('utf-8')).hexdigest()
 
+def question_hash(question):
+    """归一化问题的哈希（问答缓存与请求合并共用的 key）"""
+    return calculate_hash(normalize_question(question))
+
 def load_json_file(path):
     """加载JSON文件"""
     try:
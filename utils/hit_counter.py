@@ -0,0 +1,96 @@
+"""
+命中计数聚合器
+
+热路径上只在内存里累加 (表, 行id) 的命中次数与最后命中时间，
+由后台线程按固定间隔把增量批量交给 flush 回调写库，进程退出时再补一次 flush。
+正在写库的增量在提交成功前仍计入 pending()，读取方不会在写库期间少算。
+"""
+import threading
+import logging
+from datetime import datetime
+from utils.periodic import PeriodicTask
+
+logger = logging.getLogger(__name__)
+
+
+class HitCounter:
+    """线程安全的命中增量聚合器
+
+    Args:
+        flush_fn: 回调 flush_fn(table, {row_id: (delta, last_hit_at)})，
+            写库成功返回 True；返回 False 或抛异常时增量会被放回，下次重试
+        interval: 后台 flush 间隔（秒）
+    """
+
+    def __init__(self, flush_fn, interval=2.0):
+        self._flush_fn = flush_fn
+        self._pending = {}  # table -> {row_id: [delta, last_hit_at]}
+        self._inflight = {}  # table -> {row_id: (delta, last_hit_at)}，正在写库的增量
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._task = PeriodicTask(self.flush, interval, name='hit-counter')
+
+    def record(self, table, row_id, count=1):
+        """记录一次命中（只操作内存，不阻塞在数据库上）"""
+        now = datetime.now()
+        with self._lock:
+            rows = self._pending.setdefault(table, {})
+            entry = rows.get(row_id)
+            if entry is None:
+                rows[row_id] = [count, now]
+            else:
+                entry[0] += count
+                entry[1] = now
+        self._task.start()
+
+    def pending(self, table):
+        """返回某张表尚未写库（含正在写库）的增量快照 {row_id: (delta, last_hit_at)}"""
+        with self._lock:
+            merged = dict(self._inflight.get(table, {}))
+            for rid, (delta, ts) in self._pending.get(table, {}).items():
+                entry = merged.get(rid)
+                merged[rid] = (delta, ts) if entry is None else (entry[0] + delta, max(entry[1], ts))
+            return merged
+
+    def flush(self, table=None):
+        """立即把增量写库；table 为 None 时写全部表"""
+        with self._flush_lock:
+            with self._lock:
+                if table is None:
+                    batches, self._pending = self._pending, {}
+                else:
+                    batches = {table: self._pending.pop(table, {})}
+
+                for tbl, rows in batches.items():
+                    if rows:
+                        self._inflight[tbl] = {rid: (e[0], e[1]) for rid, e in rows.items()}
+
+            for tbl, rows in batches.items():
+                if not rows:
+                    continue
+                deltas = self._inflight[tbl]
+                ok = False
+                try:
+                    ok = self._flush_fn(tbl, deltas)
+                except Exception as e:
+                    logger.warning(f"命中计数写入失败 - 表: {tbl}: {e}")
+                # 提交成功后才移出 in-flight；失败时在同一次加锁内放回待写入，读取方看不到中间状态
+                with self._lock:
+                    del self._inflight[tbl]
+                    if not ok:
+                        self._merge_back(tbl, deltas)
+
+    def stop(self):
+        """停止后台线程并做最后一次 flush"""
+        self._task.stop()
+
+    def _merge_back(self, table, deltas):
+        """把写库失败的增量放回待写入（调用方持有 _lock）"""
+        rows = self._pending.setdefault(table, {})
+        for rid, (delta, ts) in deltas.items():
+            entry = rows.get(rid)
+            if entry is None:
+                rows[rid] = [delta, ts]
+            else:
+                entry[0] += delta
+                entry[1] = max(entry[1], ts)
@@ -0,0 +1,107 @@
+"""
+共享 HTTP 客户端工具
+
+- create_session: 创建带连接池、长连接复用的 requests.Session
+- request_with_retry: 对 429/5xx 和连接错误做带抖动的指数退避重试
+- async_request_with_retry: 同样的重试策略，用于异步路径的 aiohttp.ClientSession
+"""
+import time
+import asyncio
+import random
+import logging
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+MAX_BACKOFF = 8.0  # 秒，单次重试等待上限的默认值
+
+
+def create_session(pool_size=10, pool_connections=4):
+    """创建连接池化的 Session
+
+    Args:
+        pool_size: 每个主机的最大保持连接数（并发请求超过时会新建临时连接）
+        pool_connections: 缓存的主机连接池数量
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_size, max_retries=0)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def _retry_delay(attempt, backoff, max_backoff, response=None):
+    """计算第 attempt 次重试前的等待时间：优先使用 Retry-After，否则 full jitter 指数退避"""
+    if response is not None:
+        retry_after = response.headers.get('Retry-After')
+        if retry_after:
+            try:
+                return min(float(retry_after), max_backoff)
+            except ValueError:
+                pass
+    return random.uniform(0, min(max_backoff, backoff * (2 ** attempt)))
+
+
+def request_with_retry(session, method, url, retries=2, backoff=0.5, max_backoff=MAX_BACKOFF, **kwargs):
+    """发送请求，遇到 429/5xx 或连接错误时重试
+
+    Args:
+        session: requests.Session
+        retries: 最大重试次数（不含首次请求）
+        backoff: 退避基数（秒）
+        max_backoff: 单次等待上限（秒）
+        **kwargs: 透传给 session.request（timeout、json、headers 等）
+
+    Returns:
+        requests.Response: 最后一次响应（可能仍是 429/5xx，由调用方 raise_for_status）
+    """
+    attempt = 0
+    while True:
+        try:
+            response = session.request(method, url, **kwargs)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            if attempt >= retries:
+                raise
+            delay = _retry_delay(attempt, backoff, max_backoff)
+            logger.warning(f"请求失败，{delay:.2f}s 后重试 ({attempt + 1}/{retries}): {e}")
+        else:
+            if response.status_code not in RETRY_STATUS_CODES or attempt >= retries:
+                return response
+            delay = _retry_delay(attempt, backoff, max_backoff, response)
+            logger.warning(f"上游返回 {response.status_code}，{delay:.2f}s 后重试 ({attempt + 1}/{retries})")
+            response.close()
+        time.sleep(delay)
+        attempt += 1
+
+
+async def async_request_with_retry(client, method, url, retries=2, backoff=0.5, max_backoff=MAX_BACKOFF, **kwargs):
+    """request_with_retry 的异步版本
+
+    Args:
+        client: aiohttp.ClientSession
+        其余参数同 request_with_retry，**kwargs 透传给 client.request
+
+    Returns:
+        aiohttp.ClientResponse: 最后一次响应（可能仍是 429/5xx，由调用方 raise_for_status 并 release）
+    """
+    import aiohttp
+
+    attempt = 0
+    while True:
+        try:
+            response = await client.request(method, url, **kwargs)
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+            if attempt >= retries:
+                raise
+            delay = _retry_delay(attempt, backoff, max_backoff)
+            logger.warning(f"请求失败，{delay:.2f}s 后重试 ({attempt + 1}/{retries}): {e!r}")
+        else:
+            if response.status not in RETRY_STATUS_CODES or attempt >= retries:
+                return response
+            delay = _retry_delay(attempt, backoff, max_backoff, response)
+            logger.warning(f"上游返回 {response.status}，{delay:.2f}s 后重试 ({attempt + 1}/{retries})")
+            response.release()
+        await asyncio.sleep(delay)
+        attempt += 1
@@ -0,0 +1,117 @@
+"""
+微批合并（group commit）
+
+多个线程各自提交单条记录，由一个后台线程把同一时刻排队的记录合并成一批交给
+批处理函数（例如一条多行 INSERT），再把每条记录的结果（如自增 id）分别返回给调用方。
+低负载时每批只有一条、几乎不增加延迟；高负载时写入进行期间到达的记录自动攒成更大的批。
+"""
+import time
+import atexit
+import threading
+import logging
+from collections import deque
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """把并发的单条提交合并成批量调用
+
+    Args:
+        batch_fn: batch_fn(items) -> 与 items 等长的结果列表；抛出的异常会传给该批所有调用方
+        max_batch: 单批最大条数
+        max_wait: 批次未满时额外等待更多记录的时间（秒），0 表示不等待
+        name: 后台线程名
+    """
+
+    def __init__(self, batch_fn, max_batch=200, max_wait=0.0, name='micro-batcher'):
+        self._batch_fn = batch_fn
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max_wait
+        self._name = name
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stopped = False
+        self.batches = 0
+        self.items = 0
+        self.max_batch_seen = 0
+
+    def submit(self, item, timeout=None):
+        """提交一条记录并等待其结果"""
+        return self.submit_many([item], timeout)[0]
+
+    def submit_many(self, items, timeout=None):
+        """提交多条记录并按顺序返回结果（可能与其它调用方的记录合并到同一批）"""
+        futures = [Future() for _ in items]
+        if not futures:
+            return []
+        self._start()
+        with self._cond:
+            if self._stopped:
+                raise RuntimeError(f"{self._name} 已停止")
+            self._queue.extend(zip(items, futures))
+            self._cond.notify()
+        return [f.result(timeout) for f in futures]
+
+    def stop(self):
+        """处理完已排队的记录后停止后台线程"""
+        with self._cond:
+            if self._stopped:
+                return
+            self._stopped = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+
+    def stats(self):
+        with self._cond:
+            return {
+                'queued': len(self._queue),
+                'batches': self.batches,
+                'items': self.items,
+                'avg_batch_size': round(self.items / self.batches, 2) if self.batches else 0.0,
+                'max_batch_size': self.max_batch_seen,
+            }
+
+    def _start(self):
+        if self._thread is not None:
+            return
+        with self._cond:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name=self._name, daemon=True)
+            self._thread.start()
+        atexit.register(self.stop)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self._stopped:
+                    self._cond.wait()
+                if not self._queue:
+                    return
+                if self.max_wait:
+                    deadline = time.monotonic() + self.max_wait
+                    while len(self._queue) < self.max_batch and not self._stopped:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self._cond.wait(remaining)
+                batch = [self._queue.popleft() for _ in range(min(self.max_batch, len(self._queue)))]
+                self.batches += 1
+                self.items += len(batch)
+                self.max_batch_seen = max(self.max_batch_seen, len(batch))
+
+            try:
+                results = self._batch_fn([item for item, _ in batch])
+                if len(results) != len(batch):
+                    raise RuntimeError(f"批处理返回 {len(results)} 条结果，期望 {len(batch)} 条")
+            except Exception as e:
+                logger.warning(f"{self._name} 批处理失败（{len(batch)} 条）: {e}")
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
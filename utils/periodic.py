@@ -0,0 +1,65 @@
+"""
+后台周期任务
+
+在守护线程里按固定间隔调用一个函数，首次 start() 时才创建线程；
+进程退出时自动 stop() 并执行一次 final 回调（通常是最后一次 flush）。
+"""
+import atexit
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicTask:
+    """按间隔重复执行 fn 的守护线程
+
+    Args:
+        fn: 无参回调，异常会被记录但不会终止线程
+        interval: 执行间隔（秒）
+        name: 线程名，便于日志排查
+        final: 可选，stop() 时调用的收尾回调；默认再执行一次 fn
+    """
+
+    def __init__(self, fn, interval, name='periodic-task', final=None):
+        self._fn = fn
+        self._interval = interval
+        self._name = name
+        self._final = final or fn
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and not self._stop.is_set()
+
+    def start(self):
+        """启动后台线程（重复调用无副作用）"""
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name=self._name, daemon=True)
+            self._thread.start()
+        atexit.register(self.stop)
+
+    def stop(self):
+        """停止后台线程并执行收尾回调"""
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self._interval + 5)
+        try:
+            self._final()
+        except Exception:
+            logger.exception(f"后台任务收尾失败: {self._name}")
+
+    def _run(self):
+        while not self._stop.wait(self._interval):
+            try:
+                self._fn()
+            except Exception:
+                logger.exception(f"后台任务执行异常: {self._name}")
@@ -0,0 +1,34 @@
+"""
+简单的速率限制器
+
+按固定间隔放行调用（每秒最多 rate 次），多线程共享时各线程依次排队领取时间片，
+用于控制后台任务对第三方接口（如百度 TTS 的 QPS 配额）的调用频率。
+"""
+import time
+import threading
+
+
+class RateLimiter:
+    """线程安全的匀速限流器
+
+    Args:
+        rate: 每秒允许的调用次数，<= 0 表示不限速
+    """
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate and rate > 0 else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """阻塞直到可以执行下一次调用，返回实际等待的秒数"""
+        if not self.interval:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        wait = slot - now
+        if wait > 0:
+            time.sleep(wait)
+        return wait
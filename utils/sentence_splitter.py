@@ -0,0 +1,76 @@
+"""
+按中文句末标点切分文本（用于分句合成语音）
+
+SentenceSplitter 支持增量输入：AI 流式输出的片段逐个 feed 进来，
+每凑满一句就返回，让第一句的语音合成不必等整段回答生成完。
+"""
+import re
+
+# 句末标点（后面紧跟的引号、括号归入同一句）
+_SENTENCE_END = re.compile(r'[。！？!?；;…\n]+[”’」』）)"\']*')
+# 超长句子的次级切分点
+_CLAUSE_END = re.compile(r'[，,、：:]')
+
+
+class SentenceSplitter:
+    """增量分句器
+
+    Args:
+        min_chars: 短于该长度的句子与下一句合并（减少过碎的 TTS 请求）
+        max_chars: 长于该长度的句子在逗号等处再切分，仍过长时硬切
+    """
+
+    def __init__(self, min_chars=8, max_chars=120):
+        self.min_chars = min_chars
+        self.max_chars = max_chars
+        self._buffer = ''
+
+    def feed(self, text):
+        """追加文本，返回已完整的句子列表"""
+        self._buffer += text or ''
+        sentences = []
+        start = 0
+        for m in _SENTENCE_END.finditer(self._buffer):
+            # 句末标点在缓冲区末尾时可能还有后续标点/引号未到达，等下一段再判断
+            if m.end() == len(self._buffer):
+                break
+            if len(self._buffer[start:m.end()].strip()) < self.min_chars:
+                continue
+            sentences.extend(self._limit(self._buffer[start:m.end()]))
+            start = m.end()
+        self._buffer = self._buffer[start:]
+        if len(self._buffer) > self.max_chars:
+            head, self._buffer = self._split_long(self._buffer)
+            sentences.extend(head)
+        return [s for s in sentences if s]
+
+    def flush(self):
+        """返回缓冲区中剩余的文本（输入结束时调用）"""
+        rest, self._buffer = self._buffer, ''
+        return [s for s in self._limit(rest) if s]
+
+    def _limit(self, sentence):
+        sentence = sentence.strip()
+        if len(sentence) <= self.max_chars:
+            return [sentence]
+        head, rest = self._split_long(sentence)
+        return head + [s for s in self._limit(rest)]
+
+    def _split_long(self, text):
+        """把过长文本切出若干不超过 max_chars 的前缀，返回 (前缀列表, 剩余文本)"""
+        parts = []
+        while len(text) > self.max_chars:
+            cut = 0
+            for m in _CLAUSE_END.finditer(text, 0, self.max_chars):
+                cut = m.end()
+            if cut < self.min_chars:
+                cut = self.max_chars
+            parts.append(text[:cut].strip())
+            text = text[cut:]
+        return parts, text
+
+
+def split_sentences(text, min_chars=8, max_chars=120):
+    """一次性切分完整文本"""
+    splitter = SentenceSplitter(min_chars, max_chars)
+    return splitter.feed(text) + splitter.flush()